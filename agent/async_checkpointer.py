@@ -1,56 +1,234 @@
 import logging
-import os
 import dotenv
-import urllib.parse
 import asyncio
+from contextlib import asynccontextmanager
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg_pool import AsyncConnectionPool
+from langgraph.checkpoint.postgres import _ainternal
+from agent.checkpointer import (
+    get_db_connection_string,
+    get_db_schema,
+    get_pool_settings,
+    get_connection_kwargs,
+    aconfigure_connection,
+    redact_dsn,
+    abootstrap_schema,
+    get_purge_query,
+    iter_purge_batches,
+    CHECKPOINT_TABLES,
+    PURGE_BATCH_SIZE,
+    instrumentation_enabled,
+    get_checkpoint_backend,
+)
+from agent.instrumentation import InstrumentedCheckpointSaver
+from agent.serde import get_serializer
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 dotenv.load_dotenv()
 
+# The process-wide pool shared by every AsyncPostgresSaver, along with the
+# event loop it was opened on (async pools cannot be shared across loops)
+# and the async generator closing it when that loop shuts down
+_pool = None
+_pool_loop = None
+_pool_closer = None
+_pool_lock = None
 
-async def get_async_checkpointer():
+
+# The async pool is configured exactly like the sync one
+get_async_pool_settings = get_pool_settings
+
+
+def _get_pool_lock():
+    """
+    Get the lock guarding pool creation, bound to the running event loop.
+    """
+    global _pool_lock
+
+    loop = asyncio.get_running_loop()
+    if _pool_lock is None or _pool_lock[0] is not loop:
+        _pool_lock = (loop, asyncio.Lock())
+    return _pool_lock[1]
+
+
+async def _close_with_loop(pool):
+    """
+    Async generator closing the pool when its event loop shuts down.
+
+    The loop finalizes the async generators still open in `shutdown_asyncgens`, which
+    `asyncio.run` calls after cancelling the remaining tasks but before closing the loop,
+    so the pool is closed on its own loop even if `close_async_pool` never ran.
+    """
+    try:
+        yield
+    finally:
+        if not pool.closed:
+            logger.info("Closing async connection pool with its event loop")
+            await pool.close()
+
+
+async def _close_on_loop(pool, loop):
+    """
+    Close a pool bound to another event loop, on that loop.
+    """
+    if loop.is_running():
+        # The loop is running on another thread
+        logger.warning("Closing connection pool bound to another event loop")
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(pool.close(), loop))
+    else:
+        logger.warning(
+            "Discarding connection pool bound to a stopped event loop, its connections "
+            "are closed when it is garbage-collected"
+        )
+
+
+async def get_async_pool():
+    """
+    Get the process-wide asynchronous connection pool, opening it on first use.
+
+    The pool is opened once, waits until `min_size` connections are warmed and checks
+    every connection's health before handing it out. It is closed when its event loop
+    shuts down, and if it is requested from a different event loop (e.g. a later
+    `asyncio.run`), it is replaced and closed on its own loop.
+
+    Returns:
+        AsyncConnectionPool: The shared, open connection pool
+    """
+    global _pool, _pool_loop, _pool_closer
+
+    loop = asyncio.get_running_loop()
+    async with _get_pool_lock():
+        if _pool is not None and not _pool.closed and _pool_loop is loop:
+            return _pool
+
+        previous, previous_loop = _pool, _pool_loop
+        _pool, _pool_loop, _pool_closer = None, None, None
+        if previous is not None and not previous.closed:
+            await _close_on_loop(previous, previous_loop)
+
+        DB_SCHEMA = get_db_schema()
+        settings = get_pool_settings()
+
+        db_connection_string = get_db_connection_string()
+        logger.info(
+            f"Opening async connection pool to {redact_dsn(db_connection_string)} with schema [{DB_SCHEMA}]"
+        )
+
+        pool = AsyncConnectionPool(
+            conninfo=db_connection_string,
+            kwargs=get_connection_kwargs(DB_SCHEMA, db_connection_string),
+            configure=aconfigure_connection,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+            **settings,
+        )
+        await pool.open(wait=True, timeout=settings["timeout"])
+        logger.info(
+            f"Async connection pool opened with {settings['min_size']}-{settings['max_size']} connections"
+        )
+
+        closer = _close_with_loop(pool)
+        await closer.asend(None)
+        _pool, _pool_loop, _pool_closer = pool, loop, closer
+        return _pool
+
+
+async def close_async_pool():
+    """
+    Close the process-wide asynchronous connection pool, if it is open.
+    """
+    global _pool, _pool_loop, _pool_closer
+
+    pool, closer, loop = _pool, _pool_closer, _pool_loop
+    _pool, _pool_loop, _pool_closer = None, None, None
+    if pool is None or pool.closed:
+        return
+    if loop is not asyncio.get_running_loop():
+        await _close_on_loop(pool, loop)
+        return
+    logger.info("Closing async connection pool")
+    await pool.close()
+    await closer.aclose()
+
+
+@asynccontextmanager
+async def async_pool_lifespan(*args):
+    """
+    Lifespan context manager that opens the shared pool on startup and closes it on exit.
+
+    Used as the lifespan of the graph server's HTTP app (see agent/webapp.py), and can
+    be used directly as any Starlette/FastAPI `lifespan`.
+    """
+    await get_async_pool()
+    try:
+        yield
+    finally:
+        await close_async_pool()
+
+
+async def get_async_checkpointer(serde=None, instrument=None):
     """
     Creates and returns an asynchronous PostgreSQL checkpointer instance for use with LangGraph agents.
 
-    Uses environment variables for database credentials.
+    Uses environment variables for database credentials. All checkpointers share the
+    process-wide connection pool returned by `get_async_pool`. With CHECKPOINT_BACKEND=sqlite,
+    returns an embedded SQLite checkpointer instead (see `agent.sqlite_checkpointer`).
+
+    Args:
+        serde: Serializer for checkpoint blobs and writes, defaults to `get_serializer()`
+        instrument: Wrap the checkpointer with call metrics, defaults to `instrumentation_enabled()`
 
     Returns:
         AsyncPostgresSaver: Configured asynchronous PostgreSQL checkpointer instance
     """
-    DB_URI = os.environ.get("SUPABASE_DB_URI")
-    DB_USERNAME = os.environ.get("SUPABASE_DB_USERNAME")
-    DB_PASSWORD = os.environ.get("SUPABASE_DB_PASSWORD")
-    DB_SCHEMA = os.environ.get("SUPABASE_DB_SCHEMA", "langgraph")
-
-    # Encode the username and password for URI
-    encoded_username = urllib.parse.quote(DB_USERNAME)
-    encoded_password = urllib.parse.quote(DB_PASSWORD)
-
-    db_connection_string = (
-        f"postgresql://{encoded_username}:{encoded_password}@{DB_URI}?sslmode=disable"
-    )
-    logger.info(f"DB Connection established to {DB_URI} with schema [{DB_SCHEMA}]")
-    logger.info(f"DB Connection string: {db_connection_string}")
-
-    connection_kwargs = {
-        "autocommit": True,
-        "prepare_threshold": 0,
-    }
-
-    async with AsyncConnectionPool(
-        conninfo=DB_URI,
-        max_size=20,
-        kwargs=connection_kwargs,
-    ) as pool:
-        checkpointer = AsyncPostgresSaver(pool)
+    if get_checkpoint_backend() == "sqlite":
+        from agent.sqlite_checkpointer import get_async_sqlite_checkpointer
 
+        checkpointer = await get_async_sqlite_checkpointer(serde=serde)
+    else:
+        DB_SCHEMA = get_db_schema()
+
+        pool = await get_async_pool()
+        checkpointer = AsyncPostgresSaver(pool, serde=serde or get_serializer())
+
+        # Create or migrate the checkpointer tables, once per process
         try:
-            await checkpointer.setup()
+            await abootstrap_schema(checkpointer, pool.conninfo, DB_SCHEMA)
         except Exception as e:
             logger.error(f"Error setting up checkpointer: {e}")
 
-        return checkpointer
+    if instrument if instrument is not None else instrumentation_enabled():
+        checkpointer = InstrumentedCheckpointSaver(checkpointer)
+
+    return checkpointer
+
+
+async def apurge_checkpoints(
+    thread_ids=None, checkpoint_ns=None, batch_size=PURGE_BATCH_SIZE, conn=None
+):
+    """
+    Delete all checkpoints, writes and blobs for lists of thread IDs and/or namespaces.
+
+    Async counterpart of `agent.checkpointer.purge_checkpoints`; uses the shared pool
+    unless a connection or pool is given.
+
+    Returns:
+        dict: Number of rows deleted per table
+    """
+    counts = dict.fromkeys(CHECKPOINT_TABLES, 0)
+    batches = list(iter_purge_batches(thread_ids, checkpoint_ns, batch_size))
+
+    if conn is None:
+        conn = await get_async_pool()
+
+    async with _ainternal.get_connection(conn) as db_conn:
+        for column, values in batches:
+            async with db_conn.transaction(), db_conn.cursor() as cur:
+                await cur.execute(get_purge_query(column), {"values": values})
+                for table, count in zip(CHECKPOINT_TABLES, await cur.fetchone()):
+                    counts[table] += count
+
+    logger.info(f"Purged {len(batches)} batches of checkpoints: {counts}")
+    return counts
@@ -0,0 +1,212 @@
+"""
+Batch runner for many independent conversations.
+
+`arun_batch` takes an iterable of (thread_id, input) pairs and runs each through a graph
+with at most `concurrency` runs in flight, yielding results as they complete rather than
+in input order. Items are pulled from the iterable only as slots free up, so it can be a
+generator over millions of prompts.
+
+Every run shares one checkpointer, and so one connection pool. `aget_batch_checkpointer`
+wraps it in a BufferedCheckpointSaver, so the checkpoints of all in-flight runs are
+written together in pipelined transactions. Whenever runs complete, the runner flushes
+once for all of them (a group commit) before yielding their results, so a yielded
+result's checkpoints are always stored.
+
+With `resume=True`, each thread's latest checkpoint is checked first:
+  * no checkpoint   - the input is run
+  * finished        - the thread is skipped (it completed before a crash or restart)
+  * interrupted     - the thread is resumed from its checkpoint instead of re-sending the input
+
+Usage:
+    python -m agent.batch prompts.jsonl [--output results.jsonl] [--concurrency 16] [--no-resume]
+
+Each line of prompts.jsonl is {"thread_id": ..., "prompt": ...}.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import dotenv
+from agent.async_checkpointer import close_async_pool, get_async_checkpointer
+from agent.buffered_checkpointer import BufferedCheckpointSaver
+from agent.checkpointer import get_checkpoint_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+DEFAULT_BATCH_CONCURRENCY = 16
+
+# Statuses of a thread's latest checkpoint, and of a batch result
+THREAD_STATUSES = ("new", "finished", "interrupted")
+RESULT_STATUSES = ("completed", "resumed", "skipped", "failed")
+
+
+async def aget_batch_checkpointer(flush_interval=0.05, max_buffered=500):
+    """
+    Get a checkpointer on the shared pool that groups the writes of concurrent runs.
+
+    The checkpointer buffers with "async" durability; `arun_batch` flushes it before
+    yielding results.
+
+    Args:
+        flush_interval: Seconds between background flushes
+        max_buffered: Puts wait for a flush once this many checkpoints and writes are buffered
+
+    Returns:
+        BaseCheckpointSaver: A BufferedCheckpointSaver over the Postgres checkpointer, or
+            the plain checkpointer with the sqlite backend
+    """
+    saver = await get_async_checkpointer()
+    if get_checkpoint_backend() != "postgres":
+        return saver
+    return BufferedCheckpointSaver(
+        saver, durability="async", flush_interval=flush_interval, max_buffered=max_buffered
+    )
+
+
+def make_thread_config(thread_id, config=None):
+    """
+    Merge a thread ID into a base run config.
+    """
+    config = config or {}
+    return {**config, "configurable": {**config.get("configurable", {}), "thread_id": thread_id}}
+
+
+async def aget_thread_status(graph, config):
+    """
+    Get whether a thread has no checkpoint, finished its last run or was interrupted mid-run.
+    """
+    snapshot = await graph.aget_state(config)
+    if snapshot.metadata is None:
+        return "new"
+    return "interrupted" if snapshot.next else "finished"
+
+
+async def _arun_item(graph, thread_id, input, resume, config):
+    config = make_thread_config(thread_id, config)
+    result = {"thread_id": thread_id, "status": None, "output": None, "error": None}
+    start = time.perf_counter()
+    try:
+        status = await aget_thread_status(graph, config) if resume else "new"
+        if status == "finished":
+            result["status"] = "skipped"
+        else:
+            # Invoking with no input continues an interrupted run from its checkpoint
+            run_input = None if status == "interrupted" else input
+            result["output"] = await graph.ainvoke(run_input, config)
+            result["status"] = "resumed" if status == "interrupted" else "completed"
+    except Exception as e:
+        logger.warning(f"Batch run for thread {thread_id} failed: {e!r}")
+        result["status"] = "failed"
+        result["error"] = e
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+async def arun_batch(graph, items, concurrency=DEFAULT_BATCH_CONCURRENCY, resume=True, config=None):
+    """
+    Run (thread_id, input) pairs through a graph with bounded concurrency.
+
+    Args:
+        graph: Compiled graph with a checkpointer, see `aget_batch_checkpointer`
+        items: Iterable of (thread_id, input) pairs, consumed lazily
+        concurrency: Maximum number of runs in flight
+        resume: Skip finished threads and resume interrupted ones instead of re-running them
+        config: Base run config merged into every run's config
+
+    Yields:
+        dict: Per thread, as runs complete: thread_id, status (one of RESULT_STATUSES),
+            output (the graph's final state), error (the exception if it failed) and seconds
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    async def completed():
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        # One flush stores the checkpoints of every run that just completed
+        if isinstance(graph.checkpointer, BufferedCheckpointSaver):
+            await graph.checkpointer.aflush()
+        return [task.result() for task in done]
+
+    pending = set()
+    try:
+        for thread_id, input in items:
+            if len(pending) >= concurrency:
+                for result in await completed():
+                    yield result
+            pending.add(asyncio.create_task(_arun_item(graph, thread_id, input, resume, config)))
+
+        while pending:
+            for result in await completed():
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def read_prompts(path):
+    """
+    Yield (thread_id, input) pairs from a JSONL file of {"thread_id", "prompt"} objects.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield str(item["thread_id"]), {"messages": [("human", item["prompt"])]}
+
+
+def format_result(result):
+    """
+    Reduce a batch result to a JSON-serializable dict with the final answer.
+    """
+    messages = (result["output"] or {}).get("messages") or []
+    return {
+        "thread_id": result["thread_id"],
+        "status": result["status"],
+        "answer": messages[-1].content if messages else None,
+        "error": repr(result["error"]) if result["error"] else None,
+        "seconds": round(result["seconds"], 3),
+    }
+
+
+async def amain(args):
+    from agent.graph import build_agent
+
+    checkpointer = await aget_batch_checkpointer()
+    graph = build_agent(checkpointer=checkpointer)
+
+    counts = dict.fromkeys(RESULT_STATUSES, 0)
+    begin = time.perf_counter()
+    try:
+        with open(args.output, "a") as out:
+            results = arun_batch(
+                graph, read_prompts(args.path), concurrency=args.concurrency, resume=args.resume
+            )
+            async for result in results:
+                counts[result["status"]] += 1
+                out.write(json.dumps(format_result(result)) + "\n")
+                out.flush()
+    finally:
+        if isinstance(checkpointer, BufferedCheckpointSaver):
+            await checkpointer.aclose()
+        await close_async_pool()
+
+    logger.info(f"Batch complete in {time.perf_counter() - begin:.1f}s: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of prompts through the agent")
+    parser.add_argument("path", help="JSONL file of {thread_id, prompt} objects")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY)
+    parser.add_argument("--no-resume", dest="resume", action="store_false")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
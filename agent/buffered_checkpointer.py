@@ -0,0 +1,335 @@
+import asyncio
+import logging
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.postgres import _ainternal
+from psycopg.types.json import Jsonb
+from agent.delegating_checkpointer import DelegatingCheckpointSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Durability levels of the buffered checkpointer:
+#   sync  - every put is written through immediately, nothing is buffered
+#   run   - puts are buffered and flushed on a timer; `ainvoke_durably` flushes before
+#           returning, so a run's checkpoints are stored before its response is sent
+#   async - puts are buffered and flushed on a timer only
+DURABILITY_LEVELS = ("sync", "run", "async")
+
+
+class BufferedCheckpointSaver(DelegatingCheckpointSaver):
+    """
+    Write-behind wrapper around an AsyncPostgresSaver.
+
+    Checkpoints and writes are kept in memory and flushed in batches, so database latency
+    is taken off the graph's super-steps. A flush writes everything buffered across all
+    threads in one pipelined transaction: one round trip no matter how many checkpoints
+    and writes are pending.
+
+    Reads see pending data: `aget_tuple` serves buffered checkpoints directly and merges
+    buffered writes into stored ones. Entries are only dropped from the buffer once the
+    flush that stored them has committed. Once `max_buffered` entries are pending, puts
+    wait for a flush, so a slow database slows writers down instead of growing the buffer.
+    """
+
+    def __init__(self, saver, durability="run", flush_interval=0.05, max_buffered=500):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(
+                f"durability must be one of {DURABILITY_LEVELS}, got {durability!r}"
+            )
+        super().__init__(saver)
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        # (thread_id, checkpoint_ns, checkpoint_id) -> (parent_id, checkpoint, metadata, new_versions)
+        self._checkpoints = {}
+        # (thread_id, checkpoint_ns, checkpoint_id) -> {(task_id, idx): (task_path, channel, value, upsert)}
+        self._writes = {}
+        # (thread_id, checkpoint_ns) -> latest buffered checkpoint_id
+        self._latest = {}
+        self._lock = asyncio.Lock()
+        self._pending = asyncio.Event()
+        self._flusher = None
+
+    def _buffered_count(self):
+        return len(self._checkpoints) + sum(len(w) for w in self._writes.values())
+
+    async def _schedule_flush(self):
+        """
+        Wake the background flusher, starting it on first use, or flush right away if the
+        buffer is full.
+        """
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+        self._pending.set()
+        if self._buffered_count() >= self.max_buffered:
+            await self.aflush()
+
+    async def _flush_loop(self):
+        """
+        Flush `flush_interval` after the first buffered put.
+        """
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(self.flush_interval)
+            self._pending.clear()
+
+            try:
+                await self.aflush()
+            except Exception as e:
+                logger.error(f"Error flushing buffered checkpoints, will retry: {e}")
+                self._pending.set()
+                await asyncio.sleep(self.flush_interval)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        if self.durability == "sync":
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        copy = {**checkpoint, "channel_values": checkpoint["channel_values"].copy()}
+
+        self._checkpoints[(thread_id, checkpoint_ns, checkpoint["id"])] = (
+            get_checkpoint_id(config),
+            copy,
+            get_checkpoint_metadata(config, metadata),
+            dict(new_versions),
+        )
+        self._latest[(thread_id, checkpoint_ns)] = checkpoint["id"]
+        await self._schedule_flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        if self.durability == "sync":
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+        key = (
+            config["configurable"]["thread_id"],
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+        )
+        upsert = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        buffered = self._writes.setdefault(key, {})
+        for idx, (channel, value) in enumerate(writes):
+            write_key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            # Mirror the database: special writes are upserted, others keep the first value
+            if upsert or write_key not in buffered:
+                buffered[write_key] = (task_path, channel, value, upsert)
+        await self._schedule_flush()
+
+    def _pending_writes(self, key):
+        return [
+            (task_id, channel, value)
+            for (task_id, _), (_, channel, value, _) in sorted(
+                self._writes.get(key, {}).items(), key=lambda item: item[0]
+            )
+        ]
+
+    def _buffered_tuple(self, thread_id, checkpoint_ns, checkpoint_id):
+        parent_id, checkpoint, metadata, _ = self._checkpoints[
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ]
+        return CheckpointTuple(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            {**checkpoint, "channel_values": checkpoint["channel_values"].copy()},
+            metadata,
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            self._pending_writes((thread_id, checkpoint_ns, checkpoint_id)),
+        )
+
+    async def aget_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config) or self._latest.get(
+            (thread_id, checkpoint_ns)
+        )
+
+        if (thread_id, checkpoint_ns, checkpoint_id) in self._checkpoints:
+            return self._buffered_tuple(thread_id, checkpoint_ns, checkpoint_id)
+
+        # Hold the flush lock so buffered writes can't be stored while being merged
+        async with self._lock:
+            checkpoint_tuple = await self.saver.aget_tuple(config)
+            if checkpoint_tuple is None:
+                return None
+
+            key = (thread_id, checkpoint_ns, checkpoint_tuple.config["configurable"]["checkpoint_id"])
+            if key not in self._writes:
+                return checkpoint_tuple
+
+            return checkpoint_tuple._replace(
+                pending_writes=checkpoint_tuple.pending_writes + self._pending_writes(key)
+            )
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        await self.aflush()
+        async for checkpoint_tuple in self.saver.alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield checkpoint_tuple
+
+    async def adelete_thread(self, thread_id):
+        # Hold the flush lock, so a flush in progress can't store the thread's rows again
+        async with self._lock:
+            for buffer in (self._checkpoints, self._writes, self._latest):
+                for key in [key for key in buffer if key[0] == thread_id]:
+                    del buffer[key]
+            await self.saver.adelete_thread(thread_id)
+
+    def _dump_buffer(self, checkpoints, writes):
+        """
+        Serialize a snapshot of the buffer into rows for the saver's insert statements.
+        """
+        saver = self.saver
+        blob_rows, checkpoint_rows, upsert_rows, insert_rows = [], [], [], []
+
+        for (thread_id, checkpoint_ns, checkpoint_id), entry in checkpoints:
+            parent_id, checkpoint, metadata, new_versions = entry
+            copy = checkpoint.copy()
+            blob_rows.extend(
+                saver._dump_blobs(
+                    thread_id, checkpoint_ns, copy.pop("channel_values"), new_versions
+                )
+            )
+            checkpoint_rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    parent_id,
+                    Jsonb(saver._dump_checkpoint(copy)),
+                    saver._dump_metadata(metadata),
+                )
+            )
+
+        for (thread_id, checkpoint_ns, checkpoint_id), buffered in writes:
+            for (task_id, idx), (task_path, channel, value, upsert) in buffered:
+                row = (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    task_path,
+                    idx,
+                    channel,
+                    *saver.serde.dumps_typed(value),
+                )
+                (upsert_rows if upsert else insert_rows).append(row)
+
+        return blob_rows, checkpoint_rows, upsert_rows, insert_rows
+
+    async def aflush(self):
+        """
+        Write everything buffered to the database in a single pipelined transaction.
+        """
+        async with self._lock:
+            checkpoints = list(self._checkpoints.items())
+            writes = [(key, list(buffered.items())) for key, buffered in self._writes.items()]
+            if not checkpoints and not writes:
+                return
+
+            blob_rows, checkpoint_rows, upsert_rows, insert_rows = await asyncio.to_thread(
+                self._dump_buffer, checkpoints, writes
+            )
+
+            saver = self.saver
+            async with _ainternal.get_connection(saver.conn) as conn, saver.lock:
+                async with conn.pipeline(), conn.transaction():
+                    async with conn.cursor(binary=True) as cur:
+                        if blob_rows:
+                            await cur.executemany(saver.UPSERT_CHECKPOINT_BLOBS_SQL, blob_rows)
+                        if checkpoint_rows:
+                            await cur.executemany(saver.UPSERT_CHECKPOINTS_SQL, checkpoint_rows)
+                        if upsert_rows:
+                            await cur.executemany(saver.UPSERT_CHECKPOINT_WRITES_SQL, upsert_rows)
+                        if insert_rows:
+                            await cur.executemany(saver.INSERT_CHECKPOINT_WRITES_SQL, insert_rows)
+
+            # Only drop what was stored; entries replaced during the flush stay buffered
+            for key, entry in checkpoints:
+                if self._checkpoints.get(key) is entry:
+                    del self._checkpoints[key]
+                    if self._latest.get(key[:2]) == key[2]:
+                        del self._latest[key[:2]]
+            for key, flushed in writes:
+                buffered = self._writes.get(key, {})
+                for write_key, write in flushed:
+                    if buffered.get(write_key) is write:
+                        del buffered[write_key]
+                if not buffered:
+                    self._writes.pop(key, None)
+
+            logger.debug(
+                f"Flushed {len(checkpoint_rows)} checkpoints, {len(blob_rows)} blobs "
+                f"and {len(upsert_rows) + len(insert_rows)} writes"
+            )
+
+    async def aclose(self):
+        """
+        Flush whatever is still buffered and stop the background flusher.
+        """
+        await self.aflush()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+
+    def _run_sync(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.saver.loop).result()
+
+    def get_tuple(self, config):
+        return self._run_sync(self.aget_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        self._run_sync(self.aflush())
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._run_sync(self.aput(config, checkpoint, metadata, new_versions))
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self._run_sync(self.aput_writes(config, writes, task_id, task_path))
+
+    def delete_thread(self, thread_id):
+        return self._run_sync(self.adelete_thread(thread_id))
+
+
+async def ainvoke_durably(graph, input, config, **kwargs):
+    """
+    Invoke a graph and, if its checkpointer is buffered with "run" durability, flush the
+    buffered checkpoints before returning the result.
+    """
+    result = await graph.ainvoke(input, config, **kwargs)
+
+    checkpointer = graph.checkpointer
+    if isinstance(checkpointer, BufferedCheckpointSaver) and checkpointer.durability == "run":
+        await checkpointer.aflush()
+
+    return result
@@ -0,0 +1,372 @@
+"""
+Bulk checkpoint export, import and seeding.
+
+Checkpoints, writes and blobs are moved with binary COPY rather than row-by-row `put`
+calls. A dump file is a small header followed by each table's raw COPY stream, split
+into length-prefixed chunks, so export and import stream with bounded memory. A path
+ending in .gz is gzip-compressed. Dumps only load into the same checkpoint schema
+version they were taken from.
+
+Imports land in temporary staging tables first and are merged with
+INSERT ... ON CONFLICT DO NOTHING, all three tables in one pipelined round trip, so
+re-importing or importing into a live database skips rows that already exist. With
+--on-conflict error, rows are copied straight into the checkpoint tables, the fastest
+path for loading an empty database.
+
+`seed_checkpoints` generates synthetic threads straight into the tables for load tests.
+
+Usage:
+    python -m agent.bulk export threads.ckpt.gz [--thread-id ID ...] [--checkpoint-ns NS ...]
+    python -m agent.bulk import threads.ckpt.gz [--on-conflict skip|error]
+    python -m agent.bulk seed --threads 100000 [--checkpoints 10] [--prefix seed]
+"""
+import argparse
+import gzip
+import json
+import logging
+import struct
+import time
+import dotenv
+from datetime import datetime, timezone
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from agent.checkpointer import SCHEMA_MIGRATION_VERSION, get_db_connection
+from agent.serde import get_serializer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+DUMP_MAGIC = b"LGCKPT\x00\x01"
+DUMP_FORMAT_VERSION = 1
+CONFLICT_MODES = ("skip", "error")
+
+# Columns copied per table, matching the checkpoint schema at SCHEMA_MIGRATION_VERSION
+BULK_COLUMNS = {
+    "checkpoints": [
+        "thread_id", "checkpoint_ns", "checkpoint_id", "parent_checkpoint_id", "type",
+        "checkpoint", "metadata",
+    ],
+    "checkpoint_blobs": ["thread_id", "checkpoint_ns", "channel", "version", "type", "blob"],
+    "checkpoint_writes": [
+        "thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx", "channel", "type",
+        "blob", "task_path",
+    ],
+}
+
+# Binary COPY framing: a signature, flags and header extension length, then each row as an
+# int16 field count followed by int32 length-prefixed fields (-1 for NULL), then a -1
+# trailer. jsonb values are sent as a version byte followed by the JSON text.
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack(">h", -1)
+COPY_BUFFER_SIZE = 1024 * 1024
+JSONB_VERSION = b"\x01"
+
+_chunk = struct.Struct(">I")
+_field_count = struct.Struct(">h")
+_field_size = struct.Struct(">i")
+_field_null = _field_size.pack(-1)
+
+
+def open_dump(path, mode):
+    """
+    Open a dump file for binary reading ("rb") or writing ("wb"), gzipped if it ends in .gz.
+    """
+    return gzip.open(path, mode, compresslevel=6) if path.endswith(".gz") else open(path, mode)
+
+
+def write_frame(f, data):
+    f.write(_chunk.pack(len(data)))
+    f.write(data)
+
+
+def read_frame(f):
+    header = f.read(_chunk.size)
+    if len(header) < _chunk.size:
+        raise ValueError("Truncated checkpoint dump")
+    (size,) = _chunk.unpack(header)
+    data = f.read(size)
+    if len(data) < size:
+        raise ValueError("Truncated checkpoint dump")
+    return data
+
+
+def _columns_sql(table):
+    return ", ".join(BULK_COLUMNS[table])
+
+
+def _export_query(table, thread_ids, checkpoint_ns):
+    where, params = [], {}
+    if thread_ids:
+        where.append("thread_id = ANY(%(thread_ids)s)")
+        params["thread_ids"] = list(thread_ids)
+    if checkpoint_ns is not None:
+        where.append("checkpoint_ns = ANY(%(checkpoint_ns)s)")
+        params["checkpoint_ns"] = list(checkpoint_ns)
+    query = f"SELECT {_columns_sql(table)} FROM {table}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    return f"COPY ({query}) TO STDOUT (FORMAT BINARY)", params
+
+
+def export_checkpoints(conn, path, thread_ids=None, checkpoint_ns=None):
+    """
+    Export checkpoints, writes and blobs to a dump file, from one consistent snapshot.
+
+    Args:
+        conn: Autocommit connection whose search_path is the checkpoint schema
+        path: Dump file to write
+        thread_ids: Only export these threads, defaults to every thread
+        checkpoint_ns: Only export these namespaces, defaults to every namespace
+
+    Returns:
+        dict: Number of rows exported per table
+    """
+    counts = {}
+    header = {
+        "format": DUMP_FORMAT_VERSION,
+        "schema_version": SCHEMA_MIGRATION_VERSION,
+        "tables": BULK_COLUMNS,
+    }
+    with open_dump(path, "wb") as f, conn.transaction(), conn.cursor() as cur:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        f.write(DUMP_MAGIC)
+        write_frame(f, json.dumps(header).encode())
+
+        for table in BULK_COLUMNS:
+            write_frame(f, table.encode())
+            query, params = _export_query(table, thread_ids, checkpoint_ns)
+            with cur.copy(query, params) as copy:
+                for data in copy:
+                    write_frame(f, bytes(data))
+            write_frame(f, b"")
+            counts[table] = cur.rowcount
+
+    logger.info(f"Exported checkpoints to {path}: {counts}")
+    return counts
+
+
+def iter_dump(path):
+    """
+    Read a dump file, yielding (table, chunks) for each table in it.
+
+    `chunks` is an iterator over the table's raw COPY data and must be consumed before
+    moving on to the next table.
+    """
+    with open_dump(path, "rb") as f:
+        if f.read(len(DUMP_MAGIC)) != DUMP_MAGIC:
+            raise ValueError(f"{path} is not a checkpoint dump")
+        header = json.loads(read_frame(f))
+        if header["format"] != DUMP_FORMAT_VERSION:
+            raise ValueError(f"Unsupported checkpoint dump format {header['format']}")
+        if header["schema_version"] != SCHEMA_MIGRATION_VERSION:
+            raise ValueError(
+                f"The dump is from checkpoint schema version {header['schema_version']}, "
+                f"but this database is at {SCHEMA_MIGRATION_VERSION}"
+            )
+        if header["tables"] != BULK_COLUMNS:
+            raise ValueError("The dump's columns do not match the checkpoint tables")
+
+        def chunks():
+            while data := read_frame(f):
+                yield data
+
+        while table := f.read(_chunk.size):
+            (size,) = _chunk.unpack(table)
+            table = f.read(size).decode()
+            if table not in BULK_COLUMNS:
+                raise ValueError(f"Unknown table {table!r} in checkpoint dump")
+            table_chunks = chunks()
+            yield table, table_chunks
+            for _ in table_chunks:
+                pass
+
+
+def import_checkpoints(conn, path, on_conflict="skip"):
+    """
+    Import a dump file written by `export_checkpoints`, in a single transaction.
+
+    Args:
+        conn: Autocommit connection whose search_path is the checkpoint schema
+        path: Dump file to read
+        on_conflict: "skip" to merge through staging tables, leaving existing rows as they
+            are, or "error" to copy straight into the tables and fail on duplicates
+
+    Returns:
+        dict: Number of rows imported per table
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"Unknown on_conflict mode {on_conflict!r}")
+
+    counts = {}
+    with conn.transaction(), conn.cursor() as cur:
+        for table, chunks in iter_dump(path):
+            target = table
+            if on_conflict == "skip":
+                target = f"bulk_import_{table}"
+                cur.execute(
+                    f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+            with cur.copy(
+                f"COPY {target} ({_columns_sql(table)}) FROM STDIN (FORMAT BINARY)"
+            ) as copy:
+                for data in chunks:
+                    copy.write(data)
+            counts[table] = cur.rowcount
+
+        if on_conflict == "skip":
+            # Merge every table in one round trip
+            cursors = {table: conn.cursor() for table in counts}
+            with conn.pipeline():
+                for table, merge_cur in cursors.items():
+                    merge_cur.execute(
+                        f"INSERT INTO {table} ({_columns_sql(table)}) "
+                        f"SELECT {_columns_sql(table)} FROM bulk_import_{table} "
+                        "ON CONFLICT DO NOTHING"
+                    )
+            for table, merge_cur in cursors.items():
+                counts[table] = merge_cur.rowcount
+                merge_cur.close()
+
+    logger.info(f"Imported checkpoints from {path}: {counts}")
+    return counts
+
+
+def _binary_field(value):
+    if value is None:
+        return _field_null
+    return _field_size.pack(len(value)) + value
+
+
+def _binary_row_tail(values):
+    """
+    Encode fields (bytes, or None for NULL) in binary COPY format, without the field count.
+    """
+    return b"".join(_binary_field(value) for value in values)
+
+
+def _copy_rows(cur, table, rows):
+    """
+    COPY pre-encoded binary rows into a table, sending them in buffered chunks.
+    """
+    with cur.copy(f"COPY {table} ({_columns_sql(table)}) FROM STDIN (FORMAT BINARY)") as copy:
+        buffer = bytearray(COPY_BINARY_HEADER)
+        for row in rows:
+            buffer += row
+            if len(buffer) >= COPY_BUFFER_SIZE:
+                copy.write(buffer)
+                buffer = bytearray()
+        buffer += COPY_BINARY_TRAILER
+        copy.write(buffer)
+    return cur.rowcount
+
+
+def seed_checkpoints(
+    conn, threads, checkpoints=10, prefix="seed", checkpoint_ns="", messages=1, serde=None
+):
+    """
+    Write synthetic threads straight into the checkpoint tables with binary COPY.
+
+    Each thread gets a chain of `checkpoints` checkpoints whose `messages` channel grows by
+    `messages` messages per step, stored as blobs like `PostgresSaver.put` does. Thread
+    IDs are `{prefix}-{n:08d}`. Checkpoint IDs only need to be unique within a thread, so
+    every thread shares the same IDs and payloads, encoded once per step; generating a
+    row costs little more than encoding its thread ID.
+
+    Args:
+        conn: Autocommit connection whose search_path is the checkpoint schema
+        threads: Number of threads to write
+        checkpoints: Checkpoints per thread
+        prefix: Thread ID prefix
+        checkpoint_ns: Namespace of every checkpoint
+        messages: Messages added per step
+        serde: Serializer for the channel blobs, defaults to `get_serializer()`
+
+    Returns:
+        dict: Number of rows written per table
+    """
+    serde = serde or get_serializer() or JsonPlusSerializer()
+    ts = datetime.now(timezone.utc).isoformat()
+    checkpoint_ids = [str(uuid6(clock_seq=step)) for step in range(checkpoints)]
+
+    blob_tails, checkpoint_tails = [], []
+    for step, checkpoint_id in enumerate(checkpoint_ids):
+        version = f"{step + 1:032}.{0.0:016}"
+        typ, blob = serde.dumps_typed([f"message {n}" for n in range((step + 1) * messages)])
+        checkpoint = {
+            "v": 1,
+            "id": checkpoint_id,
+            "ts": ts,
+            "channel_versions": {"messages": version},
+            "versions_seen": {},
+            "pending_sends": [],
+        }
+        metadata = {"source": "input" if step == 0 else "loop", "step": step, "writes": None}
+        blob_tails.append(_binary_row_tail([b"messages", version.encode(), typ.encode(), blob]))
+        checkpoint_tails.append(
+            _binary_row_tail(
+                [
+                    checkpoint_id.encode(),
+                    checkpoint_ids[step - 1].encode() if step else None,
+                    None,
+                    JSONB_VERSION + json.dumps(checkpoint).encode(),
+                    JSONB_VERSION + json.dumps(metadata).encode(),
+                ]
+            )
+        )
+
+    def rows(field_count, tails):
+        ns = _binary_field(checkpoint_ns.encode())
+        for n in range(threads):
+            head = _field_count.pack(field_count) + _binary_field(f"{prefix}-{n:08d}".encode()) + ns
+            for tail in tails:
+                yield head + tail
+
+    counts = {}
+    with conn.transaction(), conn.cursor() as cur:
+        counts["checkpoint_blobs"] = _copy_rows(
+            cur, "checkpoint_blobs", rows(len(BULK_COLUMNS["checkpoint_blobs"]), blob_tails)
+        )
+        counts["checkpoints"] = _copy_rows(
+            cur, "checkpoints", rows(len(BULK_COLUMNS["checkpoints"]), checkpoint_tails)
+        )
+
+    logger.info(f"Seeded {threads} threads: {counts}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk checkpoint export, import and seeding")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export checkpoints to a dump file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--thread-id", action="append", dest="thread_ids")
+    export_parser.add_argument("--checkpoint-ns", action="append")
+
+    import_parser = commands.add_parser("import", help="import a dump file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--on-conflict", choices=CONFLICT_MODES, default="skip")
+
+    seed_parser = commands.add_parser("seed", help="write synthetic threads for load tests")
+    seed_parser.add_argument("--threads", type=int, required=True)
+    seed_parser.add_argument("--checkpoints", type=int, default=10, help="per thread")
+    seed_parser.add_argument("--prefix", default="seed")
+    seed_parser.add_argument("--checkpoint-ns", default="")
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    with get_db_connection() as conn:
+        if args.command == "export":
+            counts = export_checkpoints(conn, args.path, args.thread_ids, args.checkpoint_ns)
+        elif args.command == "import":
+            counts = import_checkpoints(conn, args.path, args.on_conflict)
+        else:
+            counts = seed_checkpoints(
+                conn, args.threads, args.checkpoints, args.prefix, args.checkpoint_ns
+            )
+    logger.info(f"{args.command} complete in {time.perf_counter() - begin:.1f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
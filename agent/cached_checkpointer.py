@@ -0,0 +1,350 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from langgraph.checkpoint.base import CheckpointTuple, get_checkpoint_id
+from agent.delegating_checkpointer import DelegatingCheckpointSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ByteLRUCache:
+    """
+    In-process LRU cache of serialized values, bounded by total bytes rather than entries.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, data, generation=None):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (data, generation)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def discard_thread(self, thread_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[0])
+
+
+class FileCacheTier:
+    """
+    Shared cache tier storing serialized tuples as files under a local directory.
+
+    Every process on the host pointing at the same directory shares the tier. Each key
+    and each thread also has a generation counter that is bumped on invalidation, so
+    in-process copies held by other processes can be detected as stale.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha256(repr(value).encode()).hexdigest()
+
+    def _thread_dir(self, thread_id):
+        return os.path.join(self.directory, self._digest(thread_id))
+
+    def _path(self, key):
+        return os.path.join(self._thread_dir(key[0]), self._digest(key[1:]))
+
+    def _generation_path(self, key):
+        return f"{self._path(key)}.generation"
+
+    def _thread_generation_path(self, thread_id):
+        return os.path.join(self._thread_dir(thread_id), "thread.generation")
+
+    def _write(self, path, data):
+        # Write to a temporary file and rename it, so readers never see partial files
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        """
+        Get a cached value, unless it was stored before the key's last invalidation.
+        """
+        try:
+            with open(self._path(key), "rb") as f:
+                header, data = f.read().split(b"\n", 1)
+        except (FileNotFoundError, ValueError):
+            return None
+        return data if header == self.header(key) else None
+
+    def set(self, key, data, header=None):
+        self._write(self._path(key), (header or self.header(key)) + b"\n" + data)
+
+    def header(self, key):
+        """
+        Get the generation header stored with, and checked against, a cached value.
+        """
+        return repr(self.generation(key)).encode()
+
+    def discard(self, key):
+        self._remove(self._path(key))
+
+    def discard_thread(self, thread_id):
+        # Keep the generation files, so other processes can't mistake reset counters
+        # for unchanged ones
+        thread_dir = self._thread_dir(thread_id)
+        if os.path.isdir(thread_dir):
+            for name in os.listdir(thread_dir):
+                if not name.endswith((".generation", ".tmp")):
+                    self._remove(os.path.join(thread_dir, name))
+        self._bump(self._thread_generation_path(thread_id))
+
+    def generation(self, key):
+        """
+        Get the (thread, key) invalidation generations shared by every process.
+        """
+        return (
+            self._read_counter(self._thread_generation_path(key[0])),
+            self._read_counter(self._generation_path(key)),
+        )
+
+    def bump_generation(self, key):
+        self._bump(self._generation_path(key))
+
+    def _read_counter(self, path):
+        try:
+            with open(path) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump(self, path):
+        self._write(path, str(self._read_counter(path) + 1).encode())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CachingCheckpointSaver(DelegatingCheckpointSaver):
+    """
+    Read-through cache for `get_tuple` / `aget_tuple` around another checkpoint saver.
+
+    Tuples are cached per (thread_id, checkpoint_ns, checkpoint_id), with checkpoint_id
+    None standing for the thread's latest checkpoint. Entries are invalidated on writes:
+      * put/aput drops the latest entry for the thread and namespace,
+      * put_writes/aput_writes drops that checkpoint's entry and the latest entry,
+      * delete_thread drops every entry of the thread.
+
+    The in-process tier is an LRU bounded by bytes; the optional shared tier
+    (e.g. FileCacheTier) is consulted on in-process misses.
+    """
+
+    def __init__(self, saver, max_bytes=DEFAULT_CACHE_BYTES, shared_tier=None):
+        super().__init__(saver)
+        self.memory = ByteLRUCache(max_bytes)
+        self.shared = shared_tier
+        self.metrics = {
+            "hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+        }
+        # Invalidation counters in this process, per cache key, per thread and per
+        # (thread_id, checkpoint_ns)
+        self._generations = {}
+        self._thread_generations = {}
+        self._namespace_writes = {}
+
+    def stats(self):
+        """
+        Get the cache hit/miss/eviction counters and current size.
+        """
+        return {
+            **self.metrics,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+        }
+
+    @staticmethod
+    def _key(config):
+        return (
+            config["configurable"]["thread_id"],
+            config["configurable"].get("checkpoint_ns", ""),
+            get_checkpoint_id(config),
+        )
+
+    def _generation(self, key):
+        """
+        Get the invalidation generation of a cache key, in this process and shared.
+        """
+        local = (self._thread_generations.get(key[0], 0), self._generations.get(key, 0))
+        return (local, self.shared.generation(key)) if self.shared else (local, None)
+
+    def _dumps(self, checkpoint_tuple):
+        """
+        Serialize a tuple with the saver's serializer, so cache files can't carry pickles.
+
+        Pending write values are serialized one by one, as the saver stores them.
+        """
+        config, checkpoint, metadata, parent_config, pending_writes = checkpoint_tuple
+        writes = [
+            (task_id, channel, *self.serde.dumps_typed(value))
+            for task_id, channel, value in pending_writes or ()
+        ]
+        type_, data = self.serde.dumps_typed((config, checkpoint, metadata, parent_config, writes))
+        return type_.encode() + b"\n" + data
+
+    def _loads(self, data):
+        type_, data = data.split(b"\n", 1)
+        config, checkpoint, metadata, parent_config, writes = self.serde.loads_typed(
+            (type_.decode(), data)
+        )
+        pending_writes = [
+            (task_id, channel, self.serde.loads_typed((value_type, value)))
+            for task_id, channel, value_type, value in writes
+        ]
+        return CheckpointTuple(config, checkpoint, metadata, parent_config, pending_writes)
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            data, generation = entry
+            if generation == self._generation(key):
+                self.metrics["hits"] += 1
+                return self._loads(data)
+            self.memory.discard(key)
+
+        if self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                self.metrics["shared_hits"] += 1
+                self.memory.set(key, data, self._generation(key))
+                return self._loads(data)
+
+        self.metrics["misses"] += 1
+        return None
+
+    def _store(self, key, checkpoint_tuple, writes_seen):
+        # Skip tuples read while the thread was written to, here or in another process
+        if checkpoint_tuple is None or writes_seen != self._writes_seen(key):
+            return
+        data = self._dumps(checkpoint_tuple)
+        checkpoint_id = checkpoint_tuple.config["configurable"]["checkpoint_id"]
+        for cache_key in {key, (*key[:2], checkpoint_id)}:
+            self.memory.set(cache_key, data, self._generation(cache_key))
+            if self.shared is not None:
+                # Stamp the requested key with the generation seen before the read
+                header = writes_seen[2] if cache_key == key else None
+                self.shared.set(cache_key, data, header)
+
+    def _writes_seen(self, key):
+        return (
+            self._thread_generations.get(key[0], 0),
+            self._namespace_writes.get(key[:2], 0),
+            self.shared.header(key) if self.shared is not None else None,
+        )
+
+    def _invalidate(self, thread_id, checkpoint_ns, checkpoint_id=None):
+        keys = [(thread_id, checkpoint_ns, None)]
+        if checkpoint_id is not None:
+            keys.append((thread_id, checkpoint_ns, checkpoint_id))
+
+        self._namespace_writes[(thread_id, checkpoint_ns)] = (
+            self._namespace_writes.get((thread_id, checkpoint_ns), 0) + 1
+        )
+        for key in keys:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self.memory.discard(key)
+            if self.shared is not None:
+                self.shared.discard(key)
+                self.shared.bump_generation(key)
+        self.metrics["invalidations"] += 1
+
+    def _invalidate_thread(self, thread_id):
+        self._thread_generations[thread_id] = self._thread_generations.get(thread_id, 0) + 1
+        self.memory.discard_thread(thread_id)
+        if self.shared is not None:
+            self.shared.discard_thread(thread_id)
+        self.metrics["invalidations"] += 1
+
+    def get_tuple(self, config):
+        key = self._key(config)
+        checkpoint_tuple = self._lookup(key)
+        if checkpoint_tuple is None:
+            writes_seen = self._writes_seen(key)
+            checkpoint_tuple = self.saver.get_tuple(config)
+            self._store(key, checkpoint_tuple, writes_seen)
+        return checkpoint_tuple
+
+    async def aget_tuple(self, config):
+        key = self._key(config)
+        checkpoint_tuple = self._lookup(key)
+        if checkpoint_tuple is None:
+            writes_seen = self._writes_seen(key)
+            checkpoint_tuple = await self.saver.aget_tuple(config)
+            self._store(key, checkpoint_tuple, writes_seen)
+        return checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._invalidate(*self._key(config)[:2])
+        return next_config
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._invalidate(*self._key(config)[:2])
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.saver.put_writes(config, writes, task_id, task_path)
+        self._invalidate(*self._key(config))
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+        self._invalidate(*self._key(config))
+
+    def delete_thread(self, thread_id):
+        self.saver.delete_thread(thread_id)
+        self._invalidate_thread(thread_id)
+
+    async def adelete_thread(self, thread_id):
+        await self.saver.adelete_thread(thread_id)
+        self._invalidate_thread(thread_id)
@@ -1,10 +1,17 @@
 import os
+import re
 import dotenv
 import urllib.parse
 import logging
+import asyncio
+import threading
 import psycopg
-from langgraph.checkpoint.postgres import PostgresSaver
-from psycopg_pool import AsyncConnectionPool
+from psycopg.conninfo import conninfo_to_dict
+from langgraph.checkpoint.postgres import PostgresSaver, _internal, _ainternal
+from psycopg_pool import ConnectionPool
+from agent.serde import get_serializer
+from agent.instrumentation import InstrumentedCheckpointSaver
+from agent import partitions
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,9 +19,69 @@ dotenv.load_dotenv()
 
 connection_kwargs = {
     "autocommit": True,
-    "prepare_threshold": 0,
 }
 
+# Prepared statement modes selectable with SUPABASE_DB_PREPARE
+PREPARE_MODES = ("auto", "on", "off")
+
+# Transaction-mode poolers (pgbouncer, Supavisor on port 6543) hand each transaction to
+# any server connection, so a statement prepared in one may not exist in the next
+POOLER_PORTS = ("6543",)
+POOLER_HOST_MARKERS = ("pgbouncer",)
+
+# Checkpoint backends selectable with CHECKPOINT_BACKEND
+CHECKPOINT_BACKENDS = ("postgres", "sqlite")
+
+# Tables holding checkpoint data, in the order rows are purged
+CHECKPOINT_TABLES = ["checkpoint_blobs", "checkpoint_writes", "checkpoints"]
+PURGE_COLUMNS = ("thread_id", "checkpoint_ns")
+PURGE_BATCH_SIZE = 500
+
+# The schema version the checkpoint tables are migrated to
+SCHEMA_MIGRATION_VERSION = len(PostgresSaver.MIGRATIONS) - 1
+
+# Indexes for our own access patterns, on top of the saver's migrations. They are applied
+# in order by the bootstrap and recorded in checkpoint_index_migrations (separate from the
+# saver's checkpoint_migrations), so appending an entry migrates existing databases.
+INDEX_MIGRATIONS = [
+    "CREATE TABLE IF NOT EXISTS checkpoint_index_migrations (v INTEGER PRIMARY KEY);",
+    # Purging by namespace, which otherwise scans every checkpoint table
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS checkpoints_checkpoint_ns_idx ON checkpoints(checkpoint_ns);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS checkpoint_blobs_checkpoint_ns_idx ON checkpoint_blobs(checkpoint_ns);",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS checkpoint_writes_checkpoint_ns_idx ON checkpoint_writes(checkpoint_ns);",
+    # list(filter=...), which matches with `metadata @> filter`
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS checkpoints_metadata_idx ON checkpoints USING GIN (metadata jsonb_path_ops);",
+]
+INDEX_MIGRATION_VERSION = len(INDEX_MIGRATIONS) - 1
+
+# A concurrent index build that fails leaves an INVALID index behind, which queries don't
+# use and `CREATE INDEX IF NOT EXISTS` then skips
+INVALID_INDEX_SQL = """
+    SELECT 1 FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relname = %s AND NOT i.indisvalid;
+"""
+
+MIGRATION_TABLES = ("checkpoint_migrations", "checkpoint_index_migrations")
+MIGRATION_TABLES_SQL = """
+    SELECT table_name FROM information_schema.tables
+    WHERE table_schema = current_schema()
+    AND table_name = ANY(%s);
+"""
+
+# The process-wide pools shared by every synchronous PostgresSaver, keyed by (DSN, schema)
+_sync_pools = {}
+_sync_pool_lock = threading.Lock()
+
+# Schemas already bootstrapped by this process, keyed by (DSN, schema, migration versions)
+_bootstrapped = set()
+_bootstrap_lock = threading.Lock()
+_abootstrap_lock = None
+
+# Number of bootstrap queries and setup() calls that actually ran in this process
+bootstrap_stats = {"queries": 0, "setups": 0}
+
 
 def get_db_connection_string():
     """
@@ -33,129 +100,600 @@ def get_db_connection_string():
     )
 
 
-async def get_db_connection(conn_string, **kwargs):
+def redact_dsn(conn_string):
+    """
+    Mask the password in a connection string so it can be logged.
+    """
+    parts = urllib.parse.urlsplit(conn_string)
+    if parts.password is None:
+        return conn_string
+    netloc = parts.netloc.rsplit("@", 1)
+    userinfo = netloc[0].split(":", 1)[0]
+    return urllib.parse.urlunsplit(parts._replace(netloc=f"{userinfo}:****@{netloc[1]}"))
+
+
+def get_db_schema():
+    """
+    Get the schema holding the checkpoint tables, from SUPABASE_DB_SCHEMA.
+    """
+    return os.environ.get("SUPABASE_DB_SCHEMA", "langgraph")
+
+
+def get_pool_settings():
+    """
+    Get the connection pool settings shared by the sync and async pools from environment variables.
+    """
+    return {
+        "min_size": int(os.environ.get("SUPABASE_DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.environ.get("SUPABASE_DB_POOL_MAX_SIZE", 20)),
+        "timeout": float(os.environ.get("SUPABASE_DB_POOL_TIMEOUT", 30.0)),
+        "max_idle": float(os.environ.get("SUPABASE_DB_POOL_MAX_IDLE", 600.0)),
+        "max_lifetime": float(os.environ.get("SUPABASE_DB_POOL_MAX_LIFETIME", 3600.0)),
+    }
+
+
+def get_prepare_settings():
+    """
+    Get the prepared statement settings from environment variables.
+
+    SUPABASE_DB_PREPARE is `on`, `off` or `auto` (the default), which prepares statements
+    unless the DSN points at a transaction-mode pooler. Repeated queries are prepared on
+    their SUPABASE_DB_PREPARE_THRESHOLD-th execution and the last SUPABASE_DB_PREPARED_MAX
+    of them are kept on each connection.
+    """
+    mode = os.environ.get("SUPABASE_DB_PREPARE", "auto").lower()
+    if mode not in PREPARE_MODES:
+        raise ValueError(f"Unknown SUPABASE_DB_PREPARE {mode!r}")
+    return {
+        "mode": mode,
+        "threshold": int(os.environ.get("SUPABASE_DB_PREPARE_THRESHOLD", 1)),
+        "max": int(os.environ.get("SUPABASE_DB_PREPARED_MAX", 100)),
+    }
+
+
+def is_transaction_pooler(conn_string):
+    """
+    Whether a connection string looks like it goes through a transaction-mode pooler.
+    """
+    params = conninfo_to_dict(conn_string)
+    host, port = str(params.get("host", "")).lower(), str(params.get("port", ""))
+    return port in POOLER_PORTS or any(marker in host for marker in POOLER_HOST_MARKERS)
+
+
+def get_prepare_kwargs(conn_string, settings=None):
+    """
+    Get the `prepare_threshold` connection argument for a connection string.
+
+    Args:
+        conn_string: The connection string, checked for a pooler in `auto` mode
+        settings: Prepared statement settings, defaults to `get_prepare_settings()`
+    """
+    settings = settings or get_prepare_settings()
+    if settings["mode"] == "auto":
+        enabled = not is_transaction_pooler(conn_string)
+    else:
+        enabled = settings["mode"] == "on"
+    return {"prepare_threshold": settings["threshold"] if enabled else None}
+
+
+def configure_connection(conn, settings=None):
+    """
+    Size a new connection's prepared statement cache; used as the sync pool's `configure`.
+    """
+    conn.prepared_max = (settings or get_prepare_settings())["max"]
+
+
+async def aconfigure_connection(conn, settings=None):
+    """
+    Asynchronous counterpart of `configure_connection`, used as the async pool's `configure`.
+    """
+    configure_connection(conn, settings)
+
+
+def get_connection_kwargs(schema_name=None, conn_string=None):
+    """
+    Get the keyword arguments every checkpoint connection is opened with.
+
+    Args:
+        schema_name: Schema put on the search path, defaults to `get_db_schema()`
+        conn_string: The connection string, defaults to `get_db_connection_string()`
+    """
+    return {
+        **connection_kwargs,
+        **get_prepare_kwargs(conn_string or get_db_connection_string()),
+        "options": f"-c search_path={schema_name or get_db_schema()}",
+    }
+
+
+def get_db_connection(schema_name=None):
     """
-    Get a connection to the PostgreSQL database.
+    Open a single connection to the PostgreSQL database, for scripts and maintenance jobs.
+
+    Checkpointers should use the pool from `get_sync_pool` instead.
     """
     logger.info("Creating synchronous connection to DB")
-    return psycopg.connect(conn_string, **kwargs)
+    db_connection_string = get_db_connection_string()
+    conn = psycopg.connect(
+        db_connection_string, **get_connection_kwargs(schema_name, db_connection_string)
+    )
+    configure_connection(conn)
+    return conn
 
 
-async def aget_db_connection(conn_string, **kwargs):
+def get_sync_pool(schema_name=None):
     """
-    Get an asynchronous connection to the PostgreSQL database.
+    Get the process-wide synchronous connection pool for a schema, opening it on first use.
+
+    The pool is sized and configured like the async pool (see `get_pool_settings`), waits
+    until `min_size` connections are warmed and checks every connection's health before
+    handing it out, so one PostgresSaver can serve many worker threads.
+
+    Args:
+        schema_name: Schema put on the search path, defaults to `get_db_schema()`
+
+    Returns:
+        ConnectionPool: The shared, open connection pool
     """
-    logger.info(f"Creating async connection to DB: {conn_string}")
-    async with AsyncConnectionPool(conninfo=conn_string, max_size=15, **kwargs) as pool:
-        logger.info("Async connection pool created")
+    schema_name = schema_name or get_db_schema()
+    db_connection_string = get_db_connection_string()
+    key = (db_connection_string, schema_name)
+
+    with _sync_pool_lock:
+        pool = _sync_pools.get(key)
+        if pool is not None and not pool.closed:
+            return pool
+
+        settings = get_pool_settings()
+        logger.info(
+            f"Opening connection pool to {redact_dsn(db_connection_string)} with schema [{schema_name}]"
+        )
+        pool = ConnectionPool(
+            conninfo=db_connection_string,
+            kwargs=get_connection_kwargs(schema_name, db_connection_string),
+            configure=configure_connection,
+            check=ConnectionPool.check_connection,
+            open=False,
+            **settings,
+        )
+        pool.open(wait=True, timeout=settings["timeout"])
+        logger.info(
+            f"Connection pool opened with {settings['min_size']}-{settings['max_size']} connections"
+        )
+
+        _sync_pools[key] = pool
         return pool
 
 
-async def set_schema(conn, schema_name):
+def close_sync_pool():
     """
-    Set the search path to the specified schema in the PostgreSQL database.
+    Close every process-wide synchronous connection pool.
     """
-    logger.info(f"Setting schema to {schema_name}")
-    try:
-        with conn.cursor() as cur:
-            cur.execute(f"SET search_path TO {schema_name};")
-    except Exception as e:
-        logger.error(f"Error setting schema: {e}")
-        raise e
+    with _sync_pool_lock:
+        pools = list(_sync_pools.values())
+        _sync_pools.clear()
+
+    for pool in pools:
+        if not pool.closed:
+            logger.info("Closing connection pool")
+            pool.close()
+
+
+def _versions_sql(tables):
+    return "SELECT " + ", ".join(
+        f"(SELECT COALESCE(MAX(v), -1) FROM {table})" if table in tables else "-1"
+        for table in MIGRATION_TABLES
+    )
 
 
-async def check_for_tables(conn):
+def get_schema_versions(conn):
     """
-    Check if the necessary tables exist in the PostgreSQL database.
+    Get the checkpoint schema and index migration versions applied in the current schema.
+
+    Returns:
+        tuple: (checkpoint version, index version), each -1 if none was applied
     """
-    table_exists = False
     with conn.cursor() as cur:
-        # Just check if the table existsm, don't create it
-        cur.execute(
-            f"""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'checkpoints'
-            );
-        """
-        )
-        table_exists = cur.fetchone()[0]
-        if not table_exists:
-            logger.debug("The 'checkpoints' table does not exist, setup will be called")
-        else:
-            logger.debug("The 'checkpoints' table exists, setup will be skipped")
+        bootstrap_stats["queries"] += 1
+        cur.execute(MIGRATION_TABLES_SQL, (list(MIGRATION_TABLES),))
+        tables = {row[0] for row in cur.fetchall()}
+        if not tables:
+            logger.debug("The 'checkpoint_migrations' table does not exist")
+            return -1, -1
 
-        return table_exists
+        bootstrap_stats["queries"] += 1
+        cur.execute(_versions_sql(tables))
+        return tuple(cur.fetchone())
 
 
-async def get_sync_checkpointer():
+async def aget_schema_versions(conn):
     """
-    Get a synchronous PostgreSQL checkpointer instance. This is useful for testing locally.
+    Get the checkpoint schema and index migration versions applied in the current schema.
+
+    Returns:
+        tuple: (checkpoint version, index version), each -1 if none was applied
     """
-    DB_URI = os.environ.get("SUPABASE_DB_URI")
-    DB_SCHEMA = os.environ.get("SUPABASE_DB_SCHEMA", "langgraph")
+    async with conn.cursor() as cur:
+        bootstrap_stats["queries"] += 1
+        await cur.execute(MIGRATION_TABLES_SQL, (list(MIGRATION_TABLES),))
+        tables = {row[0] for row in await cur.fetchall()}
+        if not tables:
+            logger.debug("The 'checkpoint_migrations' table does not exist")
+            return -1, -1
 
-    logger.info(f"Creating direct database connection to {DB_URI}")
-    db_connection_string = get_db_connection_string()
-    conn = await get_db_connection(db_connection_string, **connection_kwargs)
+        bootstrap_stats["queries"] += 1
+        await cur.execute(_versions_sql(tables))
+        return tuple(await cur.fetchone())
 
-    logger.info(f"Connected to db, setting schema to {DB_SCHEMA}")
-    await set_schema(conn, DB_SCHEMA)
 
-    # Create the PostgresSaver instance
-    logger.info("Creating PostgresSaver instance from connection")
-    checkpointer = PostgresSaver(conn)
+def get_schema_version(conn):
+    """
+    Get the checkpoint schema migration version applied in the current schema, or -1 if none.
+    """
+    return get_schema_versions(conn)[0]
 
-    # Check if the table exists
-    logger.info("Schema set, checking if the 'checkpoints' table exists")
-    tables_exist = await check_for_tables(conn)
 
-    # Setup the checkpointer tables if they do not exist
-    if not tables_exist:
-        try:
-            logger.info(f"Setting up the checkpoint tables in schema {DB_SCHEMA}")
+async def aget_schema_version(conn):
+    """
+    Get the checkpoint schema migration version applied in the current schema, or -1 if none.
+    """
+    return (await aget_schema_versions(conn))[0]
+
+
+def _pending_index_migrations(version, concurrently=True):
+    return [
+        (v, migration if concurrently else migration.replace("CONCURRENTLY ", ""))
+        for v, migration in list(enumerate(INDEX_MIGRATIONS))[version + 1 :]
+    ]
+
+
+def _index_name(migration):
+    match = re.search(r"CREATE INDEX (?:CONCURRENTLY )?IF NOT EXISTS (\w+)", migration)
+    return match.group(1) if match else None
+
+
+def _drop_index_statement(index_name, concurrently=True):
+    return f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {index_name};"
+
+
+def migrate_indexes(conn, version=-1, concurrently=True):
+    """
+    Apply the index migrations after `version`, recording each one as it completes.
+
+    Indexes are built CONCURRENTLY so live traffic is not blocked, which requires an
+    autocommit connection. Partitioned tables do not support concurrent builds, so pass
+    `concurrently=False` for them. The checkpoint tables must already exist (see `setup()`).
+    An invalid index left by a failed build is dropped and built again before its
+    migration is recorded.
+    """
+    with conn.cursor() as cur:
+        for v, migration in _pending_index_migrations(version, concurrently):
+            cur.execute(migration)
+            index_name = _index_name(migration)
+            if index_name is not None:
+                cur.execute(INVALID_INDEX_SQL, (index_name,))
+                if cur.fetchone() is not None:
+                    logger.warning(f"Rebuilding index {index_name}, left invalid by a failed build")
+                    cur.execute(_drop_index_statement(index_name, concurrently))
+                    cur.execute(migration)
+            cur.execute(
+                "INSERT INTO checkpoint_index_migrations (v) VALUES (%s) ON CONFLICT DO NOTHING",
+                (v,),
+            )
+
+
+async def amigrate_indexes(conn, version=-1, concurrently=True):
+    """
+    Asynchronous counterpart of `migrate_indexes`.
+    """
+    async with conn.cursor() as cur:
+        for v, migration in _pending_index_migrations(version, concurrently):
+            await cur.execute(migration)
+            index_name = _index_name(migration)
+            if index_name is not None:
+                await cur.execute(INVALID_INDEX_SQL, (index_name,))
+                if await cur.fetchone() is not None:
+                    logger.warning(f"Rebuilding index {index_name}, left invalid by a failed build")
+                    await cur.execute(_drop_index_statement(index_name, concurrently))
+                    await cur.execute(migration)
+            await cur.execute(
+                "INSERT INTO checkpoint_index_migrations (v) VALUES (%s) ON CONFLICT DO NOTHING",
+                (v,),
+            )
+
+
+def _warn_unpartitioned(schema_name):
+    logger.warning(
+        f"SUPABASE_DB_PARTITIONING is set but the checkpoint tables in schema {schema_name} "
+        "already exist unpartitioned; they are not converted"
+    )
+
+
+def _get_bootstrap_key(conn_string, schema_name):
+    return (conn_string, schema_name, SCHEMA_MIGRATION_VERSION, INDEX_MIGRATION_VERSION)
+
+
+def bootstrap_schema(checkpointer, conn_string, schema_name):
+    """
+    Make sure the checkpoint tables and indexes in the schema are migrated to the current version.
+
+    The check runs once per (DSN, schema, migration versions) per process; later calls
+    return immediately without touching the database. With SUPABASE_DB_PARTITIONING set,
+    a new schema is created partitioned and its upcoming partitions are created (and
+    expired ones dropped) here; see `agent.partitions`.
+
+    Returns:
+        bool: True if the database was checked by this call, False if it was cached
+    """
+    key = _get_bootstrap_key(conn_string, schema_name)
+    if key in _bootstrapped:
+        return False
+
+    with _bootstrap_lock:
+        if key in _bootstrapped:
+            return False
+
+        settings = partitions.get_partition_settings()
+        with _internal.get_connection(checkpointer.conn) as conn:
+            version, index_version = get_schema_versions(conn)
+            if version < 0 and settings["mode"] != "none":
+                partitions.install_partitioned_schema(conn, settings)
+                version = SCHEMA_MIGRATION_VERSION
+            partitioned = settings["mode"] != "none" and partitions.is_partitioned(conn)
+
+        if version < SCHEMA_MIGRATION_VERSION:
+            logger.info(
+                f"Migrating the checkpoint tables in schema {schema_name} "
+                f"from version {version} to {SCHEMA_MIGRATION_VERSION}"
+            )
+            bootstrap_stats["setups"] += 1
             checkpointer.setup()
+
+        if index_version < INDEX_MIGRATION_VERSION:
+            logger.info(
+                f"Migrating the checkpoint indexes in schema {schema_name} "
+                f"from version {index_version} to {INDEX_MIGRATION_VERSION}"
+            )
+            with _internal.get_connection(checkpointer.conn) as conn:
+                migrate_indexes(conn, index_version, concurrently=not partitioned)
+
+        if settings["mode"] == "time" and partitioned:
+            with _internal.get_connection(checkpointer.conn) as conn:
+                partitions.maintain_partitions(conn, settings)
+        elif settings["mode"] != "none" and not partitioned:
+            _warn_unpartitioned(schema_name)
+
+        _bootstrapped.add(key)
+        return True
+
+
+async def abootstrap_schema(checkpointer, conn_string, schema_name):
+    """
+    Make sure the checkpoint tables and indexes in the schema are migrated to the current version.
+
+    Async counterpart of `bootstrap_schema`, sharing the same per-process cache.
+
+    Returns:
+        bool: True if the database was checked by this call, False if it was cached
+    """
+    key = _get_bootstrap_key(conn_string, schema_name)
+    if key in _bootstrapped:
+        return False
+
+    async with _get_abootstrap_lock():
+        if key in _bootstrapped:
+            return False
+
+        settings = partitions.get_partition_settings()
+        async with _ainternal.get_connection(checkpointer.conn) as conn:
+            version, index_version = await aget_schema_versions(conn)
+            if version < 0 and settings["mode"] != "none":
+                await partitions.ainstall_partitioned_schema(conn, settings)
+                version = SCHEMA_MIGRATION_VERSION
+            partitioned = settings["mode"] != "none" and await partitions.ais_partitioned(conn)
+
+        if version < SCHEMA_MIGRATION_VERSION:
+            logger.info(
+                f"Migrating the checkpoint tables in schema {schema_name} "
+                f"from version {version} to {SCHEMA_MIGRATION_VERSION}"
+            )
+            bootstrap_stats["setups"] += 1
+            await checkpointer.setup()
+
+        if index_version < INDEX_MIGRATION_VERSION:
+            logger.info(
+                f"Migrating the checkpoint indexes in schema {schema_name} "
+                f"from version {index_version} to {INDEX_MIGRATION_VERSION}"
+            )
+            async with _ainternal.get_connection(checkpointer.conn) as conn:
+                await amigrate_indexes(conn, index_version, concurrently=not partitioned)
+
+        if settings["mode"] == "time" and partitioned:
+            async with _ainternal.get_connection(checkpointer.conn) as conn:
+                await partitions.amaintain_partitions(conn, settings)
+        elif settings["mode"] != "none" and not partitioned:
+            _warn_unpartitioned(schema_name)
+
+        _bootstrapped.add(key)
+        return True
+
+
+def _get_abootstrap_lock():
+    """
+    Get the lock guarding async schema bootstrap, bound to the running event loop.
+    """
+    global _abootstrap_lock
+
+    loop = asyncio.get_running_loop()
+    if _abootstrap_lock is None or _abootstrap_lock[0] is not loop:
+        _abootstrap_lock = (loop, asyncio.Lock())
+    return _abootstrap_lock[1]
+
+
+def reset_bootstrap_cache():
+    """
+    Forget which schemas have been bootstrapped and reset the bootstrap counters.
+    """
+    _bootstrapped.clear()
+    bootstrap_stats["queries"] = 0
+    bootstrap_stats["setups"] = 0
+
+
+def get_checkpoint_backend():
+    """
+    Get the checkpoint backend selected by CHECKPOINT_BACKEND: postgres (default) or sqlite.
+    """
+    backend = os.environ.get("CHECKPOINT_BACKEND", "postgres").lower()
+    if backend not in CHECKPOINT_BACKENDS:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND {backend!r}")
+    return backend
+
+
+def instrumentation_enabled():
+    """
+    Whether checkpointers are wrapped with InstrumentedCheckpointSaver, per SUPABASE_DB_INSTRUMENT.
+    """
+    return os.environ.get("SUPABASE_DB_INSTRUMENT", "false").lower() in ("1", "true", "yes")
+
+
+def create_sync_checkpointer(serde=None, instrument=None):
+    """
+    Creates and returns a synchronous PostgreSQL checkpointer for use with LangGraph agents.
+
+    Every checkpointer shares the process-wide pool returned by `get_sync_pool`, so it is
+    safe to use from many threads at once. With CHECKPOINT_BACKEND=sqlite, returns an
+    embedded SQLite checkpointer instead (see `agent.sqlite_checkpointer`).
+
+    Args:
+        serde: Serializer for checkpoint blobs and writes, defaults to `get_serializer()`
+        instrument: Wrap the checkpointer with call metrics, defaults to `instrumentation_enabled()`
+
+    Returns:
+        PostgresSaver: Configured synchronous PostgreSQL checkpointer instance
+    """
+    if get_checkpoint_backend() == "sqlite":
+        from agent.sqlite_checkpointer import get_sqlite_checkpointer
+
+        checkpointer = get_sqlite_checkpointer(serde=serde)
+    else:
+        DB_SCHEMA = get_db_schema()
+
+        pool = get_sync_pool(DB_SCHEMA)
+        checkpointer = PostgresSaver(pool, serde=serde or get_serializer())
+
+        # Create or migrate the checkpointer tables, once per process
+        try:
+            bootstrap_schema(checkpointer, pool.conninfo, DB_SCHEMA)
         except Exception as e:
             logger.error(
                 f"Error setting up the checkpointer tables in schema {DB_SCHEMA}: {e}"
             )
 
+    if instrument if instrument is not None else instrumentation_enabled():
+        checkpointer = InstrumentedCheckpointSaver(checkpointer)
+
     return checkpointer
 
 
-async def delete_checkpoints(thread_id="", checkpoint_ns="", **connection_kwargs):
+async def get_sync_checkpointer(serde=None, instrument=None):
     """
-    Delete checkpoints from the database for a specific thread ID and/or namespace.
+    Get a synchronous checkpointer from `create_sync_checkpointer`, for async callers and tests.
     """
-    DB_SCHEMA = os.environ.get("SUPABASE_DB_SCHEMA", "langgraph")
+    return create_sync_checkpointer(serde=serde, instrument=instrument)
 
-    if not thread_id and not checkpoint_ns:
+
+def get_purge_query(column):
+    """
+    Build a single statement that deletes the rows matching an array of `column` values
+    from every checkpoint table and returns the number of rows deleted from each.
+    """
+    if column not in PURGE_COLUMNS:
+        raise ValueError(f"Cannot purge checkpoints by column {column!r}")
+
+    deletes = ",\n".join(
+        f"deleted_{table} AS (DELETE FROM {table} WHERE {column} = ANY(%(values)s) RETURNING 1)"
+        for table in CHECKPOINT_TABLES
+    )
+    counts = ", ".join(f"(SELECT count(*) FROM deleted_{table})" for table in CHECKPOINT_TABLES)
+    return f"WITH {deletes}\nSELECT {counts};"
+
+
+def iter_purge_batches(thread_ids=None, checkpoint_ns=None, batch_size=PURGE_BATCH_SIZE):
+    """
+    Split the thread IDs and namespaces to purge into (column, values) batches.
+    """
+    if not thread_ids and not checkpoint_ns:
         raise ValueError(
-            "either thread_id or checkpoint_ns is required to delete checkpoints."
+            "either thread_ids or checkpoint_ns is required to purge checkpoints."
         )
+    # A string would be purged character by character
+    for name, values in (("thread_ids", thread_ids), ("checkpoint_ns", checkpoint_ns)):
+        if isinstance(values, (str, bytes)):
+            raise TypeError(
+                f"{name} must be a list of values, not a single {type(values).__name__}."
+            )
 
-    db_connection_string = get_db_connection_string()
-    conn = await get_db_connection(db_connection_string, **connection_kwargs)
+    for column, values in (("thread_id", thread_ids), ("checkpoint_ns", checkpoint_ns)):
+        values = [str(value) for value in dict.fromkeys(values or [])]
+        for i in range(0, len(values), batch_size):
+            yield column, values[i : i + batch_size]
 
-    logger.info(f"Connected to db, setting schema to {DB_SCHEMA}")
-    await set_schema(conn, DB_SCHEMA)
 
-    # use the connection to delete checkpoints
-    table_names = ["checkpoint_blobs", "checkpoint_writes", "checkpoints"]
-    with conn.cursor() as cur:
-        for table_name in table_names:
-            if thread_id:
-                cur.execute(
-                    f"DELETE FROM {table_name} WHERE thread_id = '%s'", (thread_id,)
-                )
-            if checkpoint_ns:
-                cur.execute(
-                    f"DELETE FROM {table_name} WHERE checkpoint_ns = '%s'",
-                    (checkpoint_ns,),
-                )
-            conn.commit()
-        logger.info(
-            f"Deleted checkpoints for thread_id: {thread_id}, checkpoint_ns: {checkpoint_ns}"
+def purge_checkpoints(
+    thread_ids=None, checkpoint_ns=None, batch_size=PURGE_BATCH_SIZE, conn=None
+):
+    """
+    Delete all checkpoints, writes and blobs for lists of thread IDs and/or namespaces.
+
+    Each batch of up to `batch_size` values is deleted from every checkpoint table in a
+    single statement (one round trip and one transaction per batch).
+
+    Args:
+        thread_ids: Thread IDs to purge
+        checkpoint_ns: Checkpoint namespaces to purge
+        batch_size: Maximum number of values bound to a single statement
+        conn: Connection or ConnectionPool to use, defaults to the shared pool
+
+    Returns:
+        dict: Number of rows deleted per table
+    """
+    counts = dict.fromkeys(CHECKPOINT_TABLES, 0)
+    batches = list(iter_purge_batches(thread_ids, checkpoint_ns, batch_size))
+
+    if conn is None:
+        conn = get_sync_pool()
+
+    with _internal.get_connection(conn) as db_conn:
+        for column, values in batches:
+            with db_conn.transaction(), db_conn.cursor() as cur:
+                cur.execute(get_purge_query(column), {"values": values})
+                for table, count in zip(CHECKPOINT_TABLES, cur.fetchone()):
+                    counts[table] += count
+
+    logger.info(f"Purged {len(batches)} batches of checkpoints: {counts}")
+    return counts
+
+
+async def delete_checkpoints(thread_id="", checkpoint_ns=""):
+    """
+    Delete checkpoints from the database for a specific thread ID and/or namespace.
+
+    The rows are deleted through the shared async pool (see
+    `agent.async_checkpointer.apurge_checkpoints`), so the event loop isn't blocked.
+    """
+    # Imported here, since agent.async_checkpointer imports this module
+    from agent.async_checkpointer import apurge_checkpoints
+
+    if not thread_id and not checkpoint_ns:
+        raise ValueError(
+            "either thread_id or checkpoint_ns is required to delete checkpoints."
         )
 
+    await apurge_checkpoints(
+        thread_ids=[thread_id] if thread_id else None,
+        checkpoint_ns=[checkpoint_ns] if checkpoint_ns else None,
+    )
+    logger.info(
+        f"Deleted checkpoints for thread_id: {thread_id}, checkpoint_ns: {checkpoint_ns}"
+    )
+
     return True
@@ -0,0 +1,301 @@
+"""
+Checkpoint compaction job.
+
+Bounds the size of the checkpoint tables by:
+  * purging threads whose latest checkpoint is older than a TTL,
+  * keeping only the latest N checkpoints (and their writes) per thread and namespace,
+    and the message snapshots they depend on,
+  * garbage-collecting channel blobs no remaining checkpoint references.
+
+With partitioned checkpoint tables (see agent/partitions.py), --partitions instead creates
+the upcoming time partitions and drops those older than --retention-days, which is much
+cheaper than deleting their rows.
+
+Threads are processed in keyset order in small batches, with an optional pause between
+batches, so the job can run beside live traffic. Progress is reported per batch and can
+be persisted to a state file, so a run stopped by --max-batches or interrupted resumes
+where it stopped. A run that reaches the last thread removes the state file, so the next
+one starts over from the first thread.
+
+Usage:
+    python -m agent.compaction --keep-last 20 --ttl-days 30 [--batch-size 100] \
+        [--pause 0.5] [--state-file compaction.state] [--max-batches N]
+    python -m agent.compaction --partitions [--retention-days 30]
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import dotenv
+from agent.checkpointer import get_db_connection, get_db_schema, purge_checkpoints
+from agent.partitions import get_partition_settings, is_partitioned, maintain_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+COMPACTION_BATCH_SIZE = 100
+
+SELECT_THREADS_SQL = """
+    SELECT thread_id, max((checkpoint->>'ts')::timestamptz) AS last_ts
+    FROM checkpoints
+    WHERE thread_id > %(after)s
+    GROUP BY thread_id
+    ORDER BY thread_id
+    LIMIT %(limit)s;
+"""
+
+# Delete all but the latest `keep_last` checkpoints per thread and namespace, along with
+# their writes. Writes of a deleted checkpoint that is the parent of a kept one are left
+# in place, because they hold the pending sends of the kept checkpoint. Checkpoints holding
+# the snapshots that kept ones store message deltas against (see
+# agent/delta_checkpointer.py) are kept too.
+TRIM_CHECKPOINTS_SQL = """
+    WITH ranked AS (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+               checkpoint -> 'delta_snapshots' AS delta_snapshots,
+               row_number() OVER (
+                   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+               ) AS rn
+        FROM checkpoints
+        WHERE thread_id = ANY(%(thread_ids)s)
+    ), snapshots AS (
+        SELECT k.thread_id, k.checkpoint_ns, s.value AS checkpoint_id
+        FROM ranked k, jsonb_each_text(k.delta_snapshots) s
+        WHERE k.rn <= %(keep_last)s
+    ), doomed AS (
+        SELECT thread_id, checkpoint_ns, checkpoint_id FROM ranked WHERE rn > %(keep_last)s
+        EXCEPT
+        SELECT thread_id, checkpoint_ns, checkpoint_id FROM snapshots
+    ), deleted_writes AS (
+        DELETE FROM checkpoint_writes w
+        USING doomed d
+        WHERE w.thread_id = d.thread_id
+            AND w.checkpoint_ns = d.checkpoint_ns
+            AND w.checkpoint_id = d.checkpoint_id
+            AND NOT EXISTS (
+                SELECT 1 FROM ranked k
+                WHERE k.rn <= %(keep_last)s
+                    AND k.thread_id = d.thread_id
+                    AND k.checkpoint_ns = d.checkpoint_ns
+                    AND k.parent_checkpoint_id = d.checkpoint_id
+            )
+        RETURNING 1
+    ), deleted_checkpoints AS (
+        DELETE FROM checkpoints c
+        USING doomed d
+        WHERE c.thread_id = d.thread_id
+            AND c.checkpoint_ns = d.checkpoint_ns
+            AND c.checkpoint_id = d.checkpoint_id
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM deleted_checkpoints), (SELECT count(*) FROM deleted_writes);
+"""
+
+# Delete the blobs of the given threads that no remaining checkpoint references
+GC_BLOBS_SQL = """
+    WITH live AS (
+        SELECT DISTINCT c.thread_id, c.checkpoint_ns, v.key AS channel, v.value AS version
+        FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'channel_versions') v
+        WHERE c.thread_id = ANY(%(thread_ids)s)
+    ), deleted_blobs AS (
+        DELETE FROM checkpoint_blobs b
+        WHERE b.thread_id = ANY(%(thread_ids)s)
+            AND NOT EXISTS (
+                SELECT 1 FROM live l
+                WHERE l.thread_id = b.thread_id
+                    AND l.checkpoint_ns = b.checkpoint_ns
+                    AND l.channel = b.channel
+                    AND l.version = b.version
+            )
+        RETURNING 1
+    )
+    SELECT count(*) FROM deleted_blobs;
+"""
+
+
+def read_state(state_file):
+    """
+    Read the last processed thread ID from a compaction state file.
+    """
+    if not state_file or not os.path.exists(state_file):
+        return ""
+    with open(state_file) as f:
+        return f.read().strip()
+
+
+def write_state(state_file, thread_id):
+    """
+    Persist the last processed thread ID so an interrupted run can resume.
+    """
+    if not state_file:
+        return
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, "w") as f:
+        f.write(thread_id)
+    os.replace(tmp_file, state_file)
+
+
+def clear_state(state_file):
+    """
+    Remove the state file once a run has covered every thread.
+    """
+    if state_file and os.path.exists(state_file):
+        os.remove(state_file)
+
+
+def compact_batch(conn, thread_ids, keep_last=None):
+    """
+    Trim checkpoints and garbage-collect blobs for one batch of threads.
+
+    Returns:
+        dict: Number of checkpoints, writes and blobs deleted
+    """
+    counts = {"checkpoints": 0, "checkpoint_writes": 0, "checkpoint_blobs": 0}
+    if not thread_ids:
+        return counts
+
+    with conn.transaction(), conn.cursor() as cur:
+        if keep_last is not None:
+            cur.execute(
+                TRIM_CHECKPOINTS_SQL, {"thread_ids": thread_ids, "keep_last": keep_last}
+            )
+            counts["checkpoints"], counts["checkpoint_writes"] = cur.fetchone()
+
+        cur.execute(GC_BLOBS_SQL, {"thread_ids": thread_ids})
+        counts["checkpoint_blobs"] = cur.fetchone()[0]
+
+    return counts
+
+
+def run_compaction(
+    conn,
+    keep_last=None,
+    ttl=None,
+    batch_size=COMPACTION_BATCH_SIZE,
+    pause=0.0,
+    start_after="",
+    state_file=None,
+    max_batches=None,
+):
+    """
+    Compact the checkpoint tables in resumable, rate-limited batches of threads.
+
+    Args:
+        conn: Connection to the checkpoint database, with search_path set to its schema
+        keep_last: Number of checkpoints to keep per thread and namespace, None keeps all
+        ttl: timedelta after which an idle thread is purged, None disables expiry
+        batch_size: Number of threads processed per batch
+        pause: Seconds to sleep between batches
+        start_after: Resume after this thread ID (overrides the state file)
+        state_file: File recording the last processed thread ID, removed when the run
+            reaches the last thread
+        max_batches: Stop after this many batches, None runs to completion
+
+    Returns:
+        dict: Totals of threads scanned/expired, rows deleted and the last thread ID
+    """
+    if keep_last is not None and keep_last < 1:
+        raise ValueError("keep_last must be at least 1")
+
+    after = start_after or read_state(state_file)
+    totals = {
+        "batches": 0,
+        "threads": 0,
+        "expired_threads": 0,
+        "checkpoints": 0,
+        "checkpoint_writes": 0,
+        "checkpoint_blobs": 0,
+        "last_thread_id": after,
+    }
+    cutoff = datetime.now(timezone.utc) - ttl if ttl is not None else None
+
+    while max_batches is None or totals["batches"] < max_batches:
+        with conn.cursor() as cur:
+            cur.execute(SELECT_THREADS_SQL, {"after": after, "limit": batch_size})
+            rows = cur.fetchall()
+        if not rows:
+            clear_state(state_file)
+            break
+
+        expired = [
+            thread_id
+            for thread_id, last_ts in rows
+            if cutoff is not None and last_ts is not None and last_ts < cutoff
+        ]
+        live = [thread_id for thread_id, _ in rows if thread_id not in expired]
+
+        if expired:
+            purged = purge_checkpoints(thread_ids=expired, conn=conn)
+            for table, count in purged.items():
+                totals[table] += count
+
+        for table, count in compact_batch(conn, live, keep_last).items():
+            totals[table] += count
+
+        after = rows[-1][0]
+        write_state(state_file, after)
+        totals["batches"] += 1
+        totals["threads"] += len(rows)
+        totals["expired_threads"] += len(expired)
+        totals["last_thread_id"] = after
+        logger.info(f"Compacted {len(rows)} threads up to {after!r}: {totals}")
+
+        if len(rows) < batch_size:
+            clear_state(state_file)
+            break
+        if pause:
+            time.sleep(pause)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the LangGraph checkpoint tables")
+    parser.add_argument("--keep-last", type=int, help="checkpoints kept per thread")
+    parser.add_argument("--ttl-days", type=float, help="purge threads idle this long")
+    parser.add_argument("--batch-size", type=int, default=COMPACTION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds between batches")
+    parser.add_argument("--start-after", default="", help="resume after this thread ID")
+    parser.add_argument("--state-file", help="file recording progress for resuming")
+    parser.add_argument("--max-batches", type=int)
+    parser.add_argument("--partitions", action="store_true", help="maintain time partitions")
+    parser.add_argument(
+        "--retention-days",
+        type=float,
+        help="drop partitions older than this, defaults to SUPABASE_DB_PARTITION_RETENTION_DAYS",
+    )
+    args = parser.parse_args()
+
+    if args.keep_last is None and args.ttl_days is None and not args.partitions:
+        parser.error("at least one of --keep-last, --ttl-days or --partitions is required")
+
+    DB_SCHEMA = get_db_schema()
+    with get_db_connection(DB_SCHEMA) as conn:
+        if args.partitions:
+            if not is_partitioned(conn):
+                parser.error(f"the checkpoint tables in schema {DB_SCHEMA} are not partitioned")
+            settings = get_partition_settings()
+            if args.retention_days is not None:
+                settings["retention_days"] = args.retention_days
+            logger.info(f"Partition maintenance complete: {maintain_partitions(conn, settings)}")
+            if args.keep_last is None and args.ttl_days is None:
+                return
+
+        totals = run_compaction(
+            conn,
+            keep_last=args.keep_last,
+            ttl=timedelta(days=args.ttl_days) if args.ttl_days is not None else None,
+            batch_size=args.batch_size,
+            pause=args.pause,
+            start_after=args.start_after,
+            state_file=args.state_file,
+            max_batches=args.max_batches,
+        )
+
+    logger.info(f"Compaction complete: {totals}")
+
+
+if __name__ == "__main__":
+    main()
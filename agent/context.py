@@ -0,0 +1,214 @@
+"""
+Conversation history trimming and rolling summaries for the react agent.
+
+State uses `add_messages`, so without trimming every turn sends, and every checkpoint
+stores, the whole history. `HistoryTrimmer` is a `pre_model_hook` that runs before each
+model call. Once the history passes `max_tokens`, it removes the oldest turns from state
+until at most `keep_tokens` remain. Cuts only fall before a human message, so a tool
+call is never separated from its result, and the current turn is always kept. With a
+`summary_model`, the removed turns are first folded into a rolling summary. The summary
+is stored in state under "summary" (see SummaryState), and `prompt()` adds it after the
+system prompt.
+
+Trimming to `keep_tokens`, rather than to just under `max_tokens`, means the summary
+model is called once every few turns, not on every turn.
+
+Message token counts are cached per message ID by `TokenCounter`, so each model call
+only counts the messages added since the last one.
+
+`get_history_trimmer()` builds the trimmer for `agent.graph.get_agent` from the
+HISTORY_* environment variables.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+import dotenv
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+from langgraph.constants import TAG_NOSTREAM
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+DEFAULT_MAX_COUNTED_MESSAGES = 100000
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Update the summary with the new messages. Keep names, facts, decisions and open "
+    "questions, drop small talk, and answer with the updated summary only."
+)
+
+
+class SummaryState(AgentState):
+    """
+    Agent state with the rolling summary of the turns trimmed from `messages`.
+    """
+
+    summary: NotRequired[str]
+
+
+class TokenCounter:
+    """
+    Token counts of messages, cached per message ID.
+    """
+
+    def __init__(self, count_tokens=count_tokens_approximately, max_entries=DEFAULT_MAX_COUNTED_MESSAGES):
+        self.count_tokens = count_tokens
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, message):
+        if message.id is None:
+            return self.count_tokens([message])
+        # The content length guards against a message replaced under the same ID
+        key = (message.id, len(str(message.content)))
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+        count = self.count_tokens([message])
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def count_text(self, text):
+        return self.count_tokens([SystemMessage(text)]) if text else 0
+
+
+def format_transcript(messages):
+    """
+    Render messages as "role: content" lines for the summary model.
+    """
+    lines = []
+    for message in messages:
+        role = message.type if message.type != "tool" else f"tool {message.name}"
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        for call in getattr(message, "tool_calls", None) or []:
+            content += f" [calls {call['name']}({call['args']})]"
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+class HistoryTrimmer:
+    """
+    pre_model_hook bounding the history to a token budget, with an optional rolling summary.
+    """
+
+    def __init__(self, max_tokens, keep_tokens=None, summary_model=None, counter=None):
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens if keep_tokens is not None else max_tokens // 2
+        if self.keep_tokens > self.max_tokens:
+            raise ValueError("keep_tokens must not be larger than max_tokens")
+        # Tagged so the summary's tokens don't show up in the graph's messages stream
+        self.summary_model = summary_model and summary_model.with_config(tags=[TAG_NOSTREAM])
+        self.counter = counter or TokenCounter()
+
+    def _cut(self, state):
+        """
+        Get the index of the first message to keep, or 0 to keep them all.
+        """
+        messages = state["messages"]
+        counts = [self.counter.count(message) for message in messages]
+        budget = self.max_tokens - self.counter.count_text(state.get("summary"))
+        if sum(counts) <= budget:
+            return 0
+
+        # Keep the longest run of whole turns within keep_tokens, and at least the last turn
+        cut, kept = 0, 0
+        for index in range(len(messages) - 1, -1, -1):
+            kept += counts[index]
+            if isinstance(messages[index], HumanMessage):
+                if cut and kept > self.keep_tokens:
+                    break
+                cut = index
+        return cut
+
+    def _summary_input(self, summary, dropped):
+        return [
+            SystemMessage(SUMMARY_PROMPT),
+            HumanMessage(
+                f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{format_transcript(dropped)}"
+            ),
+        ]
+
+    def _update(self, dropped, summary):
+        update = {"messages": [RemoveMessage(id=message.id) for message in dropped]}
+        if summary is not None:
+            update["summary"] = summary
+        logger.debug(f"Trimmed {len(dropped)} messages from the history")
+        return update
+
+    def trim(self, state):
+        cut = self._cut(state)
+        if not cut:
+            return {}
+        dropped = state["messages"][:cut]
+        summary = None
+        if self.summary_model is not None:
+            summary = self.summary_model.invoke(self._summary_input(state.get("summary"), dropped)).content
+        return self._update(dropped, summary)
+
+    async def atrim(self, state):
+        cut = self._cut(state)
+        if not cut:
+            return {}
+        dropped = state["messages"][:cut]
+        summary = None
+        if self.summary_model is not None:
+            response = await self.summary_model.ainvoke(self._summary_input(state.get("summary"), dropped))
+            summary = response.content
+        return self._update(dropped, summary)
+
+    def as_hook(self):
+        """
+        Get the trimmer as a pre_model_hook runnable for `create_react_agent`.
+        """
+        return RunnableLambda(self.trim, afunc=self.atrim, name="trim_history")
+
+    def prompt(self, system_prompt):
+        """
+        Get a `create_react_agent` prompt adding the summary after the system prompt.
+        """
+
+        def render(state):
+            messages = [SystemMessage(system_prompt)]
+            if state.get("summary"):
+                messages.append(SystemMessage(f"Summary of the earlier conversation:\n{state['summary']}"))
+            return messages + list(state["messages"])
+
+        return render
+
+
+def get_history_trimmer():
+    """
+    Get a HistoryTrimmer from environment variables, or None if HISTORY_MAX_TOKENS is unset.
+
+    HISTORY_KEEP_TOKENS defaults to half of HISTORY_MAX_TOKENS. HISTORY_SUMMARY=on folds
+    trimmed turns into a summary written by OpenAI's HISTORY_SUMMARY_MODEL
+    (gpt-4o-mini by default).
+    """
+    max_tokens = os.environ.get("HISTORY_MAX_TOKENS")
+    if not max_tokens:
+        return None
+    keep_tokens = os.environ.get("HISTORY_KEEP_TOKENS")
+
+    summary_model = None
+    if os.environ.get("HISTORY_SUMMARY", "off").lower() == "on":
+        from langchain_openai import ChatOpenAI
+
+        summary_model = ChatOpenAI(model=os.environ.get("HISTORY_SUMMARY_MODEL", "gpt-4o-mini"), temperature=0)
+
+    return HistoryTrimmer(
+        int(max_tokens),
+        keep_tokens=int(keep_tokens) if keep_tokens else None,
+        summary_model=summary_model,
+    )
@@ -0,0 +1,56 @@
+import logging
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DelegatingCheckpointSaver(BaseCheckpointSaver):
+    """
+    Base class of checkpoint saver wrappers, forwarding every call to the wrapped saver.
+
+    The wrapper shares the wrapped saver's serializer, config specs and channel versions.
+    Subclasses override only the calls they change and reach the wrapped saver as
+    `self.saver`.
+    """
+
+    def __init__(self, saver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    def get_tuple(self, config):
+        return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config):
+        return await self.saver.aget_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def alist(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.alist(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        return self.saver.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id):
+        return await self.saver.adelete_thread(thread_id)
@@ -0,0 +1,317 @@
+import logging
+from collections import OrderedDict
+from langgraph.checkpoint.base import get_checkpoint_id
+from agent.delegating_checkpointer import DelegatingCheckpointSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marker key of a stored delta record, as opposed to a plain (snapshot) message list
+DELTA_MARKER = "__messages_delta__"
+
+# Checkpoint key mapping each channel stored as a delta to the checkpoint holding its
+# snapshot. Compaction and partition retention keep the checkpoints listed there.
+SNAPSHOTS_KEY = "delta_snapshots"
+
+
+def is_delta(value):
+    return isinstance(value, dict) and DELTA_MARKER in value
+
+
+class DeltaMessagesSaver(DelegatingCheckpointSaver):
+    """
+    Checkpoint saver wrapper storing message-list channels as deltas.
+
+    With `add_messages`, every checkpoint's `messages` channel holds the whole
+    conversation, so a thread's stored history grows quadratically with its length.
+    This wrapper stores a full snapshot of the list every `snapshot_every` writes, and in
+    between only the messages appended since the snapshot, along with the ID of the
+    checkpoint holding it. A snapshot is also stored whenever the list was not simply
+    appended to (e.g. a message was replaced or removed), or the parent isn't the
+    thread's latest checkpoint known to this process.
+
+    Reads return the rebuilt message list, as a plain list, so serializers and other
+    readers see the whole history. A delta costs one extra read, of its snapshot, unless
+    this process wrote it; `list` reads each snapshot once. Plain lists already stored
+    are read as snapshots, so the wrapper can be introduced on an existing database.
+
+    Each checkpoint names the snapshots its deltas depend on under "delta_snapshots",
+    and the compaction job and partition retention (agent/compaction.py,
+    agent/partitions.py) keep those checkpoints along with the ones they retain.
+    """
+
+    def __init__(self, saver, channels=("messages",), snapshot_every=10, max_threads=1024):
+        super().__init__(saver)
+        self.channels = tuple(channels)
+        self.snapshot_every = snapshot_every
+        self.max_threads = max_threads
+        # (thread_id, checkpoint_ns, channel) -> (head checkpoint_id, snapshot checkpoint_id,
+        # snapshot length, writes since the snapshot, messages) for recently written threads
+        self._recent = OrderedDict()
+
+    def _remember(self, key, entry):
+        self._recent[key] = entry
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_threads:
+            self._recent.popitem(last=False)
+
+    def _latest(self, config, channel):
+        """
+        Get the recent entry of a channel, if the config's checkpoint is its head.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        recent = self._recent.get((thread_id, checkpoint_ns, channel))
+        if recent is not None and recent[0] == get_checkpoint_id(config):
+            return recent
+        return None
+
+    def _needs_parent(self, config, checkpoint, new_versions):
+        """
+        Check whether a put carries over delta channels this process knows nothing about,
+        whose snapshots are then looked up in the parent checkpoint.
+        """
+        return get_checkpoint_id(config) is not None and any(
+            channel not in new_versions
+            and channel in checkpoint["channel_values"]
+            and self._latest(config, channel) is None
+            for channel in self.channels
+        )
+
+    @staticmethod
+    def _snapshots_of(checkpoint_tuple):
+        return checkpoint_tuple.checkpoint.get(SNAPSHOTS_KEY, {}) if checkpoint_tuple else {}
+
+    def _encode(self, config, checkpoint, new_versions, inherited):
+        """
+        Replace the delta channels of a checkpoint about to be stored with their deltas.
+
+        `inherited` maps the channels written before this process saw the thread to
+        their snapshots, as stored in the parent checkpoint.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        channel_values = checkpoint["channel_values"].copy()
+        snapshots = {}
+
+        for channel in self.channels:
+            key = (thread_id, checkpoint_ns, channel)
+            recent = self._latest(config, channel)
+
+            if channel not in new_versions or channel not in channel_values:
+                if recent is not None:
+                    self._remember(key, (checkpoint["id"], *recent[1:]))
+                    if recent[3]:
+                        snapshots[channel] = recent[1]
+                elif channel in inherited:
+                    snapshots[channel] = inherited[channel]
+                continue
+
+            messages = list(channel_values[channel])
+            if recent is not None:
+                _, snapshot_id, offset, writes, previous = recent
+                appended_only = len(messages) >= len(previous) and all(
+                    a is b or a == b for a, b in zip(previous, messages)
+                )
+                if appended_only and writes + 1 < self.snapshot_every:
+                    channel_values[channel] = {
+                        DELTA_MARKER: 1,
+                        "base": snapshot_id,
+                        "offset": offset,
+                        "appended": messages[offset:],
+                    }
+                    snapshots[channel] = snapshot_id
+                    self._remember(
+                        key, (checkpoint["id"], snapshot_id, offset, writes + 1, messages)
+                    )
+                    continue
+
+            channel_values[channel] = messages
+            self._remember(key, (checkpoint["id"], checkpoint["id"], len(messages), 0, messages))
+
+        encoded = {**checkpoint, "channel_values": channel_values}
+        if snapshots:
+            encoded[SNAPSHOTS_KEY] = snapshots
+        return encoded
+
+    def _cached(self, thread_id, checkpoint_ns, channel, snapshot_id):
+        # The latest messages written against a snapshot start with the snapshot
+        recent = self._recent.get((thread_id, checkpoint_ns, channel))
+        if recent is not None and recent[1] == snapshot_id:
+            return recent[4]
+        return None
+
+    @staticmethod
+    def _base_config(thread_id, checkpoint_ns, checkpoint_id):
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    @staticmethod
+    def _stored_value(checkpoint_tuple, channel, checkpoint_id):
+        if checkpoint_tuple is None:
+            raise LookupError(
+                f"Checkpoint {checkpoint_id} holding part of the {channel!r} history is missing"
+            )
+        return checkpoint_tuple.checkpoint["channel_values"].get(channel, [])
+
+    @staticmethod
+    def _join(prefix, records):
+        messages = list(prefix)
+        for record in reversed(records):
+            del messages[record["offset"]:]
+            messages.extend(record["appended"])
+        return messages
+
+    def _known(self, thread_id, checkpoint_ns, channel, checkpoint_id, fetched):
+        value = fetched.get((thread_id, checkpoint_ns, channel, checkpoint_id))
+        if value is None:
+            value = self._cached(thread_id, checkpoint_ns, channel, checkpoint_id)
+        return value
+
+    def _resolve(self, thread_id, checkpoint_ns, channel, value, fetched):
+        """
+        Rebuild a message list by following its delta record back to a snapshot.
+
+        Snapshots read are kept in `fetched`, so a `list` reads each of them once.
+        """
+        records = []
+        while is_delta(value):
+            records.append(value)
+            base_id = value["base"]
+            value = self._known(thread_id, checkpoint_ns, channel, base_id, fetched)
+            if value is None:
+                base = self.saver.get_tuple(self._base_config(thread_id, checkpoint_ns, base_id))
+                value = self._stored_value(base, channel, base_id)
+                fetched[(thread_id, checkpoint_ns, channel, base_id)] = value
+        return self._join(value, records)
+
+    async def _aresolve(self, thread_id, checkpoint_ns, channel, value, fetched):
+        """
+        Asynchronous counterpart of `_resolve`.
+        """
+        records = []
+        while is_delta(value):
+            records.append(value)
+            base_id = value["base"]
+            value = self._known(thread_id, checkpoint_ns, channel, base_id, fetched)
+            if value is None:
+                base = await self.saver.aget_tuple(
+                    self._base_config(thread_id, checkpoint_ns, base_id)
+                )
+                value = self._stored_value(base, channel, base_id)
+                fetched[(thread_id, checkpoint_ns, channel, base_id)] = value
+        return self._join(value, records)
+
+    def _decode(self, checkpoint_tuple, resolve):
+        if checkpoint_tuple is None:
+            return None
+        thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+        checkpoint_ns = checkpoint_tuple.config["configurable"].get("checkpoint_ns", "")
+        channel_values = checkpoint_tuple.checkpoint["channel_values"]
+
+        decoded = {}
+        for channel in self.channels:
+            value = channel_values.get(channel)
+            if is_delta(value):
+                decoded[channel] = resolve(thread_id, checkpoint_ns, channel, value)
+        if not decoded:
+            return checkpoint_tuple
+
+        checkpoint = {**checkpoint_tuple.checkpoint, "channel_values": {**channel_values, **decoded}}
+        return checkpoint_tuple._replace(checkpoint=checkpoint)
+
+    async def _adecode(self, checkpoint_tuple, fetched):
+        # Resolve the deltas first, since `_decode` can't await reads
+        if checkpoint_tuple is None:
+            return None
+        thread_id = checkpoint_tuple.config["configurable"]["thread_id"]
+        checkpoint_ns = checkpoint_tuple.config["configurable"].get("checkpoint_ns", "")
+        channel_values = checkpoint_tuple.checkpoint["channel_values"]
+
+        resolved = {}
+        for channel in self.channels:
+            if is_delta(channel_values.get(channel)):
+                resolved[channel] = await self._aresolve(
+                    thread_id, checkpoint_ns, channel, channel_values[channel], fetched
+                )
+        return self._decode(checkpoint_tuple, lambda *args: resolved[args[2]])
+
+    def get_tuple(self, config):
+        return self._decode(self.saver.get_tuple(config), lambda *args: self._resolve(*args, {}))
+
+    async def aget_tuple(self, config):
+        return await self._adecode(await self.saver.aget_tuple(config), {})
+
+    def _listed_snapshots(self, checkpoint_tuples):
+        """
+        Get the plain message lists of listed checkpoints, keyed as in `_resolve`'s `fetched`.
+        """
+        snapshots = {}
+        for checkpoint_tuple in checkpoint_tuples:
+            configurable = checkpoint_tuple.config["configurable"]
+            channel_values = checkpoint_tuple.checkpoint["channel_values"]
+            for channel in self.channels:
+                if channel in channel_values and not is_delta(channel_values[channel]):
+                    key = (
+                        configurable["thread_id"],
+                        configurable.get("checkpoint_ns", ""),
+                        channel,
+                        configurable["checkpoint_id"],
+                    )
+                    snapshots[key] = channel_values[channel]
+        return snapshots
+
+    # The wrapped saver may hold its connection while listing, so missing snapshots are
+    # only read once the listing is done. Snapshots listed themselves aren't read again.
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        checkpoint_tuples = list(
+            self.saver.list(config, filter=filter, before=before, limit=limit)
+        )
+        fetched = self._listed_snapshots(checkpoint_tuples)
+        for checkpoint_tuple in checkpoint_tuples:
+            yield self._decode(checkpoint_tuple, lambda *args: self._resolve(*args, fetched))
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        checkpoint_tuples = [
+            checkpoint_tuple
+            async for checkpoint_tuple in self.saver.alist(
+                config, filter=filter, before=before, limit=limit
+            )
+        ]
+        fetched = self._listed_snapshots(checkpoint_tuples)
+        for checkpoint_tuple in checkpoint_tuples:
+            yield await self._adecode(checkpoint_tuple, fetched)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        inherited = {}
+        if self._needs_parent(config, checkpoint, new_versions):
+            inherited = self._snapshots_of(self.saver.get_tuple(config))
+        return self.saver.put(
+            config, self._encode(config, checkpoint, new_versions, inherited), metadata, new_versions
+        )
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        inherited = {}
+        if self._needs_parent(config, checkpoint, new_versions):
+            inherited = self._snapshots_of(await self.saver.aget_tuple(config))
+        return await self.saver.aput(
+            config, self._encode(config, checkpoint, new_versions, inherited), metadata, new_versions
+        )
+
+    def delete_thread(self, thread_id):
+        self._forget(thread_id)
+        return super().delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id):
+        self._forget(thread_id)
+        return await super().adelete_thread(thread_id)
+
+    def _forget(self, thread_id):
+        for key in [key for key in self._recent if key[0] == thread_id]:
+            del self._recent[key]
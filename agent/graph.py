@@ -1,12 +1,6 @@
 import os
 import dotenv
 import logging
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from langgraph_sdk import Auth
-from agent.checkpointer import get_postgres_checkpointer
-import asyncio
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -16,22 +10,112 @@ dotenv.load_dotenv(".env", override=True)
 os.environ["LANGCHAIN_TRACING_V2"] = "true"
 os.environ["LANGCHAIN_PROJECT"] = "langgraph-test-bot"
 
-tools = [TavilySearchResults(max_results=1)]
-
-model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
 prompt = (
     "You are a helpful assistant. "
     "You may not need to use tools for every query - the user may just want to chat!"
 )
 
-# Get the PostgreSQL checkpointer
-checkpointer = asyncio.run(get_postgres_checkpointer())
+# The compiled agent, built on first use by get_agent()
+_agent = None
+
+
+def build_agent(
+    model=None,
+    tools=None,
+    checkpointer=None,
+    llm_cache=None,
+    tool_options=None,
+    tool_call_concurrency=None,
+    history=None,
+):
+    """
+    Build the react agent graph.
+
+    The model and tools default to ChatOpenAI and Tavily search; they are imported here
+    rather than at module level so importing this module stays cheap. `llm_cache`
+    (see agent/llm_cache.py) is set as the model's response cache. With `tool_options`,
+    the tools are wrapped in result caches with those options (see agent/tool_cache.py).
+    With `tool_call_concurrency`, the tool calls of a turn run in parallel, that many at
+    a time (see agent/tool_node.py). `history` (see agent/context.py) trims the
+    conversation to a token budget before each model call.
+    """
+    from langgraph.prebuilt import create_react_agent
+
+    if model is None:
+        from langchain_openai import ChatOpenAI
+
+        model = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+    if tools is None:
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
+        tools = [TavilySearchResults(max_results=1)]
+
+    if tool_options is not None:
+        from agent.tool_cache import wrap_tools
+
+        tools = wrap_tools(tools, **tool_options)
+
+    if tool_call_concurrency is not None:
+        from agent.tool_node import ParallelToolNode
+
+        tools = ParallelToolNode(tools, max_concurrency=tool_call_concurrency)
+
+    if llm_cache is not None:
+        model = model.model_copy(update={"cache": llm_cache})
+
+    if history is not None:
+        from agent.context import SummaryState
+
+        return create_react_agent(
+            model,
+            tools,
+            prompt=history.prompt(prompt),
+            pre_model_hook=history.as_hook(),
+            state_schema=SummaryState,
+            checkpointer=checkpointer,
+        )
+
+    return create_react_agent(model, tools, prompt=prompt, checkpointer=checkpointer)
+
+
+async def get_agent(config=None):
+    """
+    Graph factory referenced by langgraph.json.
+
+    Creates the agent, its checkpointer (PostgreSQL, or SQLite with
+    CHECKPOINT_BACKEND=sqlite), model cache (with LLM_CACHE), tool caches (with
+    TOOL_CACHE=on), parallel tool node (with TOOL_CALL_CONCURRENCY) and history trimming
+    (with HISTORY_MAX_TOKENS) on first use and returns the cached graph afterwards. The
+    graph is rebuilt if the shared connection pool or connection was replaced, e.g.
+    because it is now being used from a different event loop.
+    """
+    global _agent
+
+    from agent.checkpointer import get_checkpoint_backend
+    from agent.async_checkpointer import get_async_pool, get_async_checkpointer
+    from agent.llm_cache import get_llm_cache
+    from agent.tool_cache import get_tool_options
+    from agent.tool_node import get_tool_call_concurrency
+    from agent.context import get_history_trimmer
+
+    backend = get_checkpoint_backend()
+    if backend == "sqlite":
+        from agent.sqlite_checkpointer import get_async_sqlite_connection
+
+        conn = await get_async_sqlite_connection()
+    else:
+        conn = await get_async_pool()
+
+    if _agent is None or _agent.checkpointer.conn is not conn:
+        logger.info(f"Building agent graph with {backend} checkpointer")
+        checkpointer = await get_async_checkpointer()
+        _agent = build_agent(
+            checkpointer=checkpointer,
+            llm_cache=get_llm_cache(),
+            tool_options=get_tool_options(),
+            tool_call_concurrency=get_tool_call_concurrency(),
+            history=get_history_trimmer(),
+        )
 
-# Initialize the agent with the PostgreSQL checkpointer
-agent = create_react_agent(
-    model, 
-    tools, 
-    prompt=prompt,
-    checkpointer=checkpointer
-)
\ No newline at end of file
+    return _agent
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+from typing import Any, NamedTuple, Optional
+from langgraph.checkpoint.base import CheckpointTuple, get_checkpoint_id
+from langgraph.checkpoint.postgres.base import BasePostgresSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_CHUNK_SIZE = 100
+
+# Columns needed to describe a checkpoint without loading its channel values or writes
+METADATA_SQL = """
+select
+    thread_id,
+    checkpoint_ns,
+    checkpoint_id,
+    parent_checkpoint_id,
+    checkpoint ->> 'ts' as ts,
+    metadata
+from checkpoints """
+
+
+class CheckpointSummary(NamedTuple):
+    """
+    A checkpoint's config, metadata and parent, as yielded by the metadata-only history.
+    """
+
+    config: dict
+    metadata: Any
+    parent_config: Optional[dict] = None
+    ts: Optional[str] = None
+
+
+def _make_config(thread_id, checkpoint_ns, checkpoint_id):
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint_id,
+        }
+    }
+
+
+def _keyset_query(saver, config, filter, before, after_key, chunk_size, metadata_only):
+    """
+    Build the query for the next chunk of a history, after the last row's key.
+    """
+    where, args = saver._search_where(config, filter, before)
+    if after_key is not None:
+        where += (" AND " if where else "WHERE ") + (
+            "(thread_id, checkpoint_ns, checkpoint_id) < (%s, %s, %s)"
+        )
+        args = [*args, *after_key]
+    query = (
+        (METADATA_SQL if metadata_only else saver.SELECT_SQL)
+        + where
+        + " ORDER BY thread_id DESC, checkpoint_ns DESC, checkpoint_id DESC"
+        + f" LIMIT {int(chunk_size)}"
+    )
+    return query, args
+
+
+def _row_key(row):
+    return row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]
+
+
+def _parent_config(row):
+    if not row["parent_checkpoint_id"]:
+        return None
+    return _make_config(row["thread_id"], row["checkpoint_ns"], row["parent_checkpoint_id"])
+
+
+def _load_summary(saver, row):
+    return CheckpointSummary(
+        _make_config(*_row_key(row)),
+        saver._load_metadata(row["metadata"]),
+        _parent_config(row),
+        row["ts"],
+    )
+
+
+def _load_tuple(saver, row):
+    return CheckpointTuple(
+        _make_config(*_row_key(row)),
+        saver._load_checkpoint(row["checkpoint"], row["channel_values"], row["pending_sends"]),
+        saver._load_metadata(row["metadata"]),
+        _parent_config(row),
+        saver._load_writes(row["pending_writes"]),
+    )
+
+
+def _summarize(checkpoint_tuple):
+    return CheckpointSummary(
+        checkpoint_tuple.config,
+        checkpoint_tuple.metadata,
+        checkpoint_tuple.parent_config,
+        checkpoint_tuple.checkpoint.get("ts"),
+    )
+
+
+def iter_history(
+    saver,
+    config,
+    *,
+    filter=None,
+    before=None,
+    chunk_size=HISTORY_CHUNK_SIZE,
+    metadata_only=False,
+):
+    """
+    Stream the checkpoints of a thread (or of every thread, if config is None), newest first.
+
+    With a PostgresSaver, checkpoints are fetched in chunks of `chunk_size` using keyset
+    pagination on (thread_id, checkpoint_ns, checkpoint_id), so each chunk is one short
+    query and memory stays flat however long the history is. Other savers are paged
+    with `list(before=..., limit=chunk_size)`.
+
+    Checkpoints are ordered by namespace and then ID, so unlike `list()`, the checkpoints
+    of subgraph namespaces are not interleaved with the root namespace.
+
+    Args:
+        saver: Checkpoint saver to read from
+        config: Config with the thread_id and optionally checkpoint_ns to list
+        filter: Metadata filter, as for `list()`
+        before: Only list checkpoints before this config's checkpoint_id
+        chunk_size: Number of checkpoints fetched per query
+        metadata_only: Yield CheckpointSummary entries and skip loading channel values
+
+    Yields:
+        CheckpointTuple or CheckpointSummary: One per checkpoint
+    """
+    if not isinstance(saver, BasePostgresSaver):
+        yield from _iter_paged(saver, config, filter, before, chunk_size, metadata_only)
+        return
+
+    load = _load_summary if metadata_only else _load_tuple
+    after_key = None
+    while True:
+        query, args = _keyset_query(
+            saver, config, filter, before, after_key, chunk_size, metadata_only
+        )
+        # A connection is only held while a chunk is fetched, not while it is consumed
+        with saver._cursor() as cur:
+            cur.execute(query, args, binary=True)
+            rows = cur.fetchall()
+
+        for row in rows:
+            yield load(saver, row)
+        if len(rows) < chunk_size:
+            return
+        after_key = _row_key(rows[-1])
+
+
+async def aiter_history(
+    saver,
+    config,
+    *,
+    filter=None,
+    before=None,
+    chunk_size=HISTORY_CHUNK_SIZE,
+    metadata_only=False,
+):
+    """
+    Asynchronous counterpart of `iter_history`, for AsyncPostgresSaver and other async savers.
+    """
+    if not isinstance(saver, BasePostgresSaver):
+        async for entry in _aiter_paged(saver, config, filter, before, chunk_size, metadata_only):
+            yield entry
+        return
+
+    load = _load_summary if metadata_only else _load_tuple
+    after_key = None
+    while True:
+        query, args = _keyset_query(
+            saver, config, filter, before, after_key, chunk_size, metadata_only
+        )
+        async with saver._cursor() as cur:
+            await cur.execute(query, args, binary=True)
+            rows = await cur.fetchall()
+
+        # Deserialize off the event loop, as AsyncPostgresSaver does
+        for entry in await asyncio.to_thread(lambda: [load(saver, row) for row in rows]):
+            yield entry
+        if len(rows) < chunk_size:
+            return
+        after_key = _row_key(rows[-1])
+
+
+def _page_before(before, last):
+    if last is None:
+        return before
+    return {"configurable": {"checkpoint_id": get_checkpoint_id(last.config)}}
+
+
+def _iter_paged(saver, config, filter, before, chunk_size, metadata_only):
+    last = None
+    while True:
+        count = 0
+        for checkpoint_tuple in saver.list(
+            config, filter=filter, before=_page_before(before, last), limit=chunk_size
+        ):
+            count += 1
+            last = checkpoint_tuple
+            yield _summarize(checkpoint_tuple) if metadata_only else checkpoint_tuple
+        if count < chunk_size:
+            return
+
+
+async def _aiter_paged(saver, config, filter, before, chunk_size, metadata_only):
+    last = None
+    while True:
+        count = 0
+        async for checkpoint_tuple in saver.alist(
+            config, filter=filter, before=_page_before(before, last), limit=chunk_size
+        ):
+            count += 1
+            last = checkpoint_tuple
+            yield _summarize(checkpoint_tuple) if metadata_only else checkpoint_tuple
+        if count < chunk_size:
+            return
@@ -0,0 +1,410 @@
+import contextvars
+import logging
+import math
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agent.delegating_checkpointer import DelegatingCheckpointSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = tuple(256 * 4**i for i in range(9))  # 256 B .. 16 MiB
+ROWS_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter with labels, in the Prometheus data model.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}_total{_format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets and labels, in the Prometheus data model.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *label_values):
+        entry = self._values.get(label_values)
+        return entry[2] if entry else 0
+
+    def sum(self, *label_values):
+        entry = self._values.get(label_values)
+        return entry[1] if entry else 0.0
+
+    def samples(self):
+        with self._lock:
+            values = [(key, [list(entry[0]), entry[1], entry[2]]) for key, entry in self._values.items()]
+        for label_values, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                labels = _format_labels(self.labels, label_values, [("le", le)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        # Callables returning extra (name, type, documentation, [samples]) at render time,
+        # by name so a replaced source (e.g. a reopened pool) replaces its collector
+        self.collectors = {}
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        families = [(m.name, m.type, m.documentation, list(m.samples())) for m in self.metrics]
+        for collector in list(self.collectors.values()):
+            families.extend(collector())
+        for name, metric_type, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+CALL_SECONDS = registry.histogram(
+    "checkpoint_call_seconds", "Duration of checkpointer calls", ["operation"]
+)
+CALL_ERRORS = registry.counter(
+    "checkpoint_call_errors", "Checkpointer calls that raised", ["operation"]
+)
+PAYLOAD_BYTES = registry.histogram(
+    "checkpoint_payload_bytes",
+    "Serialized channel values and writes per checkpointer call",
+    ["operation"],
+    BYTES_BUCKETS,
+)
+ROWS = registry.histogram(
+    "checkpoint_rows", "Checkpoints, blobs and writes per checkpointer call", ["operation"], ROWS_BUCKETS
+)
+
+# Bytes serialized or deserialized during the current checkpointer call
+_payload = contextvars.ContextVar("checkpoint_payload", default=None)
+
+
+class MeteredSerializer:
+    """
+    Serializer proxy adding the size of every value it handles to the current call.
+    """
+
+    def __init__(self, serde):
+        self.serde = serde
+
+    def __getattr__(self, name):
+        if name == "serde":
+            raise AttributeError(name)
+        return getattr(self.serde, name)
+
+    def dumps_typed(self, obj):
+        typ, data = self.serde.dumps_typed(obj)
+        payload = _payload.get()
+        if payload is not None:
+            payload[0] += len(data)
+        return typ, data
+
+    def loads_typed(self, data):
+        payload = _payload.get()
+        if payload is not None:
+            payload[0] += len(data[1])
+        return self.serde.loads_typed(data)
+
+
+def otel_span_hook(tracer_name="agent.checkpointer"):
+    """
+    Create a span hook that records each checkpointer call as an OpenTelemetry span.
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        raise ImportError(
+            "opentelemetry-api is not installed. Please install it with "
+            "`pip install opentelemetry-api`."
+        ) from None
+
+    tracer = trace.get_tracer(tracer_name)
+
+    def hook(name, attributes):
+        return tracer.start_as_current_span(name, attributes=attributes)
+
+    return hook
+
+
+class InstrumentedCheckpointSaver(DelegatingCheckpointSaver):
+    """
+    Saver wrapper timing every checkpointer call and recording its payload and row count.
+
+    Calls are recorded in the module's Prometheus-style `registry` as
+    `checkpoint_call_seconds`, `checkpoint_payload_bytes` and `checkpoint_rows`
+    histograms labelled by operation, and `checkpoint_call_errors`. The wrapped saver's
+    connection pool is exposed through the `checkpoint_pool_*` metrics, whose
+    `requests_wait_ms` is the time spent waiting to acquire a connection.
+
+    `span_hook(name, attributes)`, e.g. `otel_span_hook()`, may return a context manager
+    wrapping each call in a tracing span. Payload sizes are taken from the serializer the
+    saver already calls, so the wrapper adds a few timer reads and dict updates per call.
+    Attributes it doesn't define (`conn`, `setup`, ...) are those of the wrapped saver.
+    """
+
+    def __init__(self, saver, span_hook=None):
+        super().__init__(saver)
+        if not isinstance(saver.serde, MeteredSerializer):
+            saver.serde = MeteredSerializer(saver.serde)
+        self.span_hook = span_hook
+        pool = getattr(saver, "conn", None)
+        if hasattr(pool, "get_stats"):
+            registry.collectors[f"pool:{pool.name}"] = pool_collector(pool)
+
+    def __getattr__(self, name):
+        if name == "saver":
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    @staticmethod
+    @contextmanager
+    def _step(payload):
+        """
+        Time a step of a call and add the bytes serialized during it to the call's payload.
+        """
+        token = _payload.set(payload)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            payload[2] += time.perf_counter() - start
+            _payload.reset(token)
+
+    @contextmanager
+    def _record(self, operation, config, stepped=False):
+        """
+        Record a call, as one step unless `stepped`, when the caller times its steps.
+
+        Yields the call's [bytes, rows, seconds] payload.
+        """
+        payload = [0, 0, 0.0]
+        span = None
+        if self.span_hook is not None:
+            span = self.span_hook(
+                f"checkpoint.{operation}",
+                {"thread_id": str(config["configurable"].get("thread_id", ""))},
+            )
+            span.__enter__()
+        try:
+            if stepped:
+                yield payload
+            else:
+                with self._step(payload):
+                    yield payload
+        except BaseException:
+            CALL_ERRORS.inc(operation)
+            raise
+        finally:
+            CALL_SECONDS.observe(operation, value=payload[2])
+            PAYLOAD_BYTES.observe(operation, value=payload[0])
+            ROWS.observe(operation, value=payload[1])
+            if span is not None:
+                span.__exit__(*sys.exc_info())
+
+    @staticmethod
+    def _tuple_rows(checkpoint_tuple):
+        return 0 if checkpoint_tuple is None else 1 + len(checkpoint_tuple.pending_writes or ())
+
+    def get_tuple(self, config):
+        with self._record("get_tuple", config) as payload:
+            checkpoint_tuple = self.saver.get_tuple(config)
+            payload[1] = self._tuple_rows(checkpoint_tuple)
+            return checkpoint_tuple
+
+    async def aget_tuple(self, config):
+        with self._record("get_tuple", config) as payload:
+            checkpoint_tuple = await self.saver.aget_tuple(config)
+            payload[1] = self._tuple_rows(checkpoint_tuple)
+            return checkpoint_tuple
+
+    # Listings only time and meter the wrapped saver's iteration, not the caller's work
+    # between items
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._record("list", config or {"configurable": {}}, stepped=True) as payload:
+            with self._step(payload):
+                checkpoint_tuples = iter(
+                    self.saver.list(config, filter=filter, before=before, limit=limit)
+                )
+            while True:
+                with self._step(payload):
+                    checkpoint_tuple = next(checkpoint_tuples, None)
+                if checkpoint_tuple is None:
+                    return
+                payload[1] += self._tuple_rows(checkpoint_tuple)
+                yield checkpoint_tuple
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        with self._record("list", config or {"configurable": {}}, stepped=True) as payload:
+            with self._step(payload):
+                checkpoint_tuples = aiter(
+                    self.saver.alist(config, filter=filter, before=before, limit=limit)
+                )
+            while True:
+                with self._step(payload):
+                    checkpoint_tuple = await anext(checkpoint_tuples, None)
+                if checkpoint_tuple is None:
+                    return
+                payload[1] += self._tuple_rows(checkpoint_tuple)
+                yield checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._record("put", config) as payload:
+            payload[1] = 1 + len(new_versions)
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with self._record("put", config) as payload:
+            payload[1] = 1 + len(new_versions)
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._record("put_writes", config) as payload:
+            payload[1] = len(writes)
+            return self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with self._record("put_writes", config) as payload:
+            payload[1] = len(writes)
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        with self._record("delete_thread", {"configurable": {"thread_id": thread_id}}):
+            return self.saver.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id):
+        with self._record("delete_thread", {"configurable": {"thread_id": thread_id}}):
+            return await self.saver.adelete_thread(thread_id)
+
+
+# psycopg_pool statistics exposed as metrics, see ConnectionPool.get_stats()
+POOL_STATS = {
+    "requests_num": ("checkpoint_pool_requests", "counter", "Connection requests"),
+    "requests_queued": ("checkpoint_pool_requests_queued", "counter", "Connection requests that had to wait"),
+    "requests_wait_ms": ("checkpoint_pool_requests_wait_ms", "counter", "Time spent waiting for a connection"),
+    "requests_errors": ("checkpoint_pool_requests_errors", "counter", "Connection requests that failed or timed out"),
+    "pool_size": ("checkpoint_pool_size", "gauge", "Connections managed by the pool"),
+    "pool_available": ("checkpoint_pool_available", "gauge", "Idle connections in the pool"),
+    "requests_waiting": ("checkpoint_pool_requests_waiting", "gauge", "Requests waiting for a connection"),
+}
+
+
+def pool_collector(pool):
+    """
+    Create a registry collector reporting a connection pool's statistics.
+    """
+
+    def collect():
+        stats = pool.get_stats()
+        labels = f'{{pool="{pool.name}"}}'
+        return [
+            (
+                name,
+                metric_type,
+                documentation,
+                [f"{name}{'_total' if metric_type == 'counter' else ''}{labels} {stats.get(key, 0)}"],
+            )
+            for key, (name, metric_type, documentation) in POOL_STATS.items()
+        ]
+
+    return collect
+
+
+def start_metrics_server(port=9464, addr="0.0.0.0"):
+    """
+    Serve the registry's metrics at /metrics from a daemon thread.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving checkpoint metrics on http://{addr}:{port}/metrics")
+    return server
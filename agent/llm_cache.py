@@ -0,0 +1,376 @@
+"""
+Response cache for the chat model.
+
+`LLMResponseCache` is a LangChain `BaseCache`, set as the `cache` of the graph's model, so
+every model call made by the agent checks it first. It has two tiers:
+  * exact    - keyed on the normalized messages and the model's llm_string, which holds
+               the model parameters and the bound tool schemas. Normalizing collapses
+               whitespace and drops message and tool call IDs, so the same conversation
+               in another thread is a hit.
+  * semantic - optional, with `embeddings`. A prompt ending in a human message that
+               misses the exact tier is looked up by the embedding of that last message,
+               among cached prompts with the same model, tools and earlier messages.
+               The nearest one is a hit if its cosine similarity reaches
+               `similarity_threshold`.
+
+Entries expire `ttl` seconds after they are stored, and the least recently used entries
+are evicted beyond `max_entries`. Caching only returns the same answer for the same
+prompt, so it is meant for deterministic models (temperature 0).
+
+`get_llm_cache()` builds the process-wide cache from the LLM_CACHE* environment
+variables, and `agent.graph.get_agent` sets it on the model.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+import dotenv
+from langchain_core.caches import BaseCache
+from agent.instrumentation import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+LLM_CACHE_MODES = ("off", "exact", "semantic")
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# Embeddings computed on a miss, kept until the response is stored
+MAX_PENDING_VECTORS = 1024
+
+LOOKUPS = registry.counter("llm_cache_lookups", "Chat model cache lookups", ["result"])
+EVICTIONS = registry.counter("llm_cache_evictions", "Chat model cache evictions", ["reason"])
+
+# The process-wide cache, built on first use by get_llm_cache()
+_llm_cache = None
+
+
+def normalize_messages(prompt):
+    """
+    Reduce serialized messages to what the model sees: type, content and tool calls.
+
+    Args:
+        prompt: The messages as serialized by `langchain_core.load.dumps`
+
+    Returns:
+        list: One [type, content, tool calls] triple per message
+    """
+    normalized = []
+    for message in json.loads(prompt):
+        kwargs = message.get("kwargs", message)
+        content = kwargs.get("content", "")
+        if isinstance(content, str):
+            content = " ".join(content.split())
+        tool_calls = [[call["name"], call["args"]] for call in kwargs.get("tool_calls") or []]
+        normalized.append([kwargs.get("type"), content, tool_calls])
+    return normalized
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _fresh_generation(generation):
+    """
+    Copy a cached generation with new message and tool call IDs.
+
+    add_messages replaces messages with the same ID, and tool results are matched to
+    tool calls by ID, so a response served twice in a thread must not repeat them.
+    """
+    generation = generation.model_copy(deep=True)
+    message = getattr(generation, "message", None)
+    if message is None:
+        return generation
+    message.id = None
+    ids = {}
+    for tool_call in message.tool_calls:
+        ids[tool_call["id"]] = tool_call["id"] = f"call_{uuid4().hex}"
+    for tool_call in message.additional_kwargs.get("tool_calls") or []:
+        tool_call["id"] = ids.get(tool_call.get("id"), tool_call.get("id"))
+    return generation
+
+
+class VectorIndex:
+    """
+    Brute-force cosine similarity index, with constant-time adds and removes.
+    """
+
+    def __init__(self):
+        import numpy
+
+        self._numpy = numpy
+        self.vectors = None
+        self.keys = []
+        self.rows = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _unit(self, vector):
+        vector = self._numpy.asarray(vector, dtype=self._numpy.float32)
+        norm = self._numpy.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(self, key, vector):
+        vector = self._unit(vector)
+        if key in self.rows:
+            self.vectors[self.rows[key]] = vector
+            return
+        if self.vectors is None:
+            self.vectors = self._numpy.empty((16, len(vector)), dtype=self._numpy.float32)
+        elif len(self.keys) == len(self.vectors):
+            self.vectors = self._numpy.concatenate([self.vectors, self._numpy.empty_like(self.vectors)])
+        self.rows[key] = len(self.keys)
+        self.vectors[len(self.keys)] = vector
+        self.keys.append(key)
+
+    def remove(self, key):
+        # Move the last row into the removed one
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = self.keys.pop()
+        if last != key:
+            self.vectors[row] = self.vectors[len(self.keys)]
+            self.keys[row] = last
+            self.rows[last] = row
+
+    def search(self, vector):
+        """
+        Get the key of the most similar vector and its cosine similarity.
+        """
+        if not self.keys:
+            return None, 0.0
+        scores = self.vectors[: len(self.keys)] @ self._unit(vector)
+        row = int(scores.argmax())
+        return self.keys[row], float(scores[row])
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Two-tier chat model response cache with TTL and LRU eviction.
+    """
+
+    def __init__(
+        self,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        embeddings=None,
+        similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.metrics = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        # key -> (generations, expires at, semantic partition)
+        self._entries = OrderedDict()
+        # semantic partition -> VectorIndex of the entries' last messages
+        self._indexes = {}
+        self._pending_vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        Get the hit/miss/eviction counters, the hit rate and the current size.
+        """
+        lookups = self.metrics["exact_hits"] + self.metrics["semantic_hits"] + self.metrics["misses"]
+        hits = lookups - self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _request(self, prompt, llm_string):
+        """
+        Get the exact key of a prompt, and its semantic partition and query text if it
+        ends in a human message and the semantic tier is on.
+        """
+        messages = normalize_messages(prompt)
+        key = _digest([llm_string, messages])
+        if self.embeddings is None or not messages or messages[-1][0] != "human":
+            return key, None, None
+        *context, (_, query, _) = messages
+        if not isinstance(query, str):
+            return key, None, None
+        return key, _digest([llm_string, context]), query
+
+    def _get(self, key):
+        # Called with the lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self.clock():
+            self._remove(key)
+            self.metrics["expirations"] += 1
+            EVICTIONS.inc("ttl")
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _remove(self, key):
+        # Called with the lock held
+        _, _, partition = self._entries.pop(key)
+        index = self._indexes.get(partition)
+        if index is not None:
+            index.remove(key)
+            if not index:
+                del self._indexes[partition]
+
+    def _lookup_exact(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def _lookup_similar(self, key, partition, vector):
+        with self._lock:
+            self._pending_vectors[key] = vector
+            while len(self._pending_vectors) > MAX_PENDING_VECTORS:
+                self._pending_vectors.popitem(last=False)
+            index = self._indexes.get(partition)
+            if index is None:
+                return None
+            nearest, similarity = index.search(vector)
+            if similarity < self.similarity_threshold:
+                return None
+            return self._get(nearest)
+
+    def _hit(self, generations, tier):
+        if generations is None:
+            self.metrics["misses"] += 1
+            LOOKUPS.inc("miss")
+            return None
+        self.metrics[f"{tier}_hits"] += 1
+        LOOKUPS.inc(f"{tier}_hit")
+        return [_fresh_generation(generation) for generation in generations]
+
+    def _store(self, key, partition, generations, vector):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if vector is None:
+                partition = None
+            self._entries[key] = (generations, self.clock() + self.ttl, partition)
+            if partition is not None:
+                self._indexes.setdefault(partition, VectorIndex()).add(key, vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.metrics["evictions"] += 1
+                EVICTIONS.inc("size")
+
+    def lookup(self, prompt, llm_string):
+        key, partition, query = self._request(prompt, llm_string)
+        generations = self._lookup_exact(key)
+        if generations is not None:
+            return self._hit(generations, "exact")
+        if partition is not None:
+            vector = self.embeddings.embed_query(query)
+            generations = self._lookup_similar(key, partition, vector)
+            if generations is not None:
+                return self._hit(generations, "semantic")
+        return self._hit(None, None)
+
+    async def alookup(self, prompt, llm_string):
+        key, partition, query = self._request(prompt, llm_string)
+        generations = self._lookup_exact(key)
+        if generations is not None:
+            return self._hit(generations, "exact")
+        if partition is not None:
+            vector = await self.embeddings.aembed_query(query)
+            generations = self._lookup_similar(key, partition, vector)
+            if generations is not None:
+                return self._hit(generations, "semantic")
+        return self._hit(None, None)
+
+    def update(self, prompt, llm_string, return_val):
+        key, partition, query = self._request(prompt, llm_string)
+        vector = None
+        if partition is not None:
+            with self._lock:
+                vector = self._pending_vectors.pop(key, None)
+            if vector is None:
+                vector = self.embeddings.embed_query(query)
+        self._store(key, partition, return_val, vector)
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        key, partition, query = self._request(prompt, llm_string)
+        vector = None
+        if partition is not None:
+            with self._lock:
+                vector = self._pending_vectors.pop(key, None)
+            if vector is None:
+                vector = await self.embeddings.aembed_query(query)
+        self._store(key, partition, return_val, vector)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+            self._pending_vectors.clear()
+
+    async def aclear(self, **kwargs):
+        self.clear()
+
+
+def get_llm_cache_settings():
+    """
+    Get the chat model cache settings from environment variables.
+
+    Returns:
+        dict: mode (LLM_CACHE, one of LLM_CACHE_MODES), ttl, max_entries and
+            similarity_threshold
+    """
+    mode = os.environ.get("LLM_CACHE", "off").lower()
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"LLM_CACHE must be one of {', '.join(LLM_CACHE_MODES)}, not {mode!r}")
+    return {
+        "mode": mode,
+        "ttl": float(os.environ.get("LLM_CACHE_TTL", DEFAULT_TTL)),
+        "max_entries": int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        "similarity_threshold": float(
+            os.environ.get("LLM_CACHE_SIMILARITY", DEFAULT_SIMILARITY_THRESHOLD)
+        ),
+    }
+
+
+def get_llm_cache():
+    """
+    Get the process-wide chat model cache, or None if LLM_CACHE is off.
+
+    The semantic mode embeds queries with OpenAI's LLM_CACHE_EMBEDDING_MODEL
+    (text-embedding-3-small by default).
+    """
+    global _llm_cache
+
+    settings = get_llm_cache_settings()
+    if settings["mode"] == "off":
+        return None
+    if _llm_cache is None:
+        embeddings = None
+        if settings["mode"] == "semantic":
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings(
+                model=os.environ.get("LLM_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+            )
+        logger.info(f"Using {settings['mode']} chat model cache")
+        _llm_cache = LLMResponseCache(
+            ttl=settings["ttl"],
+            max_entries=settings["max_entries"],
+            embeddings=embeddings,
+            similarity_threshold=settings["similarity_threshold"],
+        )
+    return _llm_cache
@@ -0,0 +1,420 @@
+"""
+Partitioned layout for the checkpoint tables.
+
+With SUPABASE_DB_PARTITIONING=time, the bootstrap creates the checkpoint tables as
+partitioned tables instead of running the saver's migrations as-is:
+  * checkpoints and checkpoint_writes are range partitioned on checkpoint_id. Checkpoint
+    IDs are uuid6 strings, whose leading hex digits are the creation time, so each range
+    partition holds the checkpoints (and their writes) of one period of
+    SUPABASE_DB_PARTITION_DAYS days. IDs outside every range land in a DEFAULT partition.
+  * checkpoint_blobs has no time column (blob versions are per-channel counters), so it is
+    hash partitioned on thread_id into SUPABASE_DB_HASH_PARTITIONS partitions.
+
+Retention then drops whole period partitions instead of deleting rows, and sweeps each
+blob partition for threads that no longer have any checkpoint. Checkpoints holding the
+message snapshots that newer checkpoints store deltas against (see
+agent/delta_checkpointer.py) are moved to the DEFAULT partition before theirs is dropped.
+
+With SUPABASE_DB_PARTITIONING=hash, all three tables are hash partitioned on thread_id,
+which keeps each partition (and its vacuum) small but leaves retention to row deletes.
+
+Existing unpartitioned tables are never converted; partitioning applies to new schemas.
+"""
+import logging
+import os
+import re
+import psycopg
+from datetime import datetime, timedelta, timezone
+from langgraph.checkpoint.postgres import PostgresSaver
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARTITION_MODES = ("none", "time", "hash")
+RANGE_TABLES = ("checkpoints", "checkpoint_writes")
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch, as in uuid6()
+UUID_EPOCH_OFFSET = 0x01B21DD213814000
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+CREATE_TABLE_RE = re.compile(r"\s*CREATE TABLE IF NOT EXISTS (\w+) \(")
+RANGE_BOUND_RE = re.compile(r"FROM \('([^']*)'\) TO \('([^']*)'\)")
+
+LIST_PARTITIONS_SQL = """
+    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    JOIN pg_namespace n ON n.oid = p.relnamespace
+    WHERE n.nspname = current_schema() AND p.relname = %s
+    ORDER BY c.relname;
+"""
+
+IS_PARTITIONED_SQL = """
+    SELECT EXISTS (
+        SELECT FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relname = 'checkpoints'
+    );
+"""
+
+# Copy the checkpoints of a detached partition that remaining checkpoints name as their
+# message snapshots back into the table, where they land in the DEFAULT partition
+KEEP_SNAPSHOTS_SQL = """
+    INSERT INTO checkpoints
+    SELECT * FROM {partition} p
+    WHERE EXISTS (
+        SELECT 1 FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'delta_snapshots') s
+        WHERE c.thread_id = p.thread_id
+            AND c.checkpoint_ns = p.checkpoint_ns
+            AND s.value = p.checkpoint_id
+    );
+"""
+
+# Delete the blobs of threads and namespaces that no longer have any checkpoint
+SWEEP_BLOBS_SQL = """
+    DELETE FROM {partition} b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+    );
+"""
+
+
+def get_partition_settings():
+    """
+    Get the checkpoint table partitioning settings from environment variables.
+    """
+    mode = os.environ.get("SUPABASE_DB_PARTITIONING", "none").lower()
+    if mode not in PARTITION_MODES:
+        raise ValueError(f"Unknown SUPABASE_DB_PARTITIONING mode {mode!r}")
+
+    retention_days = os.environ.get("SUPABASE_DB_PARTITION_RETENTION_DAYS")
+    return {
+        "mode": mode,
+        "days": int(os.environ.get("SUPABASE_DB_PARTITION_DAYS", 1)),
+        "premake": int(os.environ.get("SUPABASE_DB_PARTITION_PREMAKE", 7)),
+        "hash_partitions": int(os.environ.get("SUPABASE_DB_HASH_PARTITIONS", 16)),
+        "retention_days": float(retention_days) if retention_days else None,
+    }
+
+
+def uuid6_at(moment, clock_seq=0, node=0):
+    """
+    The uuid6 string for a point in time, laid out as langgraph's `uuid6()` lays it out.
+
+    With the default zero clock sequence and node, this is the lowest checkpoint ID that
+    can be generated at `moment`, which makes it a partition bound.
+    """
+    timestamp = (moment - UNIX_EPOCH) // timedelta(microseconds=1) * 10 + UUID_EPOCH_OFFSET
+    time_high_and_mid = (timestamp >> 12) & 0xFFFFFFFFFFFF
+    return (
+        f"{time_high_and_mid >> 16:08x}-{time_high_and_mid & 0xFFFF:04x}-6{timestamp & 0xFFF:03x}"
+        f"-{0x8000 | (clock_seq & 0x3FFF):04x}-{node & 0xFFFFFFFFFFFF:012x}"
+    )
+
+
+def uuid6_time(checkpoint_id):
+    """
+    The creation time encoded in a uuid6 checkpoint ID.
+    """
+    digits = checkpoint_id.replace("-", "")
+    timestamp = (int(digits[:12], 16) << 12) | int(digits[13:16], 16)
+    return UNIX_EPOCH + timedelta(microseconds=(timestamp - UUID_EPOCH_OFFSET) // 10)
+
+
+def period_start(moment, days):
+    """
+    The start of the partition period containing `moment`, periods being aligned on the Unix epoch.
+    """
+    period = timedelta(days=days)
+    return UNIX_EPOCH + (moment - UNIX_EPOCH) // period * period
+
+
+def partition_specs(mode):
+    """
+    The PARTITION BY clause of each checkpoint table for a partitioning mode.
+    """
+    if mode == "time":
+        return {
+            "checkpoints": "RANGE (checkpoint_id)",
+            "checkpoint_writes": "RANGE (checkpoint_id)",
+            "checkpoint_blobs": "HASH (thread_id)",
+        }
+    return dict.fromkeys(("checkpoints", "checkpoint_writes", "checkpoint_blobs"), "HASH (thread_id)")
+
+
+def install_statements(settings):
+    """
+    Build the statements creating the partitioned checkpoint tables.
+
+    The saver's own migrations are replayed, with the CREATE TABLE statements made
+    partitioned and indexes built non-concurrently (the tables are empty), and recorded
+    in checkpoint_migrations so `setup()` finds the schema up to date.
+    """
+    specs = partition_specs(settings["mode"])
+    statements = []
+    for v, migration in enumerate(PostgresSaver.MIGRATIONS):
+        match = CREATE_TABLE_RE.match(migration)
+        if match and match[1] in specs:
+            migration = f"{migration.strip().removesuffix(';')} PARTITION BY {specs[match[1]]};"
+        statements.append(migration.replace("CONCURRENTLY ", ""))
+        statements.append(f"INSERT INTO checkpoint_migrations (v) VALUES ({v});")
+
+    for table, spec in specs.items():
+        if spec.startswith("RANGE"):
+            statements.append(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;")
+            continue
+        modulus = settings["hash_partitions"]
+        statements.extend(
+            f"CREATE TABLE {table}_h{remainder} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder});"
+            for remainder in range(modulus)
+        )
+    return statements
+
+
+def parse_range_partitions(rows):
+    """
+    Turn (name, bound expression) rows into (name, lower, upper) bounds, skipping DEFAULT.
+    """
+    partitions = []
+    for name, bound in rows:
+        match = RANGE_BOUND_RE.search(bound)
+        if match:
+            partitions.append((name, match[1], match[2]))
+    return partitions
+
+
+def plan_partitions(table, existing, days, start, end):
+    """
+    Build the statements creating the period partitions of `table` covering [start, end).
+
+    Periods overlapping an existing partition are skipped.
+    """
+    statements = []
+    period = period_start(start, days)
+    while period < end:
+        upper = period + timedelta(days=days)
+        lower_bound, upper_bound = uuid6_at(period), uuid6_at(upper)
+        if not any(lower_bound < high and low < upper_bound for _, low, high in existing):
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {table}_p{period:%Y%m%d} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{lower_bound}') TO ('{upper_bound}');"
+            )
+        period = upper
+    return statements
+
+
+def expired_partitions(existing, cutoff):
+    """
+    Names of the partitions whose every checkpoint is older than `cutoff`.
+    """
+    cutoff_bound = uuid6_at(cutoff)
+    return [name for name, _, high in existing if high <= cutoff_bound]
+
+
+def is_partitioned(conn):
+    """
+    Whether the checkpoints table in the current schema is partitioned.
+    """
+    with conn.cursor() as cur:
+        cur.execute(IS_PARTITIONED_SQL)
+        return cur.fetchone()[0]
+
+
+async def ais_partitioned(conn):
+    """
+    Whether the checkpoints table in the current schema is partitioned.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(IS_PARTITIONED_SQL)
+        return (await cur.fetchone())[0]
+
+
+def install_partitioned_schema(conn, settings):
+    """
+    Create the partitioned checkpoint tables in the current (empty) schema, in one transaction.
+    """
+    logger.info(f"Creating {settings['mode']}-partitioned checkpoint tables")
+    with conn.transaction(), conn.cursor() as cur:
+        for statement in install_statements(settings):
+            cur.execute(statement)
+
+
+async def ainstall_partitioned_schema(conn, settings):
+    """
+    Asynchronous counterpart of `install_partitioned_schema`.
+    """
+    logger.info(f"Creating {settings['mode']}-partitioned checkpoint tables")
+    async with conn.transaction(), conn.cursor() as cur:
+        for statement in install_statements(settings):
+            await cur.execute(statement)
+
+
+def list_partitions(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(LIST_PARTITIONS_SQL, (table,))
+        return cur.fetchall()
+
+
+async def alist_partitions(conn, table):
+    async with conn.cursor() as cur:
+        await cur.execute(LIST_PARTITIONS_SQL, (table,))
+        return await cur.fetchall()
+
+
+def _partition_window(settings, start, end):
+    start = start or datetime.now(timezone.utc)
+    ahead = timedelta(days=settings["days"] * (settings["premake"] + 1))
+    return start, end or period_start(start, settings["days"]) + ahead
+
+
+def ensure_partitions(conn, settings, start=None, end=None):
+    """
+    Create the missing period partitions from `start` (default now) to `end` (default
+    `premake` periods ahead).
+
+    A period whose checkpoints already landed in the DEFAULT partition (because it was
+    not created in time) cannot be created; it is skipped with a warning and its rows
+    stay in the default partition.
+
+    Returns:
+        int: Number of partitions created
+    """
+    start, end = _partition_window(settings, start, end)
+    created = 0
+    for table in RANGE_TABLES:
+        existing = parse_range_partitions(list_partitions(conn, table))
+        for statement in plan_partitions(table, existing, settings["days"], start, end):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(statement)
+            except psycopg.errors.CheckViolation as e:
+                logger.warning(f"Rows for a new partition are in the default partition: {e}")
+                continue
+            created += 1
+    return created
+
+
+async def aensure_partitions(conn, settings, start=None, end=None):
+    """
+    Asynchronous counterpart of `ensure_partitions`.
+    """
+    start, end = _partition_window(settings, start, end)
+    created = 0
+    for table in RANGE_TABLES:
+        existing = parse_range_partitions(await alist_partitions(conn, table))
+        for statement in plan_partitions(table, existing, settings["days"], start, end):
+            try:
+                async with conn.cursor() as cur:
+                    await cur.execute(statement)
+            except psycopg.errors.CheckViolation as e:
+                logger.warning(f"Rows for a new partition are in the default partition: {e}")
+                continue
+            created += 1
+    return created
+
+
+def drop_partition_statements(table, name):
+    """
+    Statements dropping a period partition, keeping the message snapshots still in use.
+    """
+    if table != "checkpoints":
+        return [f"DROP TABLE IF EXISTS {name};"]
+    return [
+        f"ALTER TABLE checkpoints DETACH PARTITION {name};",
+        KEEP_SNAPSHOTS_SQL.format(partition=name),
+        f"DROP TABLE {name};",
+    ]
+
+
+def drop_expired_partitions(conn, retention, now=None, lock_timeout="5s"):
+    """
+    Drop the period partitions older than `retention` and sweep orphaned blobs.
+
+    Each partition is dropped in its own short transaction, giving up if its lock cannot
+    be taken within `lock_timeout` instead of queueing behind long-running queries.
+    Partitions are dropped newest first, so snapshots are only kept for checkpoints that
+    remain.
+
+    Args:
+        conn: Autocommit connection to the partitioned schema
+        retention: timedelta of checkpoints to keep
+        now: Current time, defaults to now
+
+    Returns:
+        dict: Number of partitions dropped and blobs swept
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - retention
+    counts = {"partitions": 0, "checkpoint_blobs": 0}
+    for table in reversed(RANGE_TABLES):
+        existing = parse_range_partitions(list_partitions(conn, table))
+        for name in reversed(expired_partitions(existing, cutoff)):
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+                for statement in drop_partition_statements(table, name):
+                    cur.execute(statement)
+            counts["partitions"] += 1
+
+    if counts["partitions"]:
+        for name, _ in list_partitions(conn, "checkpoint_blobs"):
+            with conn.cursor() as cur:
+                cur.execute(SWEEP_BLOBS_SQL.format(partition=name))
+                counts["checkpoint_blobs"] += cur.rowcount
+
+    logger.info(f"Dropped checkpoint partitions older than {cutoff}: {counts}")
+    return counts
+
+
+async def adrop_expired_partitions(conn, retention, now=None, lock_timeout="5s"):
+    """
+    Asynchronous counterpart of `drop_expired_partitions`.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - retention
+    counts = {"partitions": 0, "checkpoint_blobs": 0}
+    for table in reversed(RANGE_TABLES):
+        existing = parse_range_partitions(await alist_partitions(conn, table))
+        for name in reversed(expired_partitions(existing, cutoff)):
+            async with conn.transaction(), conn.cursor() as cur:
+                await cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+                for statement in drop_partition_statements(table, name):
+                    await cur.execute(statement)
+            counts["partitions"] += 1
+
+    if counts["partitions"]:
+        for name, _ in await alist_partitions(conn, "checkpoint_blobs"):
+            async with conn.cursor() as cur:
+                await cur.execute(SWEEP_BLOBS_SQL.format(partition=name))
+                counts["checkpoint_blobs"] += cur.rowcount
+
+    logger.info(f"Dropped checkpoint partitions older than {cutoff}: {counts}")
+    return counts
+
+
+def maintain_partitions(conn, settings, now=None):
+    """
+    Create the upcoming period partitions and, if a retention is set, drop expired ones.
+
+    Returns:
+        dict: Number of partitions created and dropped and blobs swept
+    """
+    counts = {"created": ensure_partitions(conn, settings, start=now)}
+    if settings["retention_days"] is not None:
+        counts.update(
+            drop_expired_partitions(conn, timedelta(days=settings["retention_days"]), now)
+        )
+    return counts
+
+
+async def amaintain_partitions(conn, settings, now=None):
+    """
+    Asynchronous counterpart of `maintain_partitions`.
+    """
+    counts = {"created": await aensure_partitions(conn, settings, start=now)}
+    if settings["retention_days"] is not None:
+        counts.update(
+            await adrop_expired_partitions(conn, timedelta(days=settings["retention_days"]), now)
+        )
+    return counts
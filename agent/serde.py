@@ -0,0 +1,121 @@
+import logging
+import os
+import zlib
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Values smaller than this are stored uncompressed
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+def _zstd():
+    import zstandard
+
+    compressor, decompressor = zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def _lz4():
+    import lz4.frame
+
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+def _zlib():
+    return (lambda data: zlib.compress(data, 6)), zlib.decompress
+
+
+# Compression codecs by the name stored in the value's type tag, e.g. "msgpack+zstd".
+# zstd and lz4 need the optional `zstandard` / `lz4` packages.
+COMPRESSORS = {
+    "zstd": _zstd,
+    "lz4": _lz4,
+    "zlib": _zlib,
+}
+
+_codecs = {}
+
+
+def get_codec(name):
+    """
+    Get the (compress, decompress) functions of a compression codec.
+    """
+    if name not in COMPRESSORS:
+        raise ValueError(f"Unknown compression {name!r}, expected one of {list(COMPRESSORS)}")
+    if name not in _codecs:
+        try:
+            _codecs[name] = COMPRESSORS[name]()
+        except ImportError:
+            package = {"zstd": "zstandard", "lz4": "lz4"}[name]
+            raise ImportError(
+                f"{package} is not installed. Please install it with `pip install {package}`."
+            ) from None
+    return _codecs[name]
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Serializer compressing the encoded checkpoint blobs and writes above a size threshold.
+
+    Values are encoded by the wrapped serializer (msgpack for JsonPlusSerializer) and,
+    if at least `threshold` bytes and compression saves space, compressed. The codec is
+    appended to the stored type tag (e.g. "msgpack+zstd"), so untagged values written
+    before compression was enabled, or below the threshold, still load as they are.
+    """
+
+    def __init__(self, serde=None, compression="zstd", threshold=DEFAULT_COMPRESSION_THRESHOLD):
+        self.serde = serde or JsonPlusSerializer()
+        self.compression = compression
+        self.threshold = threshold
+        self._compress = get_codec(compression)[0]
+
+    def dumps(self, obj):
+        return self.serde.dumps(obj)
+
+    def loads(self, data):
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj):
+        typ, data = self.serde.dumps_typed(obj)
+        if len(data) < self.threshold:
+            return typ, data
+
+        compressed = self._compress(data)
+        if len(compressed) >= len(data):
+            return typ, data
+        return f"{typ}+{self.compression}", compressed
+
+    def loads_typed(self, data):
+        typ, payload = data
+        base_typ, _, codec = typ.rpartition("+")
+        if codec not in COMPRESSORS:
+            return self.serde.loads_typed(data)
+        return self.serde.loads_typed((base_typ, get_codec(codec)[1](payload)))
+
+
+def get_serializer():
+    """
+    Get the checkpoint serializer configured by environment variables.
+
+    SUPABASE_DB_COMPRESSION selects the codec (zstd, lz4 or zlib; unset or "none" keeps
+    the default uncompressed serializer) and SUPABASE_DB_COMPRESSION_THRESHOLD the
+    minimum value size in bytes to compress.
+
+    Returns:
+        SerializerProtocol: The serializer, or None for the saver's default
+    """
+    compression = os.environ.get("SUPABASE_DB_COMPRESSION", "none").lower()
+    if compression in ("", "none"):
+        return None
+
+    threshold = int(
+        os.environ.get("SUPABASE_DB_COMPRESSION_THRESHOLD", DEFAULT_COMPRESSION_THRESHOLD)
+    )
+    try:
+        return CompressedSerializer(compression=compression, threshold=threshold)
+    except ImportError as e:
+        logger.warning(f"Falling back to zlib compression: {e}")
+        return CompressedSerializer(compression="zlib", threshold=threshold)
@@ -0,0 +1,209 @@
+"""
+Embedded SQLite checkpointer backend, for single-node and edge deployments.
+
+Selected with CHECKPOINT_BACKEND=sqlite; the database file is CHECKPOINT_SQLITE_PATH
+(default checkpoints.sqlite). Connections run in WAL mode, so readers never block the
+writer, with synchronous=NORMAL (durable across application crashes, fsyncing only at
+WAL checkpoints) and a memory-mapped read path of CHECKPOINT_SQLITE_MMAP_SIZE bytes.
+
+The sync and async checkpointers each share one process-wide connection (per database
+path for the sync ones), since SQLite runs a single write transaction at a time anyway.
+
+Requires the `langgraph-checkpoint-sqlite` package.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+import dotenv
+from agent.serde import get_serializer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+# The process-wide sqlite3 connections shared by every SqliteSaver, one per database path,
+# and the lock the savers on each share for their transactions, which is reentrant so a
+# thread can read through one saver while listing through another
+_conns = {}
+_conn_locks = {}
+_conn_open_lock = threading.Lock()
+
+# The process-wide aiosqlite connection shared by every AsyncSqliteSaver, along with the
+# event loop it was opened on and the lock serializing the savers' transactions on it
+_aconn = None
+_aconn_loop = None
+_aconn_lock = None
+# Per event loop, the lock serializing the opening of the connection
+_aconn_open_locks = weakref.WeakKeyDictionary()
+
+
+def get_sqlite_settings():
+    """
+    Get the SQLite database path and tuning settings from environment variables.
+    """
+    return {
+        "path": os.environ.get("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite"),
+        "mmap_size": int(os.environ.get("CHECKPOINT_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "busy_timeout_ms": int(os.environ.get("CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    }
+
+
+def get_pragmas(settings):
+    return [
+        "PRAGMA journal_mode=WAL;",
+        "PRAGMA synchronous=NORMAL;",
+        f"PRAGMA mmap_size={int(settings['mmap_size'])};",
+        f"PRAGMA busy_timeout={int(settings['busy_timeout_ms'])};",
+    ]
+
+
+def _import_savers():
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError as e:
+        raise ImportError(
+            "The sqlite checkpoint backend requires `pip install langgraph-checkpoint-sqlite`"
+        ) from e
+    return SqliteSaver, AsyncSqliteSaver
+
+
+def get_sqlite_connection(settings=None):
+    """
+    Open a tuned SQLite connection that can be shared across threads.
+    """
+    settings = settings or get_sqlite_settings()
+    logger.info(f"Opening SQLite checkpoint database {settings['path']}")
+    conn = sqlite3.connect(settings["path"], check_same_thread=False)
+    for pragma in get_pragmas(settings):
+        conn.execute(pragma)
+    return conn
+
+
+def _is_open(conn):
+    try:
+        conn.in_transaction
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+
+def _get_shared(settings):
+    path = settings["path"]
+    with _conn_open_lock:
+        conn = _conns.get(path)
+        if conn is None or not _is_open(conn):
+            conn = _conns[path] = get_sqlite_connection(settings)
+        return conn, _conn_locks.setdefault(path, threading.RLock())
+
+
+def get_shared_sqlite_connection(settings=None):
+    """
+    Get the process-wide SQLite connection to the database, opening it on first use.
+
+    Each database path gets its own connection, which stays open until `close_sqlite()`
+    since savers may still use it. It is reopened if it was closed.
+    """
+    return _get_shared(settings or get_sqlite_settings())[0]
+
+
+def close_sqlite():
+    """
+    Close the process-wide SQLite connections, if any are open.
+    """
+    with _conn_open_lock:
+        conns = list(_conns.values())
+        _conns.clear()
+    for conn in conns:
+        logger.info("Closing SQLite connection")
+        conn.close()
+
+
+def get_sqlite_checkpointer(serde=None, settings=None):
+    """
+    Get a synchronous SQLite checkpointer on the process-wide connection.
+
+    Every checkpointer shares the connection's lock, since a SQLite connection has a
+    single transaction at a time.
+
+    Args:
+        serde: Serializer for checkpoint blobs and writes, defaults to `get_serializer()`
+        settings: Database settings, defaults to `get_sqlite_settings()`
+    """
+    SqliteSaver, _ = _import_savers()
+    conn, lock = _get_shared(settings or get_sqlite_settings())
+    checkpointer = SqliteSaver(conn, serde=serde or get_serializer())
+    checkpointer.lock = lock
+    checkpointer.setup()
+    return checkpointer
+
+
+async def get_async_sqlite_connection():
+    """
+    Get the process-wide aiosqlite connection, opening it on first use.
+
+    If the connection was opened on a different event loop, it is replaced and closed.
+    """
+    global _aconn, _aconn_loop, _aconn_lock
+
+    _import_savers()
+    import aiosqlite
+
+    loop = asyncio.get_running_loop()
+    if _aconn is not None and _aconn_loop is loop:
+        return _aconn
+
+    # Concurrent first calls wait for the one opening the connection
+    open_lock = _aconn_open_locks.setdefault(loop, asyncio.Lock())
+    async with open_lock:
+        if _aconn is not None and _aconn_loop is loop:
+            return _aconn
+
+        settings = get_sqlite_settings()
+        logger.info(f"Opening async SQLite checkpoint database {settings['path']}")
+        conn = await aiosqlite.connect(settings["path"])
+        for pragma in get_pragmas(settings):
+            await conn.execute(pragma)
+
+        previous = _aconn
+        _aconn, _aconn_loop, _aconn_lock = conn, loop, asyncio.Lock()
+
+    if previous is not None:
+        # aiosqlite runs the connection on its own thread, so any loop can close it
+        logger.warning("Closing SQLite connection bound to another event loop")
+        await previous.close()
+    return _aconn
+
+
+async def close_async_sqlite():
+    """
+    Close the process-wide aiosqlite connection, if it is open.
+    """
+    global _aconn, _aconn_loop, _aconn_lock
+
+    conn, _aconn, _aconn_loop, _aconn_lock = _aconn, None, None, None
+    if conn is not None:
+        logger.info("Closing async SQLite connection")
+        await conn.close()
+
+
+async def get_async_sqlite_checkpointer(serde=None):
+    """
+    Get an asynchronous SQLite checkpointer on the process-wide connection.
+
+    Every checkpointer shares the connection's lock, since a SQLite connection has a
+    single transaction at a time.
+
+    Args:
+        serde: Serializer for checkpoint blobs and writes, defaults to `get_serializer()`
+    """
+    _, AsyncSqliteSaver = _import_savers()
+    checkpointer = AsyncSqliteSaver(
+        await get_async_sqlite_connection(), serde=serde or get_serializer()
+    )
+    checkpointer.lock = _aconn_lock
+    await checkpointer.setup()
+    return checkpointer
@@ -0,0 +1,146 @@
+"""
+Streaming entry point for the chat agent.
+
+`astream_chat` runs one turn and yields events as they happen, instead of waiting for
+the final state:
+  * {"event": "token", "content", "id", "node"}         - text from the model as it is generated
+  * {"event": "tool_call", "name", "args", "id"}        - a tool call the model made
+  * {"event": "tool_result", "name", "content", "tool_call_id"} - a tool's result
+
+Tokens come from the graph's "messages" stream, which is fed by model callbacks and
+never touches the checkpointer. The graph still checkpoints once per node, as with
+`ainvoke`. Tool calls and results come from the "updates" stream, as each node finishes.
+
+The graph runs in its own task, which feeds a queue of at most `max_queue` events. While
+the queue is full, new tokens of the same message are merged into one pending event
+rather than queued, so a slow consumer gets fewer, larger tokens. The model is never
+held up by the consumer, and memory stays bounded. Other events wait for room in the
+queue. Closing the generator early cancels the run.
+
+Time to first token is recorded in the `chat_time_to_first_token_seconds` histogram of
+agent.instrumentation's registry.
+"""
+import asyncio
+import logging
+import time
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from agent.instrumentation import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM_QUEUE = 64
+
+TIME_TO_FIRST_TOKEN = registry.histogram(
+    "chat_time_to_first_token_seconds", "Time from the start of a streamed turn to its first token"
+)
+
+# Marks the end of the stream in the queue
+_DONE = object()
+
+
+def stream_events(mode, chunk):
+    """
+    Convert an item of the graph's "messages" or "updates" stream to stream events.
+    """
+    if mode == "messages":
+        message, metadata = chunk
+        if isinstance(message, AIMessageChunk) and isinstance(message.content, str) and message.content:
+            return [
+                {
+                    "event": "token",
+                    "content": message.content,
+                    "id": message.id,
+                    "node": metadata.get("langgraph_node"),
+                }
+            ]
+        return []
+
+    events = []
+    for update in chunk.values():
+        messages = update.get("messages", []) if isinstance(update, dict) else []
+        for message in messages:
+            if isinstance(message, AIMessage):
+                events.extend(
+                    {"event": "tool_call", "name": call["name"], "args": call["args"], "id": call["id"]}
+                    for call in message.tool_calls
+                )
+            elif isinstance(message, ToolMessage):
+                events.append(
+                    {
+                        "event": "tool_result",
+                        "name": message.name,
+                        "content": message.content,
+                        "tool_call_id": message.tool_call_id,
+                    }
+                )
+    return events
+
+
+async def _aproduce(graph, input, config, queue):
+    # The token event not queued yet, extended with later tokens of its message
+    pending = None
+    try:
+        async for mode, chunk in graph.astream(input, config, stream_mode=["messages", "updates"]):
+            for event in stream_events(mode, chunk):
+                if event["event"] != "token":
+                    if pending is not None:
+                        await queue.put(pending)
+                        pending = None
+                    await queue.put(event)
+                    continue
+
+                if pending is not None and pending["id"] == event["id"]:
+                    pending["content"] += event["content"]
+                else:
+                    if pending is not None:
+                        await queue.put(pending)
+                    pending = event
+                if not queue.full():
+                    queue.put_nowait(pending)
+                    pending = None
+
+        if pending is not None:
+            await queue.put(pending)
+        await queue.put(_DONE)
+    except Exception as e:
+        await queue.put(e)
+
+
+async def astream_chat(input, config=None, graph=None, max_queue=DEFAULT_STREAM_QUEUE):
+    """
+    Run one turn of the chat agent, yielding its tokens and tool events as they arrive.
+
+    Args:
+        input: The graph input, e.g. {"messages": [("human", "...")]}
+        config: Run config with the thread_id
+        graph: Compiled graph to stream; the `chat` graph from `agent.graph.get_agent`
+            by default
+        max_queue: Events buffered for the consumer before tokens are merged
+
+    Yields:
+        dict: Stream events, see the module docstring
+    """
+    if graph is None:
+        from agent.graph import get_agent
+
+        graph = await get_agent(config)
+
+    started = time.perf_counter()
+    queue = asyncio.Queue(max_queue)
+    producer = asyncio.create_task(_aproduce(graph, input, config, queue))
+    first_token = True
+    try:
+        while True:
+            event = await queue.get()
+            if event is _DONE:
+                return
+            if isinstance(event, Exception):
+                raise event
+            if first_token and event["event"] == "token":
+                TIME_TO_FIRST_TOKEN.observe(value=time.perf_counter() - started)
+                first_token = False
+            yield event
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
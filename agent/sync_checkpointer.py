@@ -1,9 +1,14 @@
-import os
-from langgraph.checkpoint.postgres import PostgresSaver
+from agent.checkpointer import create_sync_checkpointer
+from agent.graph import build_agent
 
-with PostgresSaver.from_conn_string(DB_URI) as checkpointer:
-    graph = create_react_agent(model, tools=tools, checkpointer=checkpointer)
-    config = {"configurable": {"thread_id": "3"}}
+
+def run_sync_example(thread_id="3"):
+    """
+    Run the agent once with a synchronous PostgreSQL checkpointer and return the thread's checkpoints.
+    """
+    checkpointer = create_sync_checkpointer()
+    graph = build_agent(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
     res = graph.invoke({"messages": [("human", "what's the weather in sf")]}, config)
 
-    checkpoint_tuples = list(checkpointer.list(config))
\ No newline at end of file
+    return list(checkpointer.list(config))
@@ -0,0 +1,263 @@
+"""
+Result cache, request coalescing, concurrency limit and timeout for the agent's tools.
+
+`ToolResultCache` wraps one tool. `as_tool()` returns a tool with the same name, description
+and arguments for the react agent. A call through it:
+  * is served from memory if the same normalized arguments were answered within `ttl`
+    seconds. Normalizing collapses whitespace and case in strings, so "Weather in SF"
+    and "weather in  sf" share a result.
+  * otherwise joins an identical call already in flight, so a burst of N identical
+    searches makes one request
+  * otherwise runs the tool, with at most `max_concurrency` of its calls in flight at once
+  * fails with a ToolException after `timeout` seconds, including time spent waiting for
+    a free slot
+
+Failed calls are not cached; every caller joined to one gets its error. Sync calls
+coalesce with each other and async calls with each other. Sync calls run on a thread
+pool of `max_concurrency` threads, and a sync call that times out keeps its thread
+until the tool returns.
+
+`wrap_tools()` applies it to a list of tools, and `get_tool_options()` reads the options
+for `agent.graph.get_agent` from the TOOL_CACHE* environment variables.
+"""
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import dotenv
+from langchain_core.tools import StructuredTool, ToolException
+from agent.instrumentation import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+DEFAULT_TOOL_TTL = 300
+DEFAULT_TOOL_MAX_ENTRIES = 10000
+DEFAULT_TOOL_MAX_CONCURRENCY = 8
+DEFAULT_TOOL_TIMEOUT = 30
+
+CALLS = registry.counter("tool_cache_calls", "Tool calls through the tool result cache", ["tool", "result"])
+
+
+def normalize_args(value):
+    """
+    Normalize tool arguments: strings are whitespace-collapsed and case-folded.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {key: normalize_args(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(item) for item in value]
+    return value
+
+
+class ToolResultCache:
+    """
+    Memoizing, coalescing, rate-limited wrapper around one tool.
+    """
+
+    def __init__(
+        self,
+        tool,
+        ttl=DEFAULT_TOOL_TTL,
+        max_entries=DEFAULT_TOOL_MAX_ENTRIES,
+        max_concurrency=DEFAULT_TOOL_MAX_CONCURRENCY,
+        timeout=DEFAULT_TOOL_TIMEOUT,
+        normalize=normalize_args,
+        clock=time.monotonic,
+    ):
+        self.tool = tool
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.normalize = normalize
+        self.clock = clock
+        self.metrics = {"hits": 0, "misses": 0, "coalesced": 0, "timeouts": 0, "errors": 0}
+        # key -> (result, expires at), least recently used first
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> leading call, per event loop for async calls
+        self._inflight = {}
+        self._sync_inflight = {}
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._executor = None
+
+    def stats(self):
+        """
+        Get the hit/miss/coalesced/timeout/error counters and current size.
+        """
+        return {**self.metrics, "entries": len(self._results)}
+
+    def _count(self, result):
+        self.metrics[result] += 1
+        CALLS.inc(self.tool.name, result)
+
+    def _key(self, kwargs):
+        return json.dumps(self.normalize(kwargs), sort_keys=True, default=str)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry
+
+    def _store(self, key, result):
+        with self._lock:
+            self._results[key] = (result, self.clock() + self.ttl)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def _tool_call(self, kwargs):
+        return {"type": "tool_call", "name": self.tool.name, "args": kwargs, "id": "tool_cache"}
+
+    def _result(self, message):
+        # Tools that handle their own errors return them as content; don't cache those
+        if message.status == "error":
+            raise ToolException(message.content)
+        if self.tool.response_format == "content_and_artifact":
+            return message.content, message.artifact
+        return message.content
+
+    def _timed_out(self):
+        self._count("timeouts")
+        return ToolException(f"{self.tool.name} timed out after {self.timeout}s")
+
+    async def _arun(self, key, kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        async def call():
+            async with semaphore:
+                return self._result(await self.tool.ainvoke(self._tool_call(kwargs)))
+
+        try:
+            result = await asyncio.wait_for(call(), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out() from None
+        except Exception:
+            self._count("errors")
+            raise
+        self._store(key, result)
+        return result
+
+    async def acall(self, **kwargs):
+        key = self._key(kwargs)
+        entry = self._get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry[0]
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get((loop, key))
+        if task is None:
+            self._count("misses")
+            task = self._inflight[(loop, key)] = loop.create_task(self._arun(key, kwargs))
+            task.add_done_callback(lambda _: self._inflight.pop((loop, key), None))
+        else:
+            self._count("coalesced")
+        # Shielded, so a cancelled caller doesn't cancel the call for the others joined to it
+        return await asyncio.shield(task)
+
+    def call(self, **kwargs):
+        key = self._key(kwargs)
+        entry = self._get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry[0]
+
+        with self._lock:
+            future = self._sync_inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._sync_inflight[key] = concurrent.futures.Future()
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        self.max_concurrency, thread_name_prefix=f"tool-{self.tool.name}"
+                    )
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        self._count("misses")
+        try:
+            call = self._executor.submit(lambda: self._result(self.tool.invoke(self._tool_call(kwargs))))
+            try:
+                result = call.result(timeout=self.timeout)
+            except concurrent.futures.TimeoutError:
+                raise self._timed_out() from None
+            except Exception:
+                self._count("errors")
+                raise
+            self._store(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._sync_inflight[key]
+
+    def as_tool(self):
+        """
+        Get a tool with the wrapped tool's name, description and arguments that calls
+        through this cache. The cache is in the tool's metadata, under "tool_cache".
+        """
+        return StructuredTool.from_function(
+            func=self.call,
+            coroutine=self.acall,
+            name=self.tool.name,
+            description=self.tool.description,
+            args_schema=self.tool.args_schema or self.tool.tool_call_schema,
+            response_format=self.tool.response_format,
+            metadata={**(self.tool.metadata or {}), "tool_cache": self},
+        )
+
+
+def wrap_tools(tools, **options):
+    """
+    Wrap each tool in its own ToolResultCache.
+
+    Args:
+        tools: The tools to wrap
+        **options: ToolResultCache options shared by all of them
+
+    Returns:
+        list: The wrapped tools, in the same order
+    """
+    return [ToolResultCache(tool, **options).as_tool() for tool in tools]
+
+
+def get_tool_options():
+    """
+    Get the ToolResultCache options from environment variables, or None if TOOL_CACHE
+    is not "on".
+
+    Returns:
+        dict: ttl (TOOL_CACHE_TTL), max_entries (TOOL_CACHE_MAX_ENTRIES), max_concurrency
+            (TOOL_MAX_CONCURRENCY) and timeout (TOOL_TIMEOUT)
+    """
+    if os.environ.get("TOOL_CACHE", "off").lower() != "on":
+        return None
+    return {
+        "ttl": float(os.environ.get("TOOL_CACHE_TTL", DEFAULT_TOOL_TTL)),
+        "max_entries": int(os.environ.get("TOOL_CACHE_MAX_ENTRIES", DEFAULT_TOOL_MAX_ENTRIES)),
+        "max_concurrency": int(os.environ.get("TOOL_MAX_CONCURRENCY", DEFAULT_TOOL_MAX_CONCURRENCY)),
+        "timeout": float(os.environ.get("TOOL_TIMEOUT", DEFAULT_TOOL_TIMEOUT)),
+    }
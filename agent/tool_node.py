@@ -0,0 +1,102 @@
+"""
+Tool node running the tool calls of one model turn in parallel, with a concurrency limit.
+
+`ParallelToolNode` is a drop-in `ToolNode` for `create_react_agent`. When the model asks
+for several tools in one AIMessage, up to `max_concurrency` of the calls run at once:
+  * async tools are awaited on the event loop
+  * sync-only tools run on the node's own pool of `max_concurrency` threads, instead of
+    the loop's default executor shared with everything else
+  * a sync invoke runs every call on that same pool
+
+A turn then takes about as long as its slowest tool rather than the sum of all of them.
+The ToolMessages are returned in the order of the tool calls, whatever order they finish
+in, as one update. So the turn is checkpointed once, after every call has finished.
+
+The limit only applies to the node's own pool and semaphore; the config passed on to
+the tools is left as it is.
+
+`get_tool_call_concurrency()` reads the limit for `agent.graph.get_agent` from
+TOOL_CALL_CONCURRENCY. When it is unset, the agent keeps the stock ToolNode.
+"""
+import asyncio
+import logging
+import os
+import threading
+import dotenv
+from langchain_core.runnables.config import ContextThreadPoolExecutor, get_config_list, run_in_executor
+from langchain_core.tools import BaseTool, StructuredTool
+from langgraph.prebuilt import ToolNode
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+DEFAULT_TOOL_CALL_CONCURRENCY = 8
+
+
+def is_sync_only(tool):
+    """
+    Get whether a tool has no async implementation, so `ainvoke` would run it in a thread.
+    """
+    if isinstance(tool, StructuredTool):
+        return tool.coroutine is None
+    return type(tool)._arun is BaseTool._arun
+
+
+class ParallelToolNode(ToolNode):
+    """
+    ToolNode running at most `max_concurrency` tool calls of a turn at once.
+    """
+
+    def __init__(self, tools, *, max_concurrency=DEFAULT_TOOL_CALL_CONCURRENCY, **kwargs):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ContextThreadPoolExecutor(
+                    self.max_concurrency, thread_name_prefix=f"{self.name}-node"
+                )
+            return self._executor
+
+    def _func(self, input, config, *, store):
+        tool_calls, input_type = self._parse_input(input, store)
+        config_list = get_config_list(config, len(tool_calls))
+        # map returns the outputs in the order of the calls
+        outputs = list(
+            self._get_executor().map(
+                self._run_one, tool_calls, [input_type] * len(tool_calls), config_list
+            )
+        )
+        return self._combine_tool_outputs(outputs, input_type)
+
+    async def _afunc(self, input, config, *, store):
+        tool_calls, input_type = self._parse_input(input, store)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(call):
+            async with semaphore:
+                tool = self.tools_by_name.get(call["name"])
+                if tool is not None and is_sync_only(tool):
+                    return await run_in_executor(
+                        self._get_executor(), self._run_one, call, input_type, config
+                    )
+                return await self._arun_one(call, input_type, config)
+
+        # gather returns the outputs in the order of the calls
+        outputs = await asyncio.gather(*(run(call) for call in tool_calls))
+        return self._combine_tool_outputs(outputs, input_type)
+
+
+def get_tool_call_concurrency():
+    """
+    Get the number of tool calls of one turn that may run at once (TOOL_CALL_CONCURRENCY),
+    or None to keep the stock ToolNode when it is unset.
+    """
+    concurrency = os.environ.get("TOOL_CALL_CONCURRENCY")
+    return int(concurrency) if concurrency else None
@@ -0,0 +1,42 @@
+"""
+HTTP app mounted into the LangGraph server, referenced as "http.app" in langgraph.json.
+
+It adds no routes. Its lifespan opens the checkpoint database connection the `chat` graph
+uses on server startup and closes it on shutdown: the shared async connection pool, or
+the async SQLite connection with CHECKPOINT_BACKEND=sqlite.
+
+Starlette is installed with the LangGraph server.
+"""
+import logging
+from contextlib import asynccontextmanager
+import dotenv
+from starlette.applications import Starlette
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+dotenv.load_dotenv()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Open the checkpoint database connection on startup and close it on shutdown.
+    """
+    from agent.checkpointer import get_checkpoint_backend
+
+    if get_checkpoint_backend() == "sqlite":
+        from agent.sqlite_checkpointer import get_async_sqlite_connection, close_async_sqlite
+
+        await get_async_sqlite_connection()
+        try:
+            yield
+        finally:
+            await close_async_sqlite()
+    else:
+        from agent.async_checkpointer import async_pool_lifespan
+
+        async with async_pool_lifespan(app):
+            yield
+
+
+app = Starlette(lifespan=lifespan)
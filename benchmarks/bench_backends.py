@@ -0,0 +1,56 @@
+"""
+Compare the checkpoint backends selectable with CHECKPOINT_BACKEND.
+
+Runs the benchmark harness (benchmarks/harness.py) on the embedded SQLite backend and on
+Postgres, and prints turn throughput and per-operation median latencies side by side.
+Postgres is BENCH_DB_URI or a throwaway local server, so the comparison leaves out the
+network round trips a remote database adds to every Postgres query.
+
+Usage:
+    python -m benchmarks.bench_backends [--threads 20] [--turns 5] [--concurrency 8] \
+        [--modes sync,async]
+"""
+import argparse
+from benchmarks.harness import OPERATIONS, run_benchmarks
+
+BACKENDS = ("sqlite", "postgres")
+
+
+def compare(threads, turns, concurrency, modes):
+    """
+    Run the harness on each backend.
+
+    Returns:
+        dict: The harness report of each backend
+    """
+    return {
+        backend: run_benchmarks(threads, turns, concurrency, modes, backend=backend)
+        for backend in BACKENDS
+    }
+
+
+def row(label, values):
+    return f"{label:<28}" + "".join(f"{value:>26}" for value in values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    reports = compare(args.threads, args.turns, args.concurrency, modes)
+
+    print(row("", [reports[backend]["backend"] for backend in BACKENDS]))
+    for mode in modes:
+        results = [reports[backend]["results"][mode] for backend in BACKENDS]
+        print(row(f"[{mode}] turns/s", [f"{r['turns_per_s']:.1f}" for r in results]))
+        for operation in OPERATIONS:
+            p50s = [f"{r['latency'][operation]['p50_ms']:.2f}" for r in results]
+            print(row(f"[{mode}] {operation} p50 ms", p50s))
+
+if __name__ == "__main__":
+    main()
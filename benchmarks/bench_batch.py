@@ -0,0 +1,107 @@
+"""
+Benchmark batch throughput against the concurrency limit.
+
+Runs --items conversations through the react agent with the fake model and search tool
+from tests/fake_agent.py (the model sleeps --model-latency seconds per call) using
+agent/batch.py, once per --concurrency level. Reports runs per second, per-run latency
+percentiles and, with the Postgres checkpointer, how long runs waited for a pooled
+connection. Throughput should scale with the concurrency limit until the database or the
+pool (SUPABASE_DB_POOL_MAX_SIZE) saturates.
+
+Usage:
+    python -m benchmarks.bench_batch [--items 400] [--concurrency 1,4,16,64] \
+        [--model-latency 0.05] [--checkpointer buffered|postgres|memory]
+"""
+import argparse
+import asyncio
+import os
+import time
+from uuid import uuid4
+from benchmarks.common import percentiles, format_summary
+
+CHECKPOINTERS = ("buffered", "postgres", "memory")
+
+
+async def make_checkpointer(kind):
+    if kind == "buffered":
+        from agent.batch import aget_batch_checkpointer
+
+        return await aget_batch_checkpointer()
+    if kind == "postgres":
+        from agent.async_checkpointer import get_async_checkpointer
+
+        return await get_async_checkpointer()
+
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    return InMemorySaver()
+
+
+async def run_level(kind, items, concurrency, model_latency):
+    from agent.batch import arun_batch
+    from tests.fake_agent import build_fake_react_agent
+
+    checkpointer = await make_checkpointer(kind)
+    graph = build_fake_react_agent(latency=model_latency, checkpointer=checkpointer)
+    # The graph module turns LangSmith tracing on; a benchmark must not trace every run
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    pool = None
+    if kind != "memory":
+        from agent.async_checkpointer import get_async_pool
+
+        pool = await get_async_pool()
+        pool.pop_stats()
+
+    prefix = f"bench-batch-{uuid4()}"
+    thread_ids = [f"{prefix}-{n}" for n in range(items)]
+    work = ((thread_id, {"messages": [("human", f"question {thread_id}")]}) for thread_id in thread_ids)
+
+    latencies, failed = [], 0
+    started = time.perf_counter()
+    async for result in arun_batch(graph, work, concurrency=concurrency, resume=False):
+        latencies.append(result["seconds"])
+        failed += result["status"] == "failed"
+    elapsed = time.perf_counter() - started
+
+    stats = {}
+    if pool is not None:
+        from agent.async_checkpointer import apurge_checkpoints
+
+        if hasattr(checkpointer, "aclose"):
+            await checkpointer.aclose()
+        stats = pool.pop_stats()
+        await apurge_checkpoints(thread_ids=thread_ids)
+    return {"elapsed": elapsed, "latencies": latencies, "failed": failed, "pool_stats": stats}
+
+
+async def amain(args):
+    from agent.async_checkpointer import close_async_pool
+
+    for concurrency in args.concurrency:
+        result = await run_level(args.checkpointer, args.items, concurrency, args.model_latency)
+        wait_ms = result["pool_stats"].get("requests_wait_ms", 0)
+        print(
+            f"concurrency {concurrency:>4}: {args.items / result['elapsed']:8.1f} runs/s, "
+            f"{result['failed']} failed, pool wait {wait_ms} ms"
+        )
+        print(format_summary("  run latency", percentiles(result["latencies"])))
+    await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=400)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 4, 16, 64],
+        help="comma-separated concurrency levels",
+    )
+    parser.add_argument("--model-latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--checkpointer", choices=CHECKPOINTERS, default="buffered")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
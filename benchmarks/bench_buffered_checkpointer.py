@@ -0,0 +1,68 @@
+"""
+Benchmark the write-behind BufferedCheckpointSaver against the plain AsyncPostgresSaver.
+
+Runs the fake agent graph from tests/fake_agent.py for a number of concurrent threads
+and turns, and reports per-turn latency for each durability level. Requires the
+SUPABASE_DB_* database settings.
+
+Usage:
+    python -m benchmarks.bench_buffered_checkpointer [--threads 20] [--turns 10]
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from agent.async_checkpointer import get_async_checkpointer, apurge_checkpoints, close_async_pool
+from agent.buffered_checkpointer import BufferedCheckpointSaver, ainvoke_durably
+from benchmarks.common import percentiles, format_summary
+from tests.fake_agent import build_fake_agent_graph
+
+
+async def run_conversation(graph, turns, latencies):
+    thread_id = str(uuid4())
+    config = {"configurable": {"thread_id": thread_id}}
+    for turn in range(turns):
+        start = time.perf_counter()
+        await ainvoke_durably(graph, {"messages": [("human", f"question {turn}")]}, config)
+        latencies.append(time.perf_counter() - start)
+    return thread_id
+
+
+async def run_variant(checkpointer, threads, turns):
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    latencies = []
+
+    start = time.perf_counter()
+    thread_ids = await asyncio.gather(
+        *(run_conversation(graph, turns, latencies) for _ in range(threads))
+    )
+    if isinstance(checkpointer, BufferedCheckpointSaver):
+        await checkpointer.aclose()
+    elapsed = time.perf_counter() - start
+
+    await apurge_checkpoints(thread_ids=thread_ids)
+    return latencies, elapsed
+
+
+async def main(threads, turns):
+    saver = await get_async_checkpointer()
+    variants = {
+        "plain AsyncPostgresSaver": lambda: saver,
+        "buffered (run)": lambda: BufferedCheckpointSaver(saver, durability="run"),
+        "buffered (async)": lambda: BufferedCheckpointSaver(saver, durability="async"),
+    }
+
+    for name, make_checkpointer in variants.items():
+        latencies, elapsed = await run_variant(make_checkpointer(), threads, turns)
+        print(format_summary(name, percentiles(latencies)))
+        print(f"{'':<28} total={elapsed:.2f}s  turns/s={threads * turns / elapsed:.1f}")
+
+    await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.turns))
@@ -0,0 +1,80 @@
+"""
+Benchmark bulk checkpoint seeding, export and import against a `put` loop.
+
+In a scratch schema with the checkpoint indexes, times --put-checkpoints checkpoints
+written one `put` at a time, then seeds --threads threads of --checkpoints checkpoints
+with binary COPY (agent/bulk.py), exports them to a dump file, truncates the tables and
+imports the dump through the staging tables. Reports checkpoints per second for each.
+
+The database is BENCH_DB_URI if set, otherwise a throwaway local server (see
+benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.bench_bulk [--threads 100000] [--checkpoints 10] [--put-checkpoints 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from langgraph.checkpoint.postgres import PostgresSaver
+from agent.bulk import export_checkpoints, import_checkpoints, seed_checkpoints
+from agent.checkpointer import migrate_indexes
+from benchmarks.harness import local_postgres
+from benchmarks.index_advisor import scratch_schema
+
+
+def put_loop(saver, count):
+    config = {"configurable": {"thread_id": "put-loop", "checkpoint_ns": ""}}
+    for step in range(count):
+        checkpoint = {
+            "v": 1,
+            "id": f"checkpoint-{step:08d}",
+            "ts": "2024-01-01T00:00:00+00:00",
+            "channel_values": {"messages": [f"message {n}" for n in range(step % 10 + 1)]},
+            "channel_versions": {"messages": f"{step + 1}"},
+            "versions_seen": {},
+            "pending_sends": [],
+        }
+        config = saver.put(config, checkpoint, {"step": step}, {"messages": f"{step + 1}"})
+
+
+def timed(label, checkpoints, fn, *args, **kwargs):
+    begin = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - begin
+    print(f"{label:<10} {checkpoints:>10} checkpoints in {elapsed:7.2f}s  {checkpoints / elapsed:>10.0f}/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=100000)
+    parser.add_argument("--checkpoints", type=int, default=10, help="per thread")
+    parser.add_argument("--put-checkpoints", type=int, default=2000)
+    args = parser.parse_args()
+    total = args.threads * args.checkpoints
+
+    with local_postgres() as (backend, dsn):
+        if dsn is None:
+            parser.error("no Postgres server found; set BENCH_DB_URI or install pgserver")
+        print(f"Backend: {backend}")
+
+        with scratch_schema(dsn, "bench_bulk") as conn, tempfile.TemporaryDirectory() as tmp:
+            saver = PostgresSaver(conn)
+            saver.setup()
+            migrate_indexes(conn)
+            path = os.path.join(tmp, "checkpoints.ckpt.gz")
+
+            timed("put loop", args.put_checkpoints, put_loop, saver, args.put_checkpoints)
+            conn.execute("TRUNCATE checkpoints, checkpoint_blobs, checkpoint_writes")
+
+            timed("seed", total, seed_checkpoints, conn, args.threads, args.checkpoints)
+            timed("export", total, export_checkpoints, conn, path)
+            print(f"dump file  {os.path.getsize(path) / 1e6:.1f} MB")
+
+            conn.execute("TRUNCATE checkpoints, checkpoint_blobs, checkpoint_writes")
+            timed("import", total, import_checkpoints, conn, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark hot-thread resume latency of the CachingCheckpointSaver against the plain
+AsyncPostgresSaver.
+
+Creates a number of threads with the fake agent graph from tests/fake_agent.py, then
+repeatedly reads each thread's latest checkpoint, as resuming a conversation does.
+Reports per-read latency with no cache, the in-process tier and the file tier alone,
+plus the cache metrics. Requires the SUPABASE_DB_* database settings.
+
+Usage:
+    python -m benchmarks.bench_cached_checkpointer [--threads 20] [--turns 10] [--reads 20]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from uuid import uuid4
+from agent.async_checkpointer import get_async_checkpointer, apurge_checkpoints, close_async_pool
+from agent.cached_checkpointer import CachingCheckpointSaver, FileCacheTier
+from benchmarks.common import percentiles, format_summary
+from tests.fake_agent import build_fake_agent_graph
+
+
+async def seed_threads(saver, threads, turns):
+    graph = build_fake_agent_graph(checkpointer=saver)
+    configs = [{"configurable": {"thread_id": str(uuid4())}} for _ in range(threads)]
+    for turn in range(turns):
+        await asyncio.gather(
+            *(graph.ainvoke({"messages": [("human", f"question {turn}")]}, config) for config in configs)
+        )
+    return configs
+
+
+async def run_variant(checkpointer, configs, reads):
+    latencies = []
+    for _ in range(reads):
+        for config in configs:
+            start = time.perf_counter()
+            await checkpointer.aget_tuple(config)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(threads, turns, reads):
+    saver = await get_async_checkpointer()
+    configs = await seed_threads(saver, threads, turns)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        variants = {
+            "plain AsyncPostgresSaver": lambda: saver,
+            "cached (memory)": lambda: CachingCheckpointSaver(saver),
+            # No in-process budget, so every hit comes from the shared file tier
+            "cached (file tier)": lambda: CachingCheckpointSaver(
+                saver, max_bytes=0, shared_tier=FileCacheTier(cache_dir)
+            ),
+        }
+
+        for name, make_checkpointer in variants.items():
+            checkpointer = make_checkpointer()
+            latencies = await run_variant(checkpointer, configs, reads)
+            print(format_summary(name, percentiles(latencies)))
+            if isinstance(checkpointer, CachingCheckpointSaver):
+                print(f"{'':<28} {checkpointer.stats()}")
+
+    await apurge_checkpoints(thread_ids=[config["configurable"]["thread_id"] for config in configs])
+    await close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.turns, args.reads))
@@ -0,0 +1,99 @@
+"""
+Benchmark per-turn latency, prompt size and checkpoint size over a long conversation.
+
+Runs --turns turns on one thread through the react agent with the fake model and search
+tool from tests/fake_agent.py, once with the full history and once with the history
+trimmed to --max-tokens by agent/context.py (with a fake summary model, so every trim
+also rolls the summary). Every --report turns it prints the mean turn latency, the
+approximate prompt tokens sent to the model and the size of the latest serialized
+checkpoint. With trimming, all three should stay flat after the first trims, instead
+of growing with the number of turns.
+
+Usage:
+    python -m benchmarks.bench_context [--turns 200] [--report 25] [--max-tokens 2000] \
+        [--checkpointer memory|postgres|buffered]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+from langchain_community.chat_models import FakeListChatModel
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt import create_react_agent
+from agent.context import HistoryTrimmer, SummaryState
+from benchmarks.bench_batch import CHECKPOINTERS, make_checkpointer
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+async def run(args, trimmer):
+    from tests.fake_agent import FakeToolCallingChatModel, fake_responses, fake_search
+
+    model = FakeToolCallingChatModel(responses=fake_responses)
+    checkpointer = await make_checkpointer(args.checkpointer)
+    if trimmer is None:
+        prompt = SYSTEM_PROMPT
+        graph = create_react_agent(model, [fake_search], prompt=prompt, checkpointer=checkpointer)
+    else:
+        prompt = trimmer.prompt(SYSTEM_PROMPT)
+        graph = create_react_agent(
+            model,
+            [fake_search],
+            prompt=prompt,
+            pre_model_hook=trimmer.as_hook(),
+            state_schema=SummaryState,
+            checkpointer=checkpointer,
+        )
+
+    thread_id = f"bench-context-{uuid4()}"
+    config = {"configurable": {"thread_id": thread_id}}
+    latencies = []
+    for turn in range(1, args.turns + 1):
+        question = f"Turn {turn}: what is the weather like in San Francisco this afternoon?"
+        begin = time.perf_counter()
+        await graph.ainvoke({"messages": [("human", question)]}, config)
+        latencies.append(time.perf_counter() - begin)
+
+        if turn % args.report == 0:
+            latest = await checkpointer.aget_tuple(config)
+            state = latest.checkpoint["channel_values"]
+            prompt_messages = trimmer.prompt(SYSTEM_PROMPT)(state) if trimmer else state["messages"]
+            checkpoint_bytes = len(checkpointer.serde.dumps_typed(latest.checkpoint)[1])
+            print(
+                f"  turn {turn:>4}: {statistics.fmean(latencies[-args.report:]) * 1000:7.2f} ms/turn, "
+                f"{len(state['messages']):>4} messages, "
+                f"~{count_tokens_approximately(prompt_messages):>6} prompt tokens, "
+                f"{checkpoint_bytes:>8} checkpoint bytes"
+            )
+
+    if hasattr(checkpointer, "aclose"):
+        await checkpointer.aclose()
+    if args.checkpointer != "memory":
+        from agent.async_checkpointer import apurge_checkpoints
+
+        await apurge_checkpoints(thread_ids=[thread_id])
+
+
+async def amain(args):
+    from agent.async_checkpointer import close_async_pool
+
+    print("full history")
+    await run(args, None)
+    print(f"trimmed to {args.max_tokens} tokens, with a summary")
+    summaries = FakeListChatModel(responses=["The user keeps asking about the weather in San Francisco."])
+    await run(args, HistoryTrimmer(args.max_tokens, summary_model=summaries))
+    await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--report", type=int, default=25, help="turns per report line")
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--checkpointer", choices=CHECKPOINTERS, default="memory")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
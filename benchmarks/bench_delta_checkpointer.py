@@ -0,0 +1,90 @@
+"""
+Benchmark a long conversation with and without message deltas.
+
+Runs --turns turns on one thread through the fake agent graph from tests/fake_agent.py,
+once on the plain checkpointer and once wrapped in DeltaMessagesSaver, and reports the
+per-turn latency, the serialized size of the stored message channels and the latency of
+a cold read of the latest checkpoint (by a saver with no in-process state, as another
+worker would read it). With deltas, turns should serialize less as the thread grows,
+and a cold read should cost one extra read of the latest snapshot.
+
+Usage:
+    python -m benchmarks.bench_delta_checkpointer [--turns 500] [--snapshot-every 10] \
+        [--reads 20] [--checkpointer memory|postgres|buffered]
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from agent.delta_checkpointer import DeltaMessagesSaver
+from benchmarks.bench_batch import CHECKPOINTERS, make_checkpointer
+from benchmarks.common import percentiles, format_summary
+from tests.fake_agent import build_fake_agent_graph
+
+
+def stored_message_bytes(serde, checkpoint_tuples):
+    """
+    Serialized size of each stored version of the messages channel.
+    """
+    sizes = {}
+    for checkpoint_tuple in checkpoint_tuples:
+        version = checkpoint_tuple.checkpoint["channel_versions"].get("messages")
+        if version is not None and version not in sizes:
+            value = checkpoint_tuple.checkpoint["channel_values"]["messages"]
+            sizes[version] = len(serde.dumps_typed(value)[1])
+    return sum(sizes.values())
+
+
+async def run(args, delta):
+    inner = await make_checkpointer(args.checkpointer)
+    saver = DeltaMessagesSaver(inner, snapshot_every=args.snapshot_every) if delta else inner
+    graph = build_fake_agent_graph(checkpointer=saver)
+    thread_id = f"bench-delta-{uuid4()}"
+    config = {"configurable": {"thread_id": thread_id}}
+
+    turns = []
+    for turn in range(args.turns):
+        begin = time.perf_counter()
+        await graph.ainvoke({"messages": [("human", f"question {turn}")]}, config)
+        turns.append(time.perf_counter() - begin)
+
+    reads = []
+    for _ in range(args.reads):
+        reader = DeltaMessagesSaver(inner) if delta else inner
+        begin = time.perf_counter()
+        await reader.aget_tuple(config)
+        reads.append(time.perf_counter() - begin)
+
+    stored = [checkpoint_tuple async for checkpoint_tuple in inner.alist(config)]
+    name = "delta" if delta else "plain"
+    print(format_summary(f"{name} turn", percentiles(turns)))
+    print(format_summary(f"{name} cold read", percentiles(reads)))
+    print(f"{name + ' stored messages':<28} {stored_message_bytes(inner.serde, stored) / 1e6:.2f} MB")
+
+    if hasattr(inner, "aclose"):
+        await inner.aclose()
+    if args.checkpointer != "memory":
+        from agent.async_checkpointer import apurge_checkpoints
+
+        await apurge_checkpoints(thread_ids=[thread_id])
+
+
+async def amain(args):
+    from agent.async_checkpointer import close_async_pool
+
+    await run(args, delta=False)
+    await run(args, delta=True)
+    await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--snapshot-every", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=20)
+    parser.add_argument("--checkpointer", choices=CHECKPOINTERS, default="memory")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
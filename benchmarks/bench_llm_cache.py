@@ -0,0 +1,67 @@
+"""
+Benchmark the chat model response cache on a workload of repeated questions.
+
+Runs --runs single-turn conversations, each in its own thread, through the react agent
+with the fake model and search tool from tests/fake_agent.py (the model sleeps
+--model-latency seconds per call). Questions are drawn from --questions distinct ones
+with Zipf-distributed popularity, so a few are asked very often. Compares per-run
+latency without a cache and with the exact tier of agent/llm_cache.py, and reports
+the cache's hit rate.
+
+Usage:
+    python -m benchmarks.bench_llm_cache [--runs 500] [--questions 100] [--model-latency 0.05]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.llm_cache import LLMResponseCache
+from benchmarks.common import percentiles, format_summary
+
+
+def zipf_questions(runs, questions, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, questions + 1)]
+    return [f"question number {n}" for n in rng.choices(range(questions), weights, k=runs)]
+
+
+async def run(workload, model_latency, llm_cache):
+    from agent.graph import build_agent
+    from tests.fake_agent import FakeToolCallingChatModel, fake_responses, fake_search
+
+    model = FakeToolCallingChatModel(responses=fake_responses, latency=model_latency)
+    graph = build_agent(model=model, tools=[fake_search], checkpointer=InMemorySaver(), llm_cache=llm_cache)
+    # The graph module turns LangSmith tracing on; a benchmark must not trace every run
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    latencies = []
+    for n, question in enumerate(workload):
+        begin = time.perf_counter()
+        await graph.ainvoke({"messages": [("human", question)]}, {"configurable": {"thread_id": str(n)}})
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+
+async def amain(args):
+    workload = zipf_questions(args.runs, args.questions)
+    print(f"{len(set(workload))} distinct questions in {args.runs} runs")
+
+    print(format_summary("no cache", percentiles(await run(workload, args.model_latency, None))))
+    cache = LLMResponseCache()
+    print(format_summary("exact cache", percentiles(await run(workload, args.model_latency, cache))))
+    stats = cache.stats()
+    print(f"hit rate {stats['hit_rate']:.1%} ({stats['exact_hits']} hits, {stats['misses']} misses)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="seconds per model call")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark the time-partitioned checkpoint layout against the plain tables.
+
+Seeds the same checkpoints (each thread living on one of --days days) into a plain and a
+time-partitioned scratch schema, then reports put/put_writes and latest-checkpoint
+lookup latency, and the cost of dropping the older half of the days: DELETEs plus a blob
+sweep for the plain tables, partition drops plus a blob sweep for the partitioned ones.
+The tables' on-disk size after retention shows the bloat DELETEs leave for vacuum.
+
+The database is BENCH_DB_URI if set, otherwise a throwaway local server (see
+benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.bench_partitions [--threads 400] [--checkpoints 10] [--days 10] \
+        [--lookups 2000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from langgraph.checkpoint.postgres import PostgresSaver
+from agent.checkpointer import migrate_indexes
+from agent.partitions import (
+    SWEEP_BLOBS_SQL,
+    drop_expired_partitions,
+    ensure_partitions,
+    install_partitioned_schema,
+    uuid6_at,
+)
+from benchmarks.common import percentiles, format_summary
+from benchmarks.harness import local_postgres
+from benchmarks.index_advisor import scratch_schema
+
+LAYOUTS = ("plain", "partitioned")
+
+# pg_partition_tree() is empty for an unpartitioned table
+TABLE_SIZE_SQL = """
+    SELECT COALESCE(
+        (SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(%(table)s::regclass)),
+        pg_total_relation_size(%(table)s::regclass)
+    )
+"""
+
+DELETE_OLD_SQL = [
+    "DELETE FROM checkpoint_writes WHERE checkpoint_id < %(bound)s",
+    "DELETE FROM checkpoints WHERE checkpoint_id < %(bound)s",
+]
+
+
+def install(conn, layout, start, end):
+    saver = PostgresSaver(conn)
+    if layout == "plain":
+        saver.setup()
+        migrate_indexes(conn)
+    else:
+        settings = {"mode": "time", "days": 1, "premake": 0, "hash_partitions": 16}
+        install_partitioned_schema(conn, settings)
+        migrate_indexes(conn, concurrently=False)
+        ensure_partitions(conn, settings, start=start, end=end)
+    return saver
+
+
+def seed(saver, threads, checkpoints, start, days):
+    """
+    Write each thread's checkpoints, timing every put and put_writes.
+    """
+    latencies = {"put": [], "put_writes": []}
+    for i in range(threads):
+        moment = start + timedelta(days=i % days, seconds=i)
+        config = {"configurable": {"thread_id": f"thread-{i:05d}", "checkpoint_ns": ""}}
+        for step in range(checkpoints):
+            checkpoint = {
+                "v": 1,
+                "id": uuid6_at(moment + timedelta(milliseconds=step), clock_seq=step, node=i),
+                "ts": moment.isoformat(),
+                "channel_values": {"messages": [f"message {n}" for n in range(step + 1)]},
+                "channel_versions": {"messages": f"{step + 1}"},
+                "versions_seen": {},
+                "pending_sends": [],
+            }
+            begin = time.perf_counter()
+            config = saver.put(config, checkpoint, {"step": step}, {"messages": f"{step + 1}"})
+            latencies["put"].append(time.perf_counter() - begin)
+
+            begin = time.perf_counter()
+            saver.put_writes(config, [("messages", f"pending {step}")], f"task-{step}")
+            latencies["put_writes"].append(time.perf_counter() - begin)
+    return latencies
+
+
+def lookup(saver, threads, lookups):
+    latencies = []
+    for _ in range(lookups):
+        config = {"configurable": {"thread_id": f"thread-{random.randrange(threads):05d}"}}
+        begin = time.perf_counter()
+        saver.get_tuple(config)
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+
+def table_bytes(conn):
+    with conn.cursor() as cur:
+        total = 0
+        for table in ("checkpoints", "checkpoint_writes", "checkpoint_blobs"):
+            cur.execute(TABLE_SIZE_SQL, {"table": table})
+            total += int(cur.fetchone()[0])
+        return total
+
+
+def apply_retention(conn, layout, cutoff):
+    """
+    Remove every checkpoint older than `cutoff`, with its writes and orphaned blobs.
+    """
+    if layout == "partitioned":
+        return drop_expired_partitions(conn, datetime.now(timezone.utc) - cutoff)
+
+    counts = {"checkpoint_blobs": 0}
+    with conn.cursor() as cur:
+        for statement in DELETE_OLD_SQL:
+            cur.execute(statement, {"bound": uuid6_at(cutoff)})
+            counts[statement.split()[2]] = cur.rowcount
+        cur.execute(SWEEP_BLOBS_SQL.format(partition="checkpoint_blobs"))
+        counts["checkpoint_blobs"] = cur.rowcount
+    return counts
+
+
+def run_layout(dsn, layout, threads, checkpoints, days, lookups):
+    now = datetime.now(timezone.utc)
+    start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = start + timedelta(days=days // 2)
+
+    with scratch_schema(dsn, f"bench_{layout}") as conn:
+        saver = install(conn, layout, start, now + timedelta(days=1))
+        latencies = seed(saver, threads, checkpoints, start, days)
+        conn.execute("ANALYZE checkpoints, checkpoint_blobs, checkpoint_writes")
+        latencies["get_tuple"] = lookup(saver, threads, lookups)
+
+        size_before = table_bytes(conn)
+        begin = time.perf_counter()
+        removed = apply_retention(conn, layout, cutoff)
+        retention_s = time.perf_counter() - begin
+
+        return {
+            "latency": {operation: percentiles(samples) for operation, samples in latencies.items()},
+            "retention_ms": retention_s * 1000,
+            "removed": removed,
+            "bytes_before": size_before,
+            "bytes_after": table_bytes(conn),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=400)
+    parser.add_argument("--checkpoints", type=int, default=10, help="per thread")
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    with local_postgres() as (backend, dsn):
+        if dsn is None:
+            parser.error("no Postgres server found; set BENCH_DB_URI or install pgserver")
+        print(f"Backend: {backend}")
+
+        for layout in LAYOUTS:
+            result = run_layout(dsn, layout, args.threads, args.checkpoints, args.days, args.lookups)
+            print(f"{layout}:")
+            for operation, summary in result["latency"].items():
+                print(format_summary(f"  {operation}", summary))
+            print(
+                f"  retention {result['retention_ms']:.1f} ms, removed {result['removed']}, "
+                f"tables {result['bytes_before'] / 1e6:.1f} MB -> {result['bytes_after'] / 1e6:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
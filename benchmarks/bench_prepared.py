@@ -0,0 +1,129 @@
+"""
+Benchmark checkpointer calls with and without server-side prepared statements.
+
+Seeds --threads threads into a scratch schema, then times get_tuple on random threads
+and put of new checkpoints on one connection per SUPABASE_DB_PREPARE mode: `off` (every
+query parsed and planned on each call, as behind a transaction-mode pooler) and `on`
+(queries prepared after SUPABASE_DB_PREPARE_THRESHOLD executions). Modes alternate for
+--rounds rounds so drift affects both equally.
+
+The database is BENCH_DB_URI if set, otherwise a throwaway local server (see
+benchmarks/harness.py).
+
+Usage:
+    python -m benchmarks.bench_prepared [--threads 200] [--calls 2000] [--rounds 3]
+"""
+import argparse
+import random
+import time
+import psycopg
+from langgraph.checkpoint.postgres import PostgresSaver
+from agent.checkpointer import (
+    configure_connection,
+    connection_kwargs,
+    get_prepare_kwargs,
+    get_prepare_settings,
+    migrate_indexes,
+)
+from benchmarks.common import percentiles, format_summary
+from benchmarks.harness import local_postgres
+from benchmarks.index_advisor import scratch_schema
+
+MODES = ("off", "on")
+SCHEMA = "bench_prepared"
+
+
+def make_checkpoint(step):
+    return {
+        "v": 1,
+        "id": f"checkpoint-{step:08d}",
+        "ts": "2024-01-01T00:00:00+00:00",
+        "channel_values": {"messages": [f"message {n}" for n in range(step % 10 + 1)]},
+        "channel_versions": {"messages": f"{step + 1}"},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+
+
+def seed(saver, threads):
+    for i in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{i:05d}", "checkpoint_ns": ""}}
+        for step in range(3):
+            config = saver.put(config, make_checkpoint(step), {"step": step}, {"messages": f"{step + 1}"})
+
+
+def measure(dsn, mode, threads, calls):
+    """
+    Time get_tuple and put calls on a fresh connection in the given prepare mode.
+    """
+    settings = {**get_prepare_settings(), "mode": mode}
+    latencies = {"get_tuple": [], "put": []}
+    with psycopg.connect(
+        dsn,
+        options=f"-c search_path={SCHEMA}",
+        **connection_kwargs,
+        **get_prepare_kwargs(dsn, settings),
+    ) as conn:
+        configure_connection(conn, settings)
+        saver = PostgresSaver(conn)
+        for step in range(calls):
+            config = {"configurable": {"thread_id": f"thread-{random.randrange(threads):05d}"}}
+            begin = time.perf_counter()
+            saver.get_tuple(config)
+            latencies["get_tuple"].append(time.perf_counter() - begin)
+
+            config = {"configurable": {"thread_id": f"bench-{mode}", "checkpoint_ns": ""}}
+            begin = time.perf_counter()
+            saver.put(config, make_checkpoint(step), {"step": step}, {"messages": f"{step + 1}"})
+            latencies["put"].append(time.perf_counter() - begin)
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM pg_prepared_statements")
+            prepared = cur.fetchone()[0]
+    return latencies, prepared
+
+
+def run(dsn, threads, calls, rounds):
+    results = {mode: {"get_tuple": [], "put": [], "prepared": 0} for mode in MODES}
+    with scratch_schema(dsn, SCHEMA) as conn:
+        saver = PostgresSaver(conn)
+        saver.setup()
+        migrate_indexes(conn)
+        seed(saver, threads)
+        conn.execute("ANALYZE checkpoints, checkpoint_blobs, checkpoint_writes")
+
+        for _ in range(rounds):
+            for mode in MODES:
+                latencies, prepared = measure(dsn, mode, threads, calls)
+                for operation, samples in latencies.items():
+                    results[mode][operation].extend(samples)
+                results[mode]["prepared"] = prepared
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=2000, help="per operation, mode and round")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with local_postgres() as (backend, dsn):
+        if dsn is None:
+            parser.error("no Postgres server found; set BENCH_DB_URI or install pgserver")
+        print(f"Backend: {backend}")
+
+        results = run(dsn, args.threads, args.calls, args.rounds)
+        for mode in MODES:
+            print(f"prepare {mode} ({results[mode]['prepared']} prepared statements):")
+            for operation in ("get_tuple", "put"):
+                print(format_summary(f"  {operation}", percentiles(results[mode][operation])))
+
+        for operation in ("get_tuple", "put"):
+            off = percentiles(results["off"][operation])
+            on = percentiles(results["on"][operation])
+            print(f"{operation} p50 speedup: {off['p50_ms'] / on['p50_ms']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Microbenchmark checkpoint serializers on representative message states.
+
+Encodes and decodes a short chat, a long chat and a tool-heavy state (large search
+tool payloads) with the default JsonPlusSerializer and the CompressedSerializer codecs,
+and reports encode/decode throughput and the stored size. Needs no database; codecs
+whose package isn't installed are skipped.
+
+Usage:
+    python -m benchmarks.bench_serde [--repeat 200] [--threshold 1024]
+"""
+import argparse
+import time
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from agent.serde import COMPRESSORS, CompressedSerializer
+
+
+def chat(turns):
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(f"What's the weather in city number {turn}?"))
+        messages.append(AIMessage(f"The weather in city number {turn} is sunny with a high of 68°F."))
+    return messages
+
+
+def tool_heavy(calls):
+    messages = []
+    for call in range(calls):
+        results = [
+            {
+                "url": f"https://example.com/search/{call}/{i}",
+                "content": f"Result {i} for query {call}: forecast, radar and hourly conditions. " * 20,
+            }
+            for i in range(5)
+        ]
+        messages.append(HumanMessage(f"Search for the forecast number {call}"))
+        messages.append(
+            AIMessage("", tool_calls=[{"name": "tavily_search_results_json", "args": {"query": f"forecast {call}"}, "id": f"call_{call}"}])
+        )
+        messages.append(ToolMessage(content=str(results), tool_call_id=f"call_{call}"))
+        messages.append(AIMessage(f"Here is forecast number {call}."))
+    return messages
+
+
+STATES = {
+    "short chat (10 msgs)": chat(5),
+    "long chat (400 msgs)": chat(200),
+    "tool heavy (40 msgs)": tool_heavy(10),
+}
+
+
+def get_serializers(threshold):
+    serializers = {"jsonplus": JsonPlusSerializer()}
+    for compression in COMPRESSORS:
+        try:
+            serializers[f"jsonplus+{compression}"] = CompressedSerializer(
+                compression=compression, threshold=threshold
+            )
+        except ImportError as e:
+            print(f"Skipping {compression}: {e}")
+    return serializers
+
+
+def measure(serde, value, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        stored = serde.dumps_typed(value)
+    encode = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serde.loads_typed(stored)
+    decode = (time.perf_counter() - start) / repeat
+
+    return stored, encode, decode
+
+
+def main(repeat, threshold):
+    serializers = get_serializers(threshold)
+    for state_name, value in STATES.items():
+        raw_size = len(JsonPlusSerializer().dumps_typed(value)[1])
+        print(f"\n{state_name}: {raw_size / 1024:.1f} KiB encoded")
+        print(f"{'serializer':<20} {'type':<14} {'bytes':>9} {'ratio':>6} {'enc MB/s':>9} {'dec MB/s':>9}")
+        for name, serde in serializers.items():
+            (typ, data), encode, decode = measure(serde, value, repeat)
+            print(
+                f"{name:<20} {typ:<14} {len(data):>9} {raw_size / len(data):>6.2f} "
+                f"{raw_size / encode / 1e6:>9.1f} {raw_size / decode / 1e6:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+    main(args.repeat, args.threshold)
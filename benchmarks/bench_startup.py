@@ -0,0 +1,96 @@
+"""
+Startup-time benchmark for the chat graph module.
+
+Measures how long a fresh interpreter takes to import `agent.graph` (what a worker
+pays on cold start), compared with importing the modules the graph used to pull in
+eagerly, and optionally the cost of the first and cached `get_agent()` calls.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--with-db]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+EAGER_IMPORTS = [
+    "langchain_openai",
+    "langchain_community.tools.tavily_search",
+    "langgraph.prebuilt",
+    "langgraph.checkpoint.postgres.aio",
+    "psycopg_pool",
+]
+
+
+def time_import(statement, runs):
+    """
+    Time an import statement in fresh interpreters and return the median in seconds.
+    """
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t)"
+    )
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+async def time_get_agent():
+    """
+    Time the first (building) and second (cached) call of the graph factory.
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+    from agent.graph import get_agent
+    from agent.async_checkpointer import close_async_pool
+
+    start = time.perf_counter()
+    await get_agent()
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await get_agent()
+    cached = time.perf_counter() - start
+
+    await close_async_pool()
+    return first, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--with-db",
+        action="store_true",
+        help="also time get_agent() against the SUPABASE_DB_* database",
+    )
+    args = parser.parse_args()
+
+    lazy = time_import("import agent.graph", args.runs)
+    eager = time_import(
+        "; ".join(f"import {module}" for module in ["agent.graph", *EAGER_IMPORTS]),
+        args.runs,
+    )
+    print(f"import agent.graph (lazy):       {lazy * 1000:8.1f} ms")
+    print(f"import with eager dependencies:  {eager * 1000:8.1f} ms")
+
+    if args.with_db:
+        first, cached = asyncio.run(time_get_agent())
+        print(f"get_agent() first call:          {first * 1000:8.1f} ms")
+        print(f"get_agent() cached call:         {cached * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark time to first token of streamed turns against waiting for the whole answer.
+
+Runs --turns turns of the react agent with the fake model and search tool from
+tests/fake_agent.py, --concurrency at a time. The model waits --model-latency seconds
+before each reply, then emits a --words word answer one word every --token-latency
+seconds. Each turn is run once with `ainvoke` and once through `astream_chat`
+(agent/streaming.py). Reports the time until the answer is available with invoke, and the
+time to first token and to the last event with streaming. --consumer-delay makes every
+stream consumer sleep after each event, to show that slow consumers get merged tokens
+rather than stalling the run.
+
+Usage:
+    python -m benchmarks.bench_streaming [--turns 100] [--concurrency 10] [--words 100] \
+        [--model-latency 0.2] [--token-latency 0.01] [--consumer-delay 0] \
+        [--checkpointer memory|postgres|buffered]
+"""
+import argparse
+import asyncio
+import time
+from benchmarks.bench_batch import CHECKPOINTERS, make_checkpointer
+from benchmarks.common import percentiles, format_summary
+
+
+async def invoke_turn(graph, config, samples):
+    begin = time.perf_counter()
+    await graph.ainvoke({"messages": [("human", "weather")]}, config)
+    samples["invoke"].append(time.perf_counter() - begin)
+
+
+async def stream_turn(graph, config, samples, consumer_delay):
+    from agent.streaming import astream_chat
+
+    begin, first, tokens = time.perf_counter(), None, 0
+    async for event in astream_chat({"messages": [("human", "weather")]}, config, graph=graph):
+        if event["event"] == "token":
+            tokens += 1
+            if first is None:
+                first = time.perf_counter() - begin
+        if consumer_delay:
+            await asyncio.sleep(consumer_delay)
+    samples["first token"].append(first)
+    samples["stream end"].append(time.perf_counter() - begin)
+    samples["token events"].append(tokens)
+
+
+async def amain(args):
+    from langgraph.prebuilt import create_react_agent
+    from tests.fake_agent import FakeToolCallingChatModel, fake_search
+
+    answer = " ".join(f"word{n}" for n in range(args.words))
+    model = FakeToolCallingChatModel(
+        responses=[answer], latency=args.model_latency, token_latency=args.token_latency
+    )
+    checkpointer = await make_checkpointer(args.checkpointer)
+    graph = create_react_agent(model, [fake_search], checkpointer=checkpointer)
+
+    samples = {"invoke": [], "first token": [], "stream end": [], "token events": []}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def turn(n):
+        async with semaphore:
+            await invoke_turn(graph, {"configurable": {"thread_id": f"invoke-{n}"}}, samples)
+            await stream_turn(graph, {"configurable": {"thread_id": f"stream-{n}"}}, samples, args.consumer_delay)
+
+    await asyncio.gather(*(turn(n) for n in range(args.turns)))
+    if hasattr(checkpointer, "aclose"):
+        await checkpointer.aclose()
+
+    for name in ("invoke", "first token", "stream end"):
+        print(format_summary(name, percentiles(samples[name])))
+    token_events = samples["token events"]
+    print(f"token events per turn: {sum(token_events) / len(token_events):.1f} for {args.words} words")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--model-latency", type=float, default=0.2, help="seconds before each reply")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds between words")
+    parser.add_argument("--consumer-delay", type=float, default=0, help="seconds per consumed event")
+    parser.add_argument("--checkpointer", choices=CHECKPOINTERS, default="memory")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark the tool result cache on a burst of conversations about the same topics.
+
+Runs --conversations conversations, --concurrency at a time (agent/batch.py), through the
+react agent with the fake model from tests/fake_agent.py and a fake search tool that
+takes --tool-latency seconds. Every conversation asks about one of --topics topics, so
+most searches repeat one already made or in flight. Compares the plain tool with the
+tool wrapped by agent/tool_cache.py: searches made, wall time and per-run latency.
+
+Usage:
+    python -m benchmarks.bench_tool_cache [--conversations 400] [--topics 10] \
+        [--concurrency 50] [--tool-latency 0.2]
+"""
+import argparse
+import asyncio
+import os
+import time
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.batch import arun_batch
+from agent.tool_cache import ToolResultCache
+from benchmarks.common import percentiles, format_summary
+
+
+async def run(args, cached):
+    from agent.graph import build_agent
+    from tests.fake_agent import FakeToolCallingChatModel, SlowSearchTool, fake_responses
+
+    search = SlowSearchTool(latency=args.tool_latency)
+    tool = ToolResultCache(search).as_tool() if cached else search
+    model = FakeToolCallingChatModel(responses=fake_responses)
+    graph = build_agent(model=model, tools=[tool], checkpointer=InMemorySaver())
+    # The graph module turns LangSmith tracing on; a benchmark must not trace every run
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    items = (
+        (str(n), {"messages": [("human", f"news about topic {n % args.topics}")]})
+        for n in range(args.conversations)
+    )
+    latencies, failed = [], 0
+    begin = time.perf_counter()
+    async for result in arun_batch(graph, items, concurrency=args.concurrency, resume=False):
+        latencies.append(result["seconds"])
+        failed += result["status"] == "failed"
+    elapsed = time.perf_counter() - begin
+
+    label = "cached tool" if cached else "plain tool"
+    print(f"{label}: {search.calls} searches, {elapsed:.2f}s, {failed} failed")
+    print(format_summary("  run latency", percentiles(latencies)))
+
+
+async def amain(args):
+    await run(args, cached=False)
+    await run(args, cached=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=400)
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="seconds per search")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
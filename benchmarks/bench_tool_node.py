@@ -0,0 +1,83 @@
+"""
+Benchmark turns whose model response asks for several slow tools at once.
+
+The fake model from tests/fake_agent.py calls all --tools tools on every question. Each
+tool takes --tool-latency seconds, and the n-th takes n * --tool-skew seconds longer.
+The benchmark runs --turns turns through ParallelToolNode (agent/tool_node.py) at each
+--concurrency limit, with async tools and with sync-only tools. It reports per-turn
+latency, which should fall from the sum of the tool latencies at a limit of 1 to the
+slowest tool's latency once the limit reaches the number of tools.
+
+Usage:
+    python -m benchmarks.bench_tool_node [--tools 5] [--tool-latency 0.1] \
+        [--tool-skew 0.02] [--concurrency 1,2,5] [--turns 10]
+"""
+import argparse
+import asyncio
+import time
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+from agent.tool_node import ParallelToolNode
+from benchmarks.common import percentiles, format_summary
+
+
+def sync_search(name, seconds):
+    def search(query: str) -> str:
+        time.sleep(seconds)
+        return f"Results for {query}"
+
+    return StructuredTool.from_function(search, name=name, description="Search the web for the query.")
+
+
+def make_tools(kind, count, latency, skew):
+    from tests.fake_agent import SlowSearchTool
+
+    if kind == "async":
+        return [SlowSearchTool(name=f"search_{n}", latency=latency + n * skew) for n in range(count)]
+    return [sync_search(f"search_{n}", latency + n * skew) for n in range(count)]
+
+
+async def run(kind, concurrency, args):
+    from tests.fake_agent import FakeToolCallingChatModel, fake_responses
+
+    model = FakeToolCallingChatModel(responses=fake_responses, call_all_tools=True)
+    tools = make_tools(kind, args.tools, args.tool_latency, args.tool_skew)
+    node = ParallelToolNode(tools, max_concurrency=concurrency)
+    graph = create_react_agent(model, node, checkpointer=InMemorySaver())
+
+    latencies = []
+    for turn in range(args.turns):
+        begin = time.perf_counter()
+        await graph.ainvoke({"messages": [("human", f"question {turn}")]}, {"configurable": {"thread_id": str(turn)}})
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+
+async def amain(args):
+    total = sum(args.tool_latency + n * args.tool_skew for n in range(args.tools))
+    slowest = args.tool_latency + (args.tools - 1) * args.tool_skew
+    print(f"{args.tools} tools: {total * 1000:.0f} ms in sequence, {slowest * 1000:.0f} ms for the slowest")
+    for kind in ("async", "sync"):
+        for concurrency in args.concurrency:
+            latencies = await run(kind, concurrency, args)
+            print(format_summary(f"{kind} tools, limit {concurrency}", percentiles(latencies)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tools", type=int, default=5)
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="seconds per tool call")
+    parser.add_argument("--tool-skew", type=float, default=0.02, help="extra seconds per tool")
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 2, 5],
+        help="comma-separated concurrency limits",
+    )
+    parser.add_argument("--turns", type=int, default=10)
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
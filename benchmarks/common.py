@@ -0,0 +1,35 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import statistics
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """
+    Summarize latency samples (in seconds) as milliseconds: mean, percentiles and max.
+    """
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+    summary = {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+    for point in points:
+        index = min(len(ordered) - 1, max(0, round(point / 100 * len(ordered)) - 1))
+        summary[f"p{point}_ms"] = ordered[index] * 1000
+    summary["max_ms"] = ordered[-1] * 1000
+    return summary
+
+
+def format_summary(name, summary):
+    """
+    Format a `percentiles` summary as a single aligned line.
+    """
+    if not summary.get("count"):
+        return f"{name:<28} no samples"
+    return f"{name:<28} " + "  ".join(
+        f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in summary.items()
+    )
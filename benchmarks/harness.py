@@ -0,0 +1,422 @@
+"""
+Offline checkpoint benchmark harness.
+
+Drives the fake agent graph from tests/fake_agent.py through a configurable number of
+threads, turns and concurrency with the sync (PostgresSaver on a connection pool) and
+async (AsyncPostgresSaver) checkpointers, and reports put/put_writes/get/list latency
+percentiles, throughput and database queries per turn.
+
+The database is chosen by --backend:
+  * postgres  - BENCH_DB_URI if set, otherwise a throwaway local server started with
+                initdb/pg_ctl (from PATH or PG_BIN), or with the `pgserver` package
+  * sqlite    - the embedded SQLite backend (agent/sqlite_checkpointer.py) on a temporary file
+  * embedded  - the in-memory saver, when no Postgres is available (no queries counted)
+  * auto      - postgres if one can be found or started, embedded otherwise
+
+Query counts are statements executed through the savers' cursors; statements sent in
+one pipeline share a round trip, so they are an upper bound on round trips. With SQLite,
+every statement run by the connection is counted, including BEGIN and COMMIT.
+
+Results are written as JSON (by default to benchmarks/results/<commit>-<time>.json)
+so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.harness [--threads 20] [--turns 5] [--concurrency 8] \
+        [--modes sync,async] [--backend auto] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+import psycopg
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.delegating_checkpointer import DelegatingCheckpointSaver
+from benchmarks.common import percentiles, format_summary
+from tests.fake_agent import build_fake_agent_graph
+
+OPERATIONS = ("put", "put_writes", "get_tuple", "list")
+BACKENDS = ("auto", "postgres", "sqlite", "embedded")
+SQLITE_PREFIX = "sqlite://"
+
+
+class TimedSaver(DelegatingCheckpointSaver):
+    """
+    Saver wrapper recording the latency of every call, by operation.
+    """
+
+    def __init__(self, saver):
+        super().__init__(saver)
+        self.latencies = {operation: [] for operation in OPERATIONS}
+
+    @contextlib.contextmanager
+    def _timed(self, operation):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latencies[operation].append(time.perf_counter() - start)
+
+    def get_tuple(self, config):
+        with self._timed("get_tuple"):
+            return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config):
+        with self._timed("get_tuple"):
+            return await self.saver.aget_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._timed("list"):
+            return iter(list(self.saver.list(config, filter=filter, before=before, limit=limit)))
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        with self._timed("list"):
+            tuples = [
+                checkpoint_tuple
+                async for checkpoint_tuple in self.saver.alist(
+                    config, filter=filter, before=before, limit=limit
+                )
+            ]
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._timed("put"):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with self._timed("put"):
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._timed("put_writes"):
+            return self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with self._timed("put_writes"):
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+
+def counting_cursors(counter):
+    """
+    Create sync and async cursor classes counting the statements they execute.
+    """
+
+    class CountingCursor(psycopg.Cursor):
+        def execute(self, *args, **kwargs):
+            counter["queries"] += 1
+            return super().execute(*args, **kwargs)
+
+        def executemany(self, *args, **kwargs):
+            counter["queries"] += 1
+            return super().executemany(*args, **kwargs)
+
+    class AsyncCountingCursor(psycopg.AsyncCursor):
+        async def execute(self, *args, **kwargs):
+            counter["queries"] += 1
+            return await super().execute(*args, **kwargs)
+
+        async def executemany(self, *args, **kwargs):
+            counter["queries"] += 1
+            return await super().executemany(*args, **kwargs)
+
+    return CountingCursor, AsyncCountingCursor
+
+
+def find_pg_bin():
+    """
+    Find the directory holding initdb and pg_ctl, or None.
+    """
+    candidates = [os.environ.get("PG_BIN"), os.path.dirname(shutil.which("initdb") or "")]
+    candidates += sorted(glob.glob("/usr/lib/postgresql/*/bin"), reverse=True)
+    for directory in candidates:
+        if directory and os.path.exists(os.path.join(directory, "pg_ctl")):
+            return directory
+    return None
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_postgres():
+    """
+    Start a throwaway Postgres server and yield (description, DSN), or (None, None).
+    """
+    if os.environ.get("BENCH_DB_URI"):
+        yield "postgres (BENCH_DB_URI)", os.environ["BENCH_DB_URI"]
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench-pg-") as data_dir:
+        pg_bin = find_pg_bin()
+        if pg_bin is not None:
+            port = get_free_port()
+            subprocess.run(
+                [os.path.join(pg_bin, "initdb"), "-D", data_dir, "-U", "postgres", "-A", "trust"],
+                check=True,
+                capture_output=True,
+            )
+            pg_ctl = os.path.join(pg_bin, "pg_ctl")
+            subprocess.run(
+                [pg_ctl, "-D", data_dir, "-w", "-l", os.path.join(data_dir, "log"),
+                 "-o", f"-p {port} -h 127.0.0.1 -k {data_dir}", "start"],
+                check=True,
+                capture_output=True,
+            )
+            try:
+                yield "postgres (initdb)", f"postgresql://postgres@127.0.0.1:{port}/postgres"
+            finally:
+                subprocess.run([pg_ctl, "-D", data_dir, "-m", "fast", "stop"], capture_output=True)
+            return
+
+        try:
+            import pgserver
+        except ImportError:
+            yield None, None
+            return
+
+        server = pgserver.get_server(data_dir, cleanup_mode="stop")
+        try:
+            yield "postgres (pgserver)", server.get_uri()
+        finally:
+            server.cleanup()
+
+
+def make_config():
+    return {"configurable": {"thread_id": f"bench-{uuid4()}"}}
+
+
+def run_sync(saver, threads, turns, concurrency):
+    """
+    Run every thread's conversation on a thread pool and list each thread's history.
+    """
+    graph = build_fake_agent_graph(checkpointer=saver)
+    configs = [make_config() for _ in range(threads)]
+
+    def converse(config):
+        for turn in range(turns):
+            graph.invoke({"messages": [("human", f"question {turn}")]}, config)
+        list(saver.list(config))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(converse, configs))
+
+
+async def run_async(saver, threads, turns, concurrency):
+    """
+    Run every thread's conversation on the event loop, at most `concurrency` at a time.
+    """
+    graph = build_fake_agent_graph(checkpointer=saver)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def converse(config):
+        async with semaphore:
+            for turn in range(turns):
+                await graph.ainvoke({"messages": [("human", f"question {turn}")]}, config)
+            async for _ in saver.alist(config):
+                pass
+
+    await asyncio.gather(*(converse(make_config()) for _ in range(threads)))
+
+
+def count_statements(counter):
+    def trace(statement):
+        counter["queries"] += 1
+
+    return trace
+
+
+@contextlib.contextmanager
+def sync_saver(dsn, counter, pool_size):
+    if dsn is None:
+        yield InMemorySaver()
+        return
+
+    if dsn.startswith(SQLITE_PREFIX):
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        from agent.sqlite_checkpointer import get_sqlite_connection, get_sqlite_settings
+
+        conn = get_sqlite_connection({**get_sqlite_settings(), "path": dsn[len(SQLITE_PREFIX) :]})
+        conn.set_trace_callback(count_statements(counter))
+        try:
+            saver = SqliteSaver(conn)
+            saver.setup()
+            yield saver
+        finally:
+            conn.close()
+        return
+
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg_pool import ConnectionPool
+    from agent.checkpointer import get_prepare_kwargs
+
+    cursor_factory, _ = counting_cursors(counter)
+    kwargs = {"autocommit": True, **get_prepare_kwargs(dsn), "cursor_factory": cursor_factory}
+    with ConnectionPool(dsn, min_size=pool_size, max_size=pool_size, kwargs=kwargs) as pool:
+        saver = PostgresSaver(pool)
+        saver.setup()
+        yield saver
+
+
+@contextlib.asynccontextmanager
+async def async_saver(dsn, counter, pool_size):
+    if dsn is None:
+        yield InMemorySaver()
+        return
+
+    if dsn.startswith(SQLITE_PREFIX):
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        from agent.sqlite_checkpointer import get_pragmas, get_sqlite_settings
+
+        async with aiosqlite.connect(dsn[len(SQLITE_PREFIX) :]) as conn:
+            for pragma in get_pragmas(get_sqlite_settings()):
+                await conn.execute(pragma)
+            await conn.set_trace_callback(count_statements(counter))
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            yield saver
+        return
+
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg_pool import AsyncConnectionPool
+    from agent.checkpointer import get_prepare_kwargs
+
+    _, cursor_factory = counting_cursors(counter)
+    kwargs = {"autocommit": True, **get_prepare_kwargs(dsn), "cursor_factory": cursor_factory}
+    async with AsyncConnectionPool(
+        dsn, min_size=pool_size, max_size=pool_size, kwargs=kwargs
+    ) as pool:
+        saver = AsyncPostgresSaver(pool)
+        await saver.setup()
+        yield saver
+
+
+def summarize(timed, counter, elapsed, threads, turns):
+    total_turns = threads * turns
+    return {
+        "elapsed_s": elapsed,
+        "turns_per_s": total_turns / elapsed,
+        "queries": counter["queries"],
+        "queries_per_turn": counter["queries"] / total_turns,
+        "latency": {
+            operation: percentiles(samples) for operation, samples in timed.latencies.items()
+        },
+    }
+
+
+def run_mode(mode, dsn, threads, turns, concurrency):
+    counter = {"queries": 0}
+    if mode == "sync":
+        with sync_saver(dsn, counter, concurrency) as saver:
+            timed = TimedSaver(saver)
+            counter["queries"] = 0
+            start = time.perf_counter()
+            run_sync(timed, threads, turns, concurrency)
+            elapsed = time.perf_counter() - start
+    else:
+
+        async def run():
+            async with async_saver(dsn, counter, concurrency) as saver:
+                timed = TimedSaver(saver)
+                counter["queries"] = 0
+                start = time.perf_counter()
+                await run_async(timed, threads, turns, concurrency)
+                return timed, time.perf_counter() - start
+
+        timed, elapsed = asyncio.run(run())
+
+    return summarize(timed, counter, elapsed, threads, turns)
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(threads, turns, concurrency, modes=("sync", "async"), backend="auto"):
+    """
+    Run the benchmark for each mode on the chosen backend.
+
+    Returns:
+        dict: Run metadata and per-mode results, ready to be written as JSON
+    """
+    with contextlib.ExitStack() as stack:
+        description, dsn = None, None
+        if backend == "sqlite":
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-sqlite-"))
+            description = "sqlite (WAL)"
+            dsn = f"{SQLITE_PREFIX}{os.path.join(directory, 'checkpoints.sqlite')}"
+        if backend in ("auto", "postgres"):
+            description, dsn = stack.enter_context(local_postgres())
+            if dsn is None and backend == "postgres":
+                raise RuntimeError(
+                    "No Postgres available: set BENCH_DB_URI, PG_BIN or install pgserver"
+                )
+
+        report = {
+            "commit": get_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "backend": description or "embedded (in-memory)",
+            "params": {"threads": threads, "turns": turns, "concurrency": concurrency},
+            "results": {},
+        }
+        for mode in modes:
+            report["results"][mode] = run_mode(mode, dsn, threads, turns, concurrency)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.threads, args.turns, args.concurrency, args.modes.split(","), args.backend
+    )
+
+    print(f"Backend: {report['backend']}  commit: {report['commit']}")
+    for mode, result in report["results"].items():
+        print(
+            f"\n[{mode}] {result['turns_per_s']:.1f} turns/s, "
+            f"{result['queries_per_turn']:.1f} queries/turn"
+        )
+        for operation, summary in result["latency"].items():
+            print(format_summary(operation, summary))
+
+    output = args.output or os.path.join(
+        "benchmarks",
+        "results",
+        f"{report['commit']}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
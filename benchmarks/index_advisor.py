@@ -0,0 +1,197 @@
+"""
+Index advisor for the checkpoint tables.
+
+Seeds a scratch schema with checkpoints, writes and blobs shaped like our traffic (root
+and subgraph namespaces, `source`/`step` metadata), applies the saver's migrations and
+our index migrations, then runs EXPLAIN ANALYZE on each query the savers and our
+maintenance code issue and flags the ones that fall back to sequential scans.
+
+Statements that modify data (purges) are explained inside a transaction that is rolled
+back. The scratch schema is dropped afterwards.
+
+The database is BENCH_DB_URI / --dsn if given, otherwise a throwaway local server (see
+benchmarks/harness.py). Pass --without-indexes to see the plans before our index
+migrations are applied.
+
+Usage:
+    python -m benchmarks.index_advisor [--threads 200] [--checkpoints 10] \
+        [--dsn postgresql://...] [--schema index_advisor] [--without-indexes] [--output plans.json]
+"""
+import argparse
+import contextlib
+import json
+import psycopg
+from langgraph.checkpoint.postgres import PostgresSaver
+from agent.checkpointer import get_connection_kwargs, get_purge_query, migrate_indexes
+from agent.history import _keyset_query
+from benchmarks.harness import local_postgres
+
+SUBGRAPH_NAMESPACES = 20
+# Every Nth thread tags its checkpoints with a user_id, to exercise a selective filter
+TAGGED_THREAD_EVERY = 50
+
+
+def thread_id(i):
+    return f"advisor-{i:05d}"
+
+
+def make_checkpoint(i, step):
+    return {
+        "v": 1,
+        "id": f"{step:08d}-{i:05d}",
+        "ts": "2024-01-01T00:00:00+00:00",
+        "channel_values": {"messages": [f"message {step}"] * 4},
+        "channel_versions": {"messages": f"{step:08d}"},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+
+
+def seed(saver, threads, checkpoints):
+    """
+    Write `checkpoints` checkpoints (with writes) per thread, a few in a subgraph namespace.
+    """
+    for i in range(threads):
+        namespaces = ["", f"tools:{i % SUBGRAPH_NAMESPACES}"]
+        for checkpoint_ns in namespaces:
+            config = {"configurable": {"thread_id": thread_id(i), "checkpoint_ns": checkpoint_ns}}
+            count = checkpoints if checkpoint_ns == "" else max(1, checkpoints // 5)
+            for step in range(count):
+                metadata = {"source": "input" if step == 0 else "loop", "step": step}
+                if i % TAGGED_THREAD_EVERY == 0:
+                    metadata["user_id"] = f"user-{i}"
+                config = saver.put(
+                    config,
+                    make_checkpoint(i, step),
+                    metadata,
+                    {"messages": f"{step:08d}"},
+                )
+                saver.put_writes(config, [("messages", f"write {step}")], f"task-{step}")
+
+
+def get_queries(saver):
+    """
+    The queries to explain, as {name: (sql, params)}.
+    """
+    config = {"configurable": {"thread_id": thread_id(1), "checkpoint_ns": ""}}
+    thread_config = {"configurable": {"thread_id": thread_id(1)}}
+    latest = "WHERE thread_id = %s AND checkpoint_ns = %s ORDER BY checkpoint_id DESC LIMIT 1"
+    by_id = "WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id = %s"
+
+    def search(config, filter, limit=None):
+        where, args = saver._search_where(config, filter)
+        query = saver.SELECT_SQL + where + " ORDER BY checkpoint_id DESC"
+        return (query + f" LIMIT {limit}" if limit else query), args
+
+    return {
+        "get_tuple (latest)": (saver.SELECT_SQL + latest, [thread_id(1), ""]),
+        "get_tuple (by id)": (saver.SELECT_SQL + by_id, [thread_id(1), "", f"{0:08d}-{1:05d}"]),
+        "list (thread)": search(thread_config, None),
+        "list (thread, filter)": search(config, {"source": "input"}),
+        "list (filter)": search(None, {"user_id": f"user-{TAGGED_THREAD_EVERY}"}, limit=10),
+        "iter_history (next chunk)": _keyset_query(
+            saver, thread_config, None, None, (thread_id(1), "", f"{5:08d}-{1:05d}"), 100, False
+        ),
+        "purge (thread_id)": (get_purge_query("thread_id"), {"values": [thread_id(1)]}),
+        "purge (checkpoint_ns)": (get_purge_query("checkpoint_ns"), {"values": ["tools:1"]}),
+    }
+
+
+def find_seq_scans(plan):
+    """
+    Names of the relations read with a sequential scan anywhere in a JSON plan.
+    """
+    tables = []
+    if plan.get("Node Type") == "Seq Scan":
+        tables.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        tables.extend(find_seq_scans(child))
+    return tables
+
+
+def explain(conn, query, params):
+    """
+    Run EXPLAIN ANALYZE on a query and roll back anything it changed.
+
+    Returns:
+        dict: The execution time, the sequentially scanned tables and the JSON plan
+    """
+    with conn.transaction(force_rollback=True), conn.cursor() as cur:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+        result = cur.fetchone()[0][0]
+    return {
+        "execution_ms": result["Execution Time"],
+        "seq_scans": sorted(set(find_seq_scans(result["Plan"]))),
+        "plan": result["Plan"],
+    }
+
+
+@contextlib.contextmanager
+def scratch_schema(dsn, schema):
+    """
+    Yield an autocommit connection whose search_path is a freshly created schema.
+    """
+    with psycopg.connect(dsn, autocommit=True) as admin:
+        admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        admin.execute(f"CREATE SCHEMA {schema}")
+        try:
+            with psycopg.connect(dsn, **get_connection_kwargs(schema, dsn)) as conn:
+                yield conn
+        finally:
+            admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+def advise(dsn, threads=200, checkpoints=10, schema="index_advisor", indexes=True):
+    """
+    Seed a scratch schema and explain every checkpoint query against it.
+
+    Returns:
+        dict: Per query name, the result of `explain`
+    """
+    with scratch_schema(dsn, schema) as conn:
+        saver = PostgresSaver(conn)
+        saver.setup()
+        if indexes:
+            migrate_indexes(conn)
+
+        seed(saver, threads, checkpoints)
+        conn.execute("ANALYZE checkpoints, checkpoint_blobs, checkpoint_writes")
+
+        return {
+            name: explain(conn, query, params)
+            for name, (query, params) in get_queries(saver).items()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--checkpoints", type=int, default=10, help="per thread")
+    parser.add_argument("--dsn", help="database to seed, defaults to a throwaway server")
+    parser.add_argument("--schema", default="index_advisor", help="scratch schema, dropped afterwards")
+    parser.add_argument("--without-indexes", action="store_true")
+    parser.add_argument("--output", help="JSON file for the full plans")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        dsn = args.dsn
+        if dsn is None:
+            backend, dsn = stack.enter_context(local_postgres())
+            if dsn is None:
+                parser.error("no Postgres server found; pass --dsn or install pgserver")
+        report = advise(dsn, args.threads, args.checkpoints, args.schema, not args.without_indexes)
+
+    flagged = 0
+    for name, result in report.items():
+        status = "ok" if not result["seq_scans"] else "SEQ SCAN on " + ", ".join(result["seq_scans"])
+        flagged += bool(result["seq_scans"])
+        print(f"{name:<28} {result['execution_ms']:>9.3f} ms  {status}")
+    print(f"{flagged} of {len(report)} queries use sequential scans")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Load generator for the chat graph.
+
+Builds the `chat` graph declared in langgraph.json with its model and tools swapped for
+the fake stubs in tests/fake_agent.py (a FakeListChatModel that calls a fake search tool),
+then runs many multi-turn conversations concurrently under asyncio, optionally spread
+over a pool of worker processes to use every core.
+
+Conversations are started according to a ramp-up profile:
+  * instant - all at once
+  * linear  - evenly spread over --ramp-up seconds
+  * step    - in --steps equal batches over --ramp-up seconds
+
+Reports the end-to-end turn latency histogram and percentiles, throughput, error rates
+and, with the Postgres checkpointer, how long turns waited for a pooled connection.
+
+Usage:
+    python -m benchmarks.loadgen [--conversations 1000] [--turns 3] [--concurrency 500] \
+        [--profile linear] [--ramp-up 10] [--steps 5] [--processes 1] \
+        [--checkpointer postgres|memory] [--model-latency 0.05] [--output results.json]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.common import percentiles, format_summary
+
+PROFILES = ("instant", "linear", "step")
+LANGGRAPH_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "langgraph.json")
+
+# Upper bounds, in milliseconds, of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf]
+
+
+def start_offset(index, conversations, profile, ramp_up, steps):
+    """
+    Seconds after the start of the run at which a conversation starts.
+    """
+    if profile == "instant" or ramp_up <= 0:
+        return 0.0
+    if profile == "linear":
+        return ramp_up * index / conversations
+    step = math.floor(index * steps / conversations)
+    return ramp_up * step / steps
+
+
+def histogram(samples):
+    """
+    Count latency samples (in seconds) per bucket of HISTOGRAM_BUCKETS_MS.
+    """
+    counts = dict.fromkeys(HISTOGRAM_BUCKETS_MS, 0)
+    for sample in samples:
+        ms = sample * 1000
+        counts[next(bound for bound in HISTOGRAM_BUCKETS_MS if ms <= bound)] += 1
+    return counts
+
+
+def format_histogram(counts, width=50):
+    total = max(counts.values()) or 1
+    lines = []
+    for bound, count in counts.items():
+        label = "inf" if bound == math.inf else f"{bound:g}"
+        lines.append(f"  <= {label:>6} ms {count:>8}  {'#' * round(width * count / total)}")
+    return "\n".join(lines)
+
+
+def load_chat_graph_module(config_file=LANGGRAPH_CONFIG, graph="chat"):
+    """
+    Import the module defining a graph declared in langgraph.json.
+    """
+    with open(config_file) as f:
+        path = json.load(f)["graphs"][graph].split(":")[0]
+    module = importlib.import_module(os.path.normpath(path)[: -len(".py")].replace(os.sep, "."))
+
+    # The graph module turns LangSmith tracing on; a load test must not trace every run
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    return module
+
+
+async def build_graph(checkpointer, model_latency):
+    from tests.fake_agent import FakeToolCallingChatModel, fake_responses, fake_search
+
+    if checkpointer == "postgres":
+        from agent.async_checkpointer import get_async_checkpointer
+
+        saver = await get_async_checkpointer()
+    else:
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        saver = InMemorySaver()
+
+    model = FakeToolCallingChatModel(responses=fake_responses, latency=model_latency)
+    return load_chat_graph_module().build_agent(model=model, tools=[fake_search], checkpointer=saver)
+
+
+async def run_conversation(graph, thread_id, turns, delay, semaphore, result):
+    await asyncio.sleep(delay)
+    async with semaphore:
+        result["in_flight"] += 1
+        result["peak_in_flight"] = max(result["peak_in_flight"], result["in_flight"])
+        config = {"configurable": {"thread_id": thread_id}}
+        try:
+            for turn in range(turns):
+                start = time.perf_counter()
+                try:
+                    await graph.ainvoke({"messages": [("human", f"question {turn}")]}, config)
+                except Exception as e:
+                    result["errors"][type(e).__name__] += 1
+                    return
+                finally:
+                    result["latencies"].append(time.perf_counter() - start)
+            result["completed"] += 1
+        finally:
+            result["in_flight"] -= 1
+
+
+async def arun_worker(options, indexes, start_at):
+    """
+    Run the given conversations on one event loop and return the raw results.
+    """
+    graph = await build_graph(options["checkpointer"], options["model_latency"])
+    pool = None
+    if options["checkpointer"] == "postgres":
+        from agent.async_checkpointer import get_async_pool
+
+        pool = await get_async_pool()
+        pool.pop_stats()
+
+    result = {
+        "latencies": [],
+        "errors": Counter(),
+        "completed": 0,
+        "in_flight": 0,
+        "peak_in_flight": 0,
+    }
+    semaphore = asyncio.Semaphore(options["concurrency"])
+    thread_ids = [f"loadgen-{start_at:.0f}-{index}" for index in indexes]
+
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_conversation(
+                graph,
+                thread_id,
+                options["turns"],
+                start_offset(
+                    index,
+                    options["conversations"],
+                    options["profile"],
+                    options["ramp_up"],
+                    options["steps"],
+                ),
+                semaphore,
+                result,
+            )
+            for index, thread_id in zip(indexes, thread_ids)
+        )
+    )
+    result["elapsed"] = time.perf_counter() - started
+
+    if pool is not None:
+        from agent.async_checkpointer import apurge_checkpoints, close_async_pool
+
+        result["pool_stats"] = pool.pop_stats()
+        await apurge_checkpoints(thread_ids=thread_ids)
+        await close_async_pool()
+
+    del result["in_flight"]
+    return result
+
+
+def run_worker(options, indexes, start_at):
+    return asyncio.run(arun_worker(options, indexes, start_at))
+
+
+def merge_results(results):
+    merged = {"latencies": [], "errors": Counter(), "completed": 0, "peak_in_flight": 0}
+    pool_stats = Counter()
+    for result in results:
+        merged["latencies"].extend(result["latencies"])
+        merged["errors"].update(result["errors"])
+        merged["completed"] += result["completed"]
+        merged["peak_in_flight"] += result["peak_in_flight"]
+        pool_stats.update(result.get("pool_stats", {}))
+    merged["elapsed"] = max(result["elapsed"] for result in results)
+    merged["pool_stats"] = dict(pool_stats)
+    return merged
+
+
+def run_load(options):
+    """
+    Run the load test, in this process or across a process pool.
+
+    Returns:
+        dict: Summary of latencies, throughput, errors and connection pool waits
+    """
+    indexes = list(range(options["conversations"]))
+    processes = options["processes"]
+    # Give the workers time to build their graphs and pools before the clock starts
+    start_at = time.time() + (2.0 if processes > 1 else 0.0)
+
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(run_worker, options, indexes[worker::processes], start_at)
+                for worker in range(processes)
+            ]
+            merged = merge_results([future.result() for future in futures])
+    else:
+        merged = merge_results([run_worker(options, indexes, start_at)])
+
+    turns = len(merged["latencies"])
+    failed = sum(merged["errors"].values())
+    pool_stats = merged["pool_stats"]
+    requests = pool_stats.get("requests_num", 0)
+    return {
+        "options": options,
+        "elapsed_s": merged["elapsed"],
+        "conversations_completed": merged["completed"],
+        "conversations_failed": failed,
+        "error_rate": failed / options["conversations"],
+        "errors": dict(merged["errors"]),
+        "turns": turns,
+        "turns_per_s": turns / merged["elapsed"] if merged["elapsed"] else 0.0,
+        "peak_in_flight": merged["peak_in_flight"],
+        "latency": percentiles(merged["latencies"]),
+        "histogram_ms": {str(bound): count for bound, count in histogram(merged["latencies"]).items()},
+        "pool": {
+            "requests": requests,
+            "queued": pool_stats.get("requests_queued", 0),
+            "wait_ms_total": pool_stats.get("requests_wait_ms", 0),
+            "wait_ms_mean": pool_stats.get("requests_wait_ms", 0) / requests if requests else 0.0,
+            "errors": pool_stats.get("requests_errors", 0),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=500, help="in flight per process")
+    parser.add_argument("--profile", choices=PROFILES, default="linear")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds")
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=1, help="0 uses every core")
+    parser.add_argument("--checkpointer", choices=("postgres", "memory"), default="postgres")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="fake model delay (s)")
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+
+    options = {
+        "conversations": args.conversations,
+        "turns": args.turns,
+        "concurrency": args.concurrency,
+        "profile": args.profile,
+        "ramp_up": args.ramp_up,
+        "steps": args.steps,
+        "processes": args.processes or os.cpu_count(),
+        "checkpointer": args.checkpointer,
+        "model_latency": args.model_latency,
+    }
+    report = run_load(options)
+
+    print(
+        f"{report['conversations_completed']}/{args.conversations} conversations completed "
+        f"in {report['elapsed_s']:.2f}s, {report['turns_per_s']:.1f} turns/s, "
+        f"peak {report['peak_in_flight']} in flight, error rate {report['error_rate']:.2%}"
+    )
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+    print(format_summary("turn latency", report["latency"]))
+    print(format_histogram({float(bound): count for bound, count in report["histogram_ms"].items()}))
+    if report["pool"]["requests"]:
+        pool = report["pool"]
+        print(
+            f"Pool: {pool['requests']} connection requests, {pool['queued']} queued, "
+            f"mean wait {pool['wait_ms_mean']:.2f} ms, {pool['errors']} errors"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import asyncio
+import json
+import re
+import time
+from uuid import uuid4
 from langchain_community.chat_models import FakeListChatModel
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool, tool
 
-from typing import Annotated
+from typing import Annotated, Optional
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
@@ -34,6 +41,120 @@ def build_fake_agent_graph(**kwargs):
 
     return graph_builder.compile(**kwargs)
 
+class FakeToolCallingChatModel(FakeListChatModel):
+    """
+    FakeListChatModel that can be bound to tools, as the react agent requires.
+
+    When bound, it answers every human message with a call to the first tool (or to
+    every tool, with `call_all_tools`), then replies with the next canned response once
+    the tool results are in. `latency` adds a simulated model delay to async calls.
+
+    Streamed replies arrive word by word, `token_latency` seconds apart. An async call
+    that isn't streamed takes as long as streaming the whole reply would.
+    """
+
+    tool_name: Optional[str] = None
+    tool_names: list[str] = []
+    call_all_tools: bool = False
+    latency: Optional[float] = None
+    token_latency: Optional[float] = None
+
+    def bind_tools(self, tools, **kwargs):
+        if not tools:
+            return self
+        names = [getattr(tool, "name", None) or tool.__name__ for tool in tools]
+        return self.model_copy(update={"tool_name": names[0], "tool_names": names})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.tool_name and isinstance(messages[-1], HumanMessage):
+            names = self.tool_names if self.call_all_tools else [self.tool_name]
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": name,
+                        "args": {"query": messages[-1].content},
+                        "id": f"call_{uuid4().hex}",
+                    }
+                    for name in names
+                ],
+            )
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Skip the executor hop of the default implementation, the fake is instant
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        result = self._generate(messages, stop=stop, **kwargs)
+        tokens = split_tokens(result.generations[0].message.content)
+        if self.token_latency and len(tokens) > 1:
+            await asyncio.sleep(self.token_latency * (len(tokens) - 1))
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = self._generate(messages, stop=stop, **kwargs).generations[0].message
+        if message.tool_calls:
+            chunks = [
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=chunks))
+            return
+        for index, token in enumerate(split_tokens(message.content)):
+            if index and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def split_tokens(text):
+    """
+    Split text into word tokens, each with its leading whitespace.
+    """
+    return re.findall(r"\s*\S+", text)
+
+
+@tool
+async def fake_search(query: str) -> str:
+    """Search the web for the query."""
+    return json.dumps(
+        [{"url": "https://example.com/weather", "content": f"Results for {query}: sunny, 68°F."}]
+    )
+
+
+class SlowSearchTool(BaseTool):
+    """
+    Fake search tool that takes `latency` seconds per call and counts its calls.
+    """
+
+    name: str = "slow_search"
+    description: str = "Search the web for the query."
+    latency: float = 0.05
+    calls: int = 0
+
+    def _run(self, query: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        return f"Results for {query}: sunny, 68°F."
+
+    async def _arun(self, query: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return f"Results for {query}: sunny, 68°F."
+
+
+def build_fake_react_agent(latency=None, **kwargs):
+    """
+    Build the react agent from agent/graph.py with the fake model and search tool.
+    """
+    from agent.graph import build_agent
+
+    model = FakeToolCallingChatModel(responses=fake_responses, latency=latency)
+    return build_agent(model=model, tools=[fake_search], **kwargs)
+
+
 if __name__ == "__main__":
     print("Building the fake agent graph...")
     graph = build_fake_agent_graph()
@@ -1,11 +1,11 @@
 import pytest
-import asyncio
-from agent.async_checkpointer import get_async_checkpointer
+from agent.async_checkpointer import get_async_checkpointer, close_async_pool
 
 @pytest.fixture
-def checkpointer():
-    checkpointer = asyncio.run(get_async_checkpointer())
-    return checkpointer
+async def checkpointer():
+    checkpointer = await get_async_checkpointer()
+    yield checkpointer
+    await close_async_pool()
 
 async def test_checkpoint_basic_functionality(checkpointer):
     """
@@ -52,6 +52,6 @@ async def test_checkpoint_basic_functionality(checkpointer):
     assert saved_config["configurable"]["thread_id"] == "test_thread_1"
 
     # Retrieve the checkpoint
-    retrieved_checkpoint = checkpointer.get(saved_config)
+    retrieved_checkpoint = await checkpointer.aget(saved_config)
     assert retrieved_checkpoint is not None
     assert retrieved_checkpoint["id"] == checkpoint["id"]
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import pytest
+from agent.async_checkpointer import (
+    get_async_pool,
+    get_async_checkpointer,
+    get_async_pool_settings,
+    close_async_pool,
+)
+
+
+@pytest.fixture
+async def pool():
+    pool = await get_async_pool()
+    yield pool
+    await close_async_pool()
+
+
+async def test_pool_is_shared_between_checkpointers(pool):
+    """
+    Test that every checkpointer is backed by the same open pool
+    """
+    first = await get_async_checkpointer()
+    second = await get_async_checkpointer()
+
+    assert first.conn is pool
+    assert second.conn is pool
+    assert not pool.closed
+
+
+async def test_pool_is_warmed_and_capped(pool):
+    """
+    Test that the pool opens min_size connections up front and respects max_size
+    """
+    settings = get_async_pool_settings()
+    stats = pool.get_stats()
+
+    assert stats["pool_size"] >= settings["min_size"]
+    assert pool.max_size == settings["max_size"]
+
+
+async def test_pool_closes_and_reopens(pool):
+    """
+    Test that closing the pool shuts it down and the next caller gets a fresh one
+    """
+    await close_async_pool()
+    assert pool.closed
+
+    reopened = await get_async_pool()
+    assert reopened is not pool
+    assert not reopened.closed
+
+    async with reopened.connection() as conn:
+        cur = await conn.execute("SELECT 1")
+        assert (await cur.fetchone())[0] == 1
+
+
+async def test_pool_is_closed_with_its_event_loop():
+    """
+    Test that a pool left open when its event loop shuts down is closed on that loop
+    """
+    await close_async_pool()
+    stale = await asyncio.to_thread(asyncio.run, get_async_pool())
+
+    assert stale.closed
+    assert (await get_async_pool()) is not stale
+    await close_async_pool()
+
+
+async def test_pool_of_another_loop_is_closed_when_replaced():
+    """
+    Test that replacing a pool opened on a loop still running elsewhere closes it there
+    """
+    await close_async_pool()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        other = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(get_async_pool(), loop))
+
+        pool = await get_async_pool()
+        assert pool is not other
+        assert other.closed
+        assert not pool.closed
+    finally:
+        await close_async_pool()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
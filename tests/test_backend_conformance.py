@@ -0,0 +1,171 @@
+"""
+Conformance tests every checkpoint backend selected by CHECKPOINT_BACKEND must pass,
+through both the sync and async checkpointer factories.
+"""
+import pytest
+from uuid import uuid4
+from agent.async_checkpointer import apurge_checkpoints, close_async_pool, get_async_checkpointer
+from agent.checkpointer import CHECKPOINT_BACKENDS, get_sync_checkpointer, purge_checkpoints
+from agent.sqlite_checkpointer import close_async_sqlite
+from fake_agent import build_fake_agent_graph
+
+checkpoint_ns = "conformance"
+
+
+@pytest.fixture(params=CHECKPOINT_BACKENDS)
+def backend(request, monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_BACKEND", request.param)
+    monkeypatch.setenv("CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite"))
+    return request.param
+
+
+@pytest.fixture
+def thread_id():
+    return f"conformance-{uuid4()}"
+
+
+@pytest.fixture
+async def checkpointer(backend, thread_id):
+    checkpointer = await get_sync_checkpointer()
+    yield checkpointer
+    if backend == "postgres":
+        purge_checkpoints(thread_ids=[thread_id], conn=checkpointer.conn)
+    checkpointer.conn.close()
+
+
+@pytest.fixture
+async def acheckpointer(backend, thread_id):
+    checkpointer = await get_async_checkpointer()
+    yield checkpointer
+    if backend == "postgres":
+        await apurge_checkpoints(thread_ids=[thread_id])
+    await close_async_pool()
+    await close_async_sqlite()
+
+
+def make_config(thread_id, **configurable):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, **configurable}}
+
+
+def make_checkpoint(i):
+    return {
+        "v": 1,
+        "id": f"checkpoint_{i:03d}",
+        "ts": f"2024-01-01T00:00:{i:02d}+00:00",
+        "channel_values": {"index": i},
+        "channel_versions": {"index": f"{i + 1}"},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+
+
+def put_chain(checkpointer, thread_id, count):
+    config = make_config(thread_id)
+    for i in range(count):
+        config = checkpointer.put(
+            config, make_checkpoint(i), {"step": i, "source": "input" if i == 0 else "loop"}, {"index": f"{i + 1}"}
+        )
+    return config
+
+
+async def aput_chain(checkpointer, thread_id, count):
+    config = make_config(thread_id)
+    for i in range(count):
+        config = await checkpointer.aput(
+            config, make_checkpoint(i), {"step": i, "source": "input" if i == 0 else "loop"}, {"index": f"{i + 1}"}
+        )
+    return config
+
+
+def test_put_and_get(checkpointer, thread_id):
+    config = put_chain(checkpointer, thread_id, 2)
+
+    checkpoint_tuple = checkpointer.get_tuple(make_config(thread_id))
+
+    assert checkpoint_tuple.config == config
+    assert checkpoint_tuple.checkpoint["channel_values"] == {"index": 1}
+    assert checkpoint_tuple.metadata["step"] == 1
+    assert checkpoint_tuple.parent_config["configurable"]["checkpoint_id"] == "checkpoint_000"
+    assert checkpointer.get(make_config(thread_id, checkpoint_id="checkpoint_000"))["channel_values"] == {
+        "index": 0
+    }
+
+
+def test_threads_are_isolated(checkpointer, thread_id):
+    put_chain(checkpointer, thread_id, 1)
+
+    assert checkpointer.get_tuple(make_config(f"{thread_id}-other")) is None
+    assert list(checkpointer.list(make_config(f"{thread_id}-other"))) == []
+
+
+def test_list_order_limit_before_and_filter(checkpointer, thread_id):
+    put_chain(checkpointer, thread_id, 5)
+    config = make_config(thread_id)
+
+    ids = [t.checkpoint["id"] for t in checkpointer.list(config)]
+    assert ids == [f"checkpoint_{i:03d}" for i in range(4, -1, -1)]
+    assert len(list(checkpointer.list(config, limit=3))) == 3
+
+    before = make_config(thread_id, checkpoint_id="checkpoint_002")
+    assert [t.checkpoint["id"] for t in checkpointer.list(config, before=before)] == [
+        "checkpoint_001",
+        "checkpoint_000",
+    ]
+    assert [t.metadata["step"] for t in checkpointer.list(config, filter={"source": "input"})] == [0]
+
+
+def test_pending_writes(checkpointer, thread_id):
+    config = put_chain(checkpointer, thread_id, 1)
+
+    checkpointer.put_writes(config, [("index", 7), ("other", "value")], "task_1")
+
+    assert checkpointer.get_tuple(config).pending_writes == [
+        ("task_1", "index", 7),
+        ("task_1", "other", "value"),
+    ]
+
+
+def test_delete_thread(checkpointer, thread_id):
+    config = put_chain(checkpointer, thread_id, 3)
+    checkpointer.put_writes(config, [("index", 7)], "task_1")
+
+    checkpointer.delete_thread(thread_id)
+
+    assert checkpointer.get_tuple(make_config(thread_id)) is None
+
+
+def test_graph_resumes_from_checkpoints(checkpointer, thread_id):
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+
+    graph.invoke({"messages": [("human", "hello")]}, config)
+    graph.invoke({"messages": [("human", "again")]}, config)
+
+    assert len(graph.get_state(config).values["messages"]) == 4
+    assert len(list(checkpointer.list(config))) >= 2
+
+
+async def test_async_put_get_list_and_writes(acheckpointer, thread_id):
+    config = await aput_chain(acheckpointer, thread_id, 3)
+    await acheckpointer.aput_writes(config, [("index", 7)], "task_1")
+
+    checkpoint_tuple = await acheckpointer.aget_tuple(make_config(thread_id))
+    ids = [t.checkpoint["id"] async for t in acheckpointer.alist(make_config(thread_id), limit=2)]
+    filtered = [t async for t in acheckpointer.alist(make_config(thread_id), filter={"source": "input"})]
+
+    assert checkpoint_tuple.config == config
+    assert checkpoint_tuple.pending_writes == [("task_1", "index", 7)]
+    assert ids == ["checkpoint_002", "checkpoint_001"]
+    assert [t.metadata["step"] for t in filtered] == [0]
+
+
+async def test_async_graph_and_delete_thread(acheckpointer, thread_id):
+    graph = build_fake_agent_graph(checkpointer=acheckpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+
+    await graph.ainvoke({"messages": [("human", "hello")]}, config)
+    await graph.ainvoke({"messages": [("human", "again")]}, config)
+    assert len((await graph.aget_state(config)).values["messages"]) == 4
+
+    await acheckpointer.adelete_thread(thread_id)
+    assert await acheckpointer.aget_tuple(config) is None
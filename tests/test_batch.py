@@ -0,0 +1,63 @@
+import pytest
+from uuid import uuid4
+from agent.async_checkpointer import apurge_checkpoints, close_async_pool, get_async_checkpointer
+from agent.batch import aget_batch_checkpointer, arun_batch
+from fake_agent import build_fake_agent_graph
+
+
+@pytest.fixture
+async def thread_ids():
+    thread_ids = [f"batch-{uuid4()}" for _ in range(12)]
+    yield thread_ids
+    await apurge_checkpoints(thread_ids=thread_ids)
+    await close_async_pool()
+
+
+async def test_batch_is_bounded_and_durable(thread_ids):
+    """
+    Test that the batch pulls items only as slots free up and stores every run's checkpoints
+    """
+    checkpointer = await aget_batch_checkpointer()
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    pulled = []
+
+    def items():
+        for thread_id in thread_ids:
+            pulled.append(thread_id)
+            yield thread_id, {"messages": [("human", f"question for {thread_id}")]}
+
+    results = []
+    async for result in arun_batch(graph, items(), concurrency=4):
+        if not results:
+            assert len(pulled) <= 5, "Items were pulled ahead of the concurrency limit"
+        results.append(result)
+    await checkpointer.aclose()
+
+    assert sorted(r["thread_id"] for r in results) == sorted(thread_ids)
+    assert {r["status"] for r in results} == {"completed"}
+    assert results[0]["output"]["messages"][-1].content
+
+    saver = await get_async_checkpointer()
+    for thread_id in thread_ids:
+        assert await saver.aget_tuple({"configurable": {"thread_id": thread_id}}) is not None
+
+
+async def test_batch_resumes_after_a_crash(thread_ids):
+    """
+    Test that finished threads are skipped and interrupted ones continue from their checkpoint
+    """
+    finished, interrupted, new = thread_ids[:3]
+    checkpointer = await get_async_checkpointer()
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    await graph.ainvoke({"messages": [("human", "hello")]}, {"configurable": {"thread_id": finished}})
+    crashed = build_fake_agent_graph(checkpointer=checkpointer, interrupt_before=["chatbot"])
+    await crashed.ainvoke({"messages": [("human", "hello")]}, {"configurable": {"thread_id": interrupted}})
+
+    items = [(thread_id, {"messages": [("human", "hello")]}) for thread_id in (finished, interrupted, new)]
+    results = {r["thread_id"]: r async for r in arun_batch(graph, items, concurrency=2)}
+
+    assert results[finished]["status"] == "skipped"
+    assert results[interrupted]["status"] == "resumed"
+    assert results[new]["status"] == "completed"
+    # The interrupted thread was not sent its input a second time
+    assert len(results[interrupted]["output"]["messages"]) == 2
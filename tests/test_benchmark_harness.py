@@ -0,0 +1,28 @@
+import json
+from benchmarks.harness import run_benchmarks, OPERATIONS
+
+
+def test_harness_reports_every_operation_on_the_embedded_store():
+    """
+    Test that an offline run reports latencies, throughput and queries for both modes
+    """
+    report = run_benchmarks(threads=3, turns=2, concurrency=2, backend="embedded")
+
+    assert report["backend"] == "embedded (in-memory)"
+    assert report["params"] == {"threads": 3, "turns": 2, "concurrency": 2}
+    for mode in ("sync", "async"):
+        result = report["results"][mode]
+        assert result["turns_per_s"] > 0
+        assert set(result["latency"]) == set(OPERATIONS)
+        assert result["latency"]["list"]["count"] == 3
+        assert result["latency"]["get_tuple"]["count"] == 6
+    json.dumps(report)
+
+
+def test_harness_runs_on_the_sqlite_backend():
+    report = run_benchmarks(threads=2, turns=2, concurrency=2, backend="sqlite")
+
+    assert report["backend"] == "sqlite (WAL)"
+    for mode in ("sync", "async"):
+        assert report["results"][mode]["latency"]["put"]["count"] > 0
+        assert report["results"][mode]["queries"] > 0
@@ -0,0 +1,171 @@
+import asyncio
+import pytest
+from uuid import uuid4
+from agent.async_checkpointer import get_async_checkpointer, apurge_checkpoints, close_async_pool
+from agent.buffered_checkpointer import BufferedCheckpointSaver, ainvoke_durably
+from fake_agent import build_fake_agent_graph
+
+checkpoint_ns = __name__
+
+
+@pytest.fixture
+async def saver():
+    saver = await get_async_checkpointer()
+    yield saver
+    await apurge_checkpoints(checkpoint_ns=[checkpoint_ns])
+    await close_async_pool()
+
+
+def make_checkpoint(checkpoint_id, value):
+    return {
+        "v": 1,
+        "id": checkpoint_id,
+        "ts": "2024-01-01T00:00:00+00:00",
+        "channel_values": {"key": value},
+        "channel_versions": {"key": checkpoint_id},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+
+
+async def test_reads_see_pending_puts_and_writes(saver):
+    """
+    Test that buffered checkpoints and writes are visible before they are flushed
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=60)
+    config = {"configurable": {"thread_id": str(uuid4()), "checkpoint_ns": checkpoint_ns}}
+
+    saved_config = await buffered.aput(
+        config, make_checkpoint("buffered_1", "value"), {"step": 1, "source": "test"}, {"key": "buffered_1"}
+    )
+    await buffered.aput_writes(saved_config, [("key", "pending")], "task_1")
+
+    assert await saver.aget_tuple(config) is None, "Nothing should be stored yet"
+
+    latest = await buffered.aget_tuple(config)
+    assert latest.checkpoint["id"] == "buffered_1"
+    assert latest.checkpoint["channel_values"] == {"key": "value"}
+    assert latest.pending_writes == [("task_1", "key", "pending")]
+
+    await buffered.aclose()
+
+
+async def test_flush_stores_everything_in_the_saver(saver):
+    """
+    Test that a flush stores checkpoints, blobs and writes exactly as the plain saver does
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=60)
+    config = {"configurable": {"thread_id": str(uuid4()), "checkpoint_ns": checkpoint_ns}}
+
+    first = await buffered.aput(
+        config, make_checkpoint("buffered_1", "one"), {"step": 1, "source": "test"}, {"key": "buffered_1"}
+    )
+    second = await buffered.aput(
+        first, make_checkpoint("buffered_2", "two"), {"step": 2, "source": "test"}, {"key": "buffered_2"}
+    )
+    await buffered.aput_writes(second, [("key", "pending")], "task_1")
+    await buffered.aflush()
+
+    stored = await saver.aget_tuple(config)
+    assert stored.checkpoint["id"] == "buffered_2"
+    assert stored.checkpoint["channel_values"] == {"key": "two"}
+    assert stored.parent_config["configurable"]["checkpoint_id"] == "buffered_1"
+    assert stored.pending_writes == [("task_1", "key", "pending")]
+    assert [c.checkpoint["id"] async for c in buffered.alist(config)] == ["buffered_2", "buffered_1"]
+
+    await buffered.aclose()
+
+
+async def test_writes_to_stored_checkpoint_are_merged(saver):
+    """
+    Test that buffered writes for an already stored checkpoint are merged on read
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=60)
+    config = {"configurable": {"thread_id": str(uuid4()), "checkpoint_ns": checkpoint_ns}}
+
+    saved_config = await saver.aput(
+        config, make_checkpoint("stored_1", "value"), {"step": 1, "source": "test"}, {"key": "stored_1"}
+    )
+    await buffered.aput_writes(saved_config, [("key", "pending")], "task_1")
+
+    latest = await buffered.aget_tuple(config)
+    assert latest.checkpoint["id"] == "stored_1"
+    assert latest.pending_writes == [("task_1", "key", "pending")]
+
+    await buffered.aclose()
+
+
+async def test_run_durability_flushes_before_returning(saver):
+    """
+    Test that a graph run with "run" durability is fully stored once it returns
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="run", flush_interval=60)
+    graph = build_fake_agent_graph(checkpointer=buffered)
+    thread_id = str(uuid4())
+    config = {"configurable": {"thread_id": thread_id}}
+
+    await ainvoke_durably(graph, {"messages": [("human", "what's the weather in sf")]}, config)
+
+    stored = await saver.aget_tuple(config)
+    assert stored is not None
+    assert len(stored.checkpoint["channel_values"]["messages"]) == 2
+
+    await buffered.aclose()
+    await apurge_checkpoints(thread_ids=[thread_id])
+
+
+async def test_timer_flushes_in_the_background(saver):
+    """
+    Test that buffered puts are flushed after the flush interval without an explicit flush
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=0.01)
+    config = {"configurable": {"thread_id": str(uuid4()), "checkpoint_ns": checkpoint_ns}}
+
+    await buffered.aput(
+        config, make_checkpoint("timer_1", "value"), {"step": 1, "source": "test"}, {"key": "timer_1"}
+    )
+    await asyncio.sleep(0.2)
+
+    assert (await saver.aget_tuple(config)).checkpoint["id"] == "timer_1"
+
+    await buffered.aclose()
+
+
+async def test_full_buffer_makes_puts_wait_for_a_flush(saver):
+    """
+    Test that a put filling the buffer returns only once everything buffered is stored
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=60, max_buffered=3)
+    config = {"configurable": {"thread_id": str(uuid4()), "checkpoint_ns": checkpoint_ns}}
+
+    for i in range(1, 4):
+        config = await buffered.aput(
+            config, make_checkpoint(f"full_{i}", i), {"step": i, "source": "test"}, {"key": f"full_{i}"}
+        )
+        assert buffered._buffered_count() < 3
+
+    assert (await saver.aget_tuple(config)).checkpoint["id"] == "full_3"
+
+    await buffered.aclose()
+
+
+async def test_delete_thread_waits_for_a_flush_in_progress(saver):
+    """
+    Test that a thread deleted during a flush doesn't have its rows stored again
+    """
+    buffered = BufferedCheckpointSaver(saver, durability="async", flush_interval=60)
+    thread_id = str(uuid4())
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+    await buffered.aput(
+        config, make_checkpoint("deleted_1", "value"), {"step": 1, "source": "test"}, {"key": "deleted_1"}
+    )
+
+    flush = asyncio.create_task(buffered.aflush())
+    await asyncio.sleep(0)
+    await buffered.adelete_thread(thread_id)
+    await flush
+
+    assert await saver.aget_tuple(config) is None
+    assert await buffered.aget_tuple(config) is None
+
+    await buffered.aclose()
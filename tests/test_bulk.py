@@ -0,0 +1,57 @@
+import pytest
+from agent.bulk import export_checkpoints, import_checkpoints, seed_checkpoints
+from agent.checkpointer import create_sync_checkpointer, get_db_connection, purge_checkpoints
+
+prefix = "bulk"
+thread_ids = [f"{prefix}-{n:08d}" for n in range(20)]
+
+
+@pytest.fixture
+def conn():
+    with get_db_connection() as conn:
+        purge_checkpoints(thread_ids=thread_ids, conn=conn)
+        yield conn
+        purge_checkpoints(thread_ids=thread_ids, conn=conn)
+
+
+def test_seeded_threads_load_like_saved_ones(conn):
+    """
+    Test that seeded checkpoints form chains the saver can read back
+    """
+    counts = seed_checkpoints(conn, len(thread_ids), checkpoints=5, prefix=prefix)
+    assert counts == {"checkpoint_blobs": 100, "checkpoints": 100}
+
+    checkpointer = create_sync_checkpointer()
+    config = {"configurable": {"thread_id": thread_ids[3]}}
+    latest = checkpointer.get_tuple(config)
+
+    assert latest.metadata["step"] == 4
+    assert latest.checkpoint["channel_values"]["messages"][-1] == "message 4"
+    assert [t.metadata["step"] for t in checkpointer.list(config)] == [4, 3, 2, 1, 0]
+    assert checkpointer.get_tuple(latest.parent_config).metadata["step"] == 3
+
+
+def test_export_and_import_round_trip(conn, tmp_path):
+    """
+    Test that an export restores checkpoints, writes and blobs, and that re-imports are skipped
+    """
+    path = str(tmp_path / "threads.ckpt.gz")
+    seed_checkpoints(conn, 2, checkpoints=3, prefix=prefix)
+    checkpointer = create_sync_checkpointer()
+    config = {"configurable": {"thread_id": thread_ids[0]}}
+    checkpointer.put_writes(checkpointer.get_tuple(config).config, [("messages", "pending")], "task_1")
+    before = checkpointer.get_tuple(config)
+
+    exported = export_checkpoints(conn, path, thread_ids=thread_ids[:1])
+    assert exported == {"checkpoints": 3, "checkpoint_blobs": 3, "checkpoint_writes": 1}
+
+    assert import_checkpoints(conn, path) == dict.fromkeys(exported, 0)
+
+    purge_checkpoints(thread_ids=thread_ids, conn=conn)
+    assert import_checkpoints(conn, path, on_conflict="error") == exported
+
+    after = checkpointer.get_tuple(config)
+    assert after.checkpoint == before.checkpoint
+    assert after.metadata == before.metadata
+    assert after.pending_writes == [("task_1", "messages", "pending")]
+    assert checkpointer.get_tuple({"configurable": {"thread_id": thread_ids[1]}}) is None
@@ -0,0 +1,151 @@
+import pytest
+from uuid import uuid4
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.cached_checkpointer import ByteLRUCache, CachingCheckpointSaver, FileCacheTier
+from fake_agent import build_fake_agent_graph
+
+
+class CountingSaver(InMemorySaver):
+    """
+    In-memory saver counting the reads that reach it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_tuple(self, config):
+        self.reads += 1
+        return super().get_tuple(config)
+
+
+def make_config():
+    return {"configurable": {"thread_id": str(uuid4())}}
+
+
+def test_resume_is_served_from_cache():
+    """
+    Test that repeated reads of a thread's latest checkpoint only hit the saver once
+    """
+    saver = CountingSaver()
+    cached = CachingCheckpointSaver(saver)
+    config = make_config()
+    build_fake_agent_graph(checkpointer=cached).invoke(
+        {"messages": [("human", "what's the weather in sf")]}, config
+    )
+
+    saver.reads = 0
+    first = cached.get_tuple(config)
+    second = cached.get_tuple(config)
+    by_id = cached.get_tuple(first.config)
+
+    assert saver.reads == 1
+    assert second.checkpoint == first.checkpoint
+    assert by_id.checkpoint["id"] == first.checkpoint["id"], "Latest is cached under its ID too"
+    assert cached.stats()["hits"] == 2
+
+
+def test_writes_invalidate_cached_tuples():
+    """
+    Test that each turn sees the previous one's state, i.e. puts invalidate the cache
+    """
+    saver = CountingSaver()
+    cached = CachingCheckpointSaver(saver)
+    graph = build_fake_agent_graph(checkpointer=cached)
+    config = make_config()
+
+    for turn in range(1, 4):
+        graph.invoke({"messages": [("human", f"turn {turn}")]}, config)
+        latest = cached.get_tuple(config)
+        assert len(latest.checkpoint["channel_values"]["messages"]) == 2 * turn
+        assert latest.checkpoint == saver.get_tuple(config).checkpoint
+
+    latest = cached.get_tuple(config)
+    cached.put_writes(latest.config, [("messages", "pending")], "task_1")
+    assert cached.get_tuple(latest.config).pending_writes[-1] == ("task_1", "messages", "pending")
+    assert cached.get_tuple(config).pending_writes[-1] == ("task_1", "messages", "pending")
+
+    cached.delete_thread(config["configurable"]["thread_id"])
+    assert cached.get_tuple(config) is None
+    assert cached.get_tuple(latest.config) is None
+
+
+async def test_async_reads_are_cached():
+    """
+    Test that aget_tuple goes through the same cache as get_tuple
+    """
+    saver = InMemorySaver()
+    cached = CachingCheckpointSaver(saver)
+    config = make_config()
+    await build_fake_agent_graph(checkpointer=cached).ainvoke(
+        {"messages": [("human", "what's the weather in sf")]}, config
+    )
+
+    first = await cached.aget_tuple(config)
+    assert (await cached.aget_tuple(config)).checkpoint == first.checkpoint
+    assert cached.get_tuple(config).checkpoint == first.checkpoint
+    assert cached.stats()["hits"] >= 2
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    """
+    Test that the LRU evicts the least recently used entries once over its byte budget
+    """
+    cache = ByteLRUCache(max_bytes=100)
+    cache.set(("a", "", None), b"x" * 40)
+    cache.set(("b", "", None), b"x" * 40)
+    cache.get(("a", "", None))
+    cache.set(("c", "", None), b"x" * 40)
+
+    assert cache.get(("b", "", None)) is None, "Least recently used entry is evicted"
+    assert cache.get(("a", "", None)) is not None
+    assert cache.bytes == 80
+    assert cache.evictions == 1
+
+    cache.set(("d", "", None), b"x" * 101)
+    assert cache.get(("d", "", None)) is None, "Values larger than the budget are not cached"
+
+
+def test_shared_tier_is_shared_and_invalidated_across_savers(tmp_path):
+    """
+    Test that two caches over the same database share the file tier and its invalidations
+    """
+    saver = CountingSaver()
+    first = CachingCheckpointSaver(saver, shared_tier=FileCacheTier(str(tmp_path)))
+    second = CachingCheckpointSaver(saver, shared_tier=FileCacheTier(str(tmp_path)))
+    graph = build_fake_agent_graph(checkpointer=first)
+    config = make_config()
+    graph.invoke({"messages": [("human", "turn 1")]}, config)
+
+    saver.reads = 0
+    latest = first.get_tuple(config)
+    assert second.get_tuple(config).checkpoint == latest.checkpoint
+    assert saver.reads == 1
+    assert second.stats()["shared_hits"] == 1
+
+    # A write through the first cache must not leave the second serving stale state
+    graph.invoke({"messages": [("human", "turn 2")]}, config)
+    assert len(second.get_tuple(config).checkpoint["channel_values"]["messages"]) == 4
+
+    first.delete_thread(config["configurable"]["thread_id"])
+    assert second.get_tuple(config) is None
+
+
+def test_cached_tuples_use_the_saver_serializer(tmp_path):
+    """
+    Test that cached tuples are stored with the saver's serializer, not pickled
+    """
+    saver = InMemorySaver()
+    cached = CachingCheckpointSaver(saver, shared_tier=FileCacheTier(str(tmp_path)))
+    config = make_config()
+    build_fake_agent_graph(checkpointer=cached).invoke({"messages": [("human", "turn 1")]}, config)
+    latest = cached.get_tuple(config)
+    cached.put_writes(latest.config, [("messages", "pending")], "task_1")
+
+    stored = cached.get_tuple(latest.config)
+    assert stored == saver.get_tuple(latest.config)
+    files = [path for path in tmp_path.rglob("*") if path.is_file() and path.suffix != ".generation"]
+    assert files
+    for path in files:
+        header, data = path.read_bytes().split(b"\n", 1)
+        assert data.startswith(b"msgpack\n")
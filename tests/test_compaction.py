@@ -0,0 +1,162 @@
+import os
+import pytest
+from datetime import datetime, timedelta, timezone
+from agent.checkpointer import get_sync_checkpointer, purge_checkpoints
+from agent.compaction import run_compaction
+from agent.delta_checkpointer import DeltaMessagesSaver
+from fake_agent import build_fake_agent_graph
+
+checkpoint_ns = __name__
+
+# Thread IDs sort together so each test can compact only its own threads
+recent_thread = "compaction_a_recent"
+idle_thread = "compaction_b_idle"
+
+
+@pytest.fixture
+async def checkpointer():
+    checkpointer = await get_sync_checkpointer()
+    purge_checkpoints(thread_ids=[recent_thread, idle_thread], conn=checkpointer.conn)
+    yield checkpointer
+    purge_checkpoints(thread_ids=[recent_thread, idle_thread], conn=checkpointer.conn)
+
+
+def seed_thread(checkpointer, thread_id, ts, count=5):
+    """
+    Save a chain of checkpoints, each with a new blob version and a pending write
+    """
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+    for i in range(count):
+        checkpoint = {
+            "v": 1,
+            "id": f"compaction_checkpoint_{i}",
+            "ts": (ts + timedelta(seconds=i)).isoformat(),
+            "channel_values": {"messages": [f"message {j}" for j in range(i + 1)]},
+            "channel_versions": {"messages": f"{i + 1}"},
+        }
+        config = checkpointer.put(
+            config, checkpoint, {"step": i, "source": "test"}, {"messages": f"{i + 1}"}
+        )
+        checkpointer.put_writes(config, [("messages", f"pending {i}")], "task_1")
+    return config
+
+
+def compact_test_threads(checkpointer, thread_count, **kwargs):
+    with checkpointer.conn.connection() as conn:
+        return run_compaction(
+            conn,
+            start_after="compaction_",
+            batch_size=thread_count,
+            max_batches=1,
+            **kwargs,
+        )
+
+
+def test_keep_last_trims_checkpoints_and_blobs(checkpointer):
+    """
+    Test that only the latest N checkpoints, their writes and blobs remain
+    """
+    latest_config = seed_thread(checkpointer, recent_thread, datetime.now(timezone.utc))
+
+    totals = compact_test_threads(checkpointer, 1, keep_last=2)
+
+    assert totals["checkpoints"] == 3
+    assert totals["checkpoint_blobs"] == 3
+    assert totals["last_thread_id"] == recent_thread
+
+    config = {"configurable": {"thread_id": recent_thread, "checkpoint_ns": checkpoint_ns}}
+    remaining = list(checkpointer.list(config))
+    assert [ct.checkpoint["id"] for ct in remaining] == [
+        "compaction_checkpoint_4",
+        "compaction_checkpoint_3",
+    ]
+
+    latest = checkpointer.get_tuple(latest_config)
+    assert latest.checkpoint["channel_values"]["messages"][-1] == "message 4"
+    assert latest.pending_writes
+
+
+def test_keep_last_keeps_message_snapshots(checkpointer):
+    """
+    Test that the snapshots kept checkpoints store message deltas against survive
+    """
+    saver = DeltaMessagesSaver(checkpointer)
+    config = {"configurable": {"thread_id": recent_thread}}
+    graph = build_fake_agent_graph(checkpointer=saver)
+    for turn in range(3):
+        graph.invoke({"messages": [("human", f"question {turn}")]}, config)
+
+    totals = compact_test_threads(checkpointer, 1, keep_last=2)
+
+    assert totals["checkpoints"] > 0
+    assert len(list(checkpointer.list(config))) == 3, "The latest two and their snapshot"
+    messages = DeltaMessagesSaver(checkpointer).get_tuple(config).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages[::2]] == [f"question {turn}" for turn in range(3)]
+
+
+def test_ttl_purges_idle_threads(checkpointer):
+    """
+    Test that threads idle past the TTL are removed entirely
+    """
+    seed_thread(checkpointer, recent_thread, datetime.now(timezone.utc), count=2)
+    seed_thread(checkpointer, idle_thread, datetime(2024, 1, 1, tzinfo=timezone.utc), count=2)
+
+    totals = compact_test_threads(checkpointer, 2, ttl=timedelta(days=30))
+
+    assert totals["expired_threads"] == 1
+    assert totals["checkpoints"] == 2
+
+    idle = {"configurable": {"thread_id": idle_thread, "checkpoint_ns": checkpoint_ns}}
+    recent = {"configurable": {"thread_id": recent_thread, "checkpoint_ns": checkpoint_ns}}
+    assert checkpointer.get(idle) is None
+    assert checkpointer.get(recent) is not None
+
+
+def test_compaction_resumes_from_state_file(checkpointer, tmp_path):
+    """
+    Test that progress is persisted and used to resume
+    """
+    seed_thread(checkpointer, recent_thread, datetime.now(timezone.utc), count=3)
+    state_file = str(tmp_path / "compaction.state")
+
+    with checkpointer.conn.connection() as conn:
+        totals = run_compaction(
+            conn,
+            keep_last=1,
+            start_after="compaction_",
+            batch_size=1,
+            max_batches=1,
+            state_file=state_file,
+        )
+
+    assert totals["last_thread_id"] == recent_thread
+    with open(state_file) as f:
+        assert f.read() == recent_thread
+
+
+def test_completed_run_starts_over(checkpointer, tmp_path):
+    """
+    Test that a run reaching the last thread clears its state, so the next run covers
+    every thread again
+    """
+    seed_thread(checkpointer, recent_thread, datetime.now(timezone.utc), count=2)
+    seed_thread(checkpointer, idle_thread, datetime.now(timezone.utc), count=2)
+    state_file = str(tmp_path / "compaction.state")
+
+    # Resume a run stopped before the test threads and let it finish. Without keep_last
+    # and ttl only unreferenced blobs are deleted, so the other threads are left intact.
+    with open(state_file, "w") as f:
+        f.write("compaction_")
+    with checkpointer.conn.connection() as conn:
+        first = run_compaction(conn, batch_size=2, state_file=state_file)
+        assert first["threads"] >= 2
+        assert not os.path.exists(state_file)
+
+        second = run_compaction(conn, batch_size=1, max_batches=1, state_file=state_file)
+        with conn.cursor() as cur:
+            cur.execute("SELECT min(thread_id) FROM checkpoints")
+            first_thread = cur.fetchone()[0]
+
+    assert second["last_thread_id"] == first_thread
+    with open(state_file) as f:
+        assert f.read() == first_thread, "A run stopped early keeps its state"
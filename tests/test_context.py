@@ -0,0 +1,76 @@
+from langchain_community.chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+from agent.context import HistoryTrimmer, SummaryState, TokenCounter
+from fake_agent import FakeToolCallingChatModel, fake_responses, fake_search
+
+
+def build_graph(trimmer):
+    model = FakeToolCallingChatModel(responses=fake_responses)
+    return create_react_agent(
+        model,
+        [fake_search],
+        prompt=trimmer.prompt("You are a helpful assistant."),
+        pre_model_hook=trimmer.as_hook(),
+        state_schema=SummaryState,
+        checkpointer=InMemorySaver(),
+    )
+
+
+def test_token_counts_are_cached_per_message():
+    """
+    Test that each message is counted once however often the history is measured
+    """
+    counted = []
+
+    def count_tokens(messages):
+        counted.extend(messages)
+        return count_tokens_approximately(messages)
+
+    counter = TokenCounter(count_tokens)
+    history = [HumanMessage("hello there", id=str(n)) for n in range(10)]
+    for turn in range(1, 11):
+        assert sum(counter.count(message) for message in history[:turn]) > 0
+    assert len(counted) == 10
+
+
+async def test_history_is_trimmed_at_turn_boundaries():
+    """
+    Test that the stored history stays within budget and starts with a whole turn
+    """
+    trimmer = HistoryTrimmer(max_tokens=300, keep_tokens=150)
+    graph = build_graph(trimmer)
+    config = {"configurable": {"thread_id": "trim"}}
+
+    for turn in range(30):
+        await graph.ainvoke({"messages": [("human", f"question {turn} about the weather")]}, config)
+        messages = (await graph.aget_state(config)).values["messages"]
+        assert sum(trimmer.counter.count(message) for message in messages) <= 300
+        assert isinstance(messages[0], HumanMessage)
+
+    # The last turn is complete: question, tool call, tool result and answer
+    assert [type(m) for m in messages[-4:]] == [HumanMessage, AIMessage, ToolMessage, AIMessage]
+    assert messages[-4].content == "question 29 about the weather"
+    assert len(messages) < 4 * 30
+
+
+async def test_trimmed_turns_are_folded_into_the_summary():
+    """
+    Test that trimmed turns are summarized into state and the summary is sent to the model
+    """
+    summaries = FakeListChatModel(responses=[f"summary {n}" for n in range(1, 100)])
+    trimmer = HistoryTrimmer(max_tokens=300, keep_tokens=150, summary_model=summaries)
+    graph = build_graph(trimmer)
+    config = {"configurable": {"thread_id": "summary"}}
+
+    for turn in range(30):
+        await graph.ainvoke({"messages": [("human", f"question {turn} about the weather")]}, config)
+    state = (await graph.aget_state(config)).values
+
+    assert state["summary"].startswith("summary ")
+    assert int(state["summary"].split()[1]) > 1, "The summary was rolled more than once"
+    prompt = trimmer.prompt("System prompt")(state)
+    assert prompt[1].content.endswith(state["summary"])
+    assert prompt[2:] == state["messages"]
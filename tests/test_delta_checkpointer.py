@@ -0,0 +1,108 @@
+import pytest
+from uuid import uuid4
+from langchain_core.messages import RemoveMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.delta_checkpointer import DeltaMessagesSaver, is_delta
+from fake_agent import build_fake_agent_graph
+
+TURNS = 500
+
+
+def stored_bytes(saver):
+    """
+    Total size of the channel values an InMemorySaver has stored.
+    """
+    return sum(len(blob) for _, blob in saver.blobs.values())
+
+
+class CountingSaver(InMemorySaver):
+    """
+    In-memory saver counting the reads that reach it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_tuple(self, config):
+        self.reads += 1
+        return super().get_tuple(config)
+
+
+def run_thread(checkpointer, turns):
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": str(uuid4())}}
+    for turn in range(turns):
+        graph.invoke({"messages": [("human", f"question {turn}")]}, config)
+    return graph, config
+
+
+def test_long_thread_size():
+    """
+    Test that a 500-turn thread stores far fewer bytes with deltas and reads back the same
+    """
+    plain_saver = InMemorySaver()
+    plain_graph, plain_config = run_thread(plain_saver, TURNS)
+
+    inner = InMemorySaver()
+    delta_graph, delta_config = run_thread(DeltaMessagesSaver(inner), TURNS)
+
+    plain_size, delta_size = stored_bytes(plain_saver), stored_bytes(inner)
+    plain_messages = plain_graph.get_state(plain_config).values["messages"]
+    delta_messages = delta_graph.get_state(delta_config).values["messages"]
+    assert len(delta_messages) == 2 * TURNS
+    assert [m.content for m in delta_messages] == [m.content for m in plain_messages]
+
+    assert delta_size * 5 < plain_size, "Only every snapshot_every-th write stores the whole list"
+
+
+def test_history_is_rebuilt_by_another_process():
+    """
+    Test that a saver with no in-process state rebuilds histories from deltas
+    """
+    inner = CountingSaver()
+    _, config = run_thread(DeltaMessagesSaver(inner, snapshot_every=4), 10)
+
+    stored = inner.get_tuple(config).checkpoint
+    assert is_delta(stored["channel_values"]["messages"]), "The latest write is stored as a delta"
+    assert stored["delta_snapshots"]["messages"] == stored["channel_values"]["messages"]["base"]
+
+    fresh = DeltaMessagesSaver(inner, snapshot_every=4)
+    inner.reads = 0
+    messages = fresh.get_tuple(config).checkpoint["channel_values"]["messages"]
+    assert inner.reads == 2, "A delta is rebuilt from its snapshot alone"
+    assert type(messages) is list
+    assert [m.content for m in messages[::2]] == [f"question {turn}" for turn in range(10)]
+    # Serializers read the list directly, without going through its methods
+    assert inner.serde.loads_typed(inner.serde.dumps_typed(messages)) == messages
+
+    # Earlier checkpoints are rebuilt too, from the snapshots listed with them
+    inner.reads = 0
+    history = list(fresh.list(config))
+    assert inner.reads == 0
+    assert [len(t.checkpoint["channel_values"].get("messages", [])) for t in history[::3]] == [
+        2 * turns for turns in range(10, 0, -1)
+    ]
+
+
+async def test_async_reads_and_snapshots_on_edits():
+    """
+    Test that removed messages force a snapshot and async reads rebuild the history
+    """
+    inner = InMemorySaver()
+    saver = DeltaMessagesSaver(inner)
+    graph = build_fake_agent_graph(checkpointer=saver)
+    config = {"configurable": {"thread_id": str(uuid4())}}
+    for turn in range(3):
+        await graph.ainvoke({"messages": [("human", f"question {turn}")]}, config)
+
+    first = (await graph.aget_state(config)).values["messages"][0]
+    await graph.aupdate_state(config, {"messages": [RemoveMessage(id=first.id)]})
+    assert not is_delta(inner.get_tuple(config).checkpoint["channel_values"]["messages"])
+
+    await graph.ainvoke({"messages": [("human", "question 3")]}, config)
+    fresh = DeltaMessagesSaver(inner)
+    messages = (await fresh.aget_tuple(config)).checkpoint["channel_values"]["messages"]
+    assert len(messages) == 7
+    assert messages[0].content != "question 0"
+    assert messages[-2].content == "question 3"
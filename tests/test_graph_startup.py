@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+DEFERRED_MODULES = [
+    "langchain_openai",
+    "langchain_community",
+    "langgraph.prebuilt",
+    "psycopg_pool",
+]
+
+
+def test_graph_import_is_lazy():
+    """
+    Test that importing the graph module does no network or heavy import work
+    """
+    code = (
+        "import sys, agent.graph; "
+        f"print([m for m in {DEFERRED_MODULES!r} if m in sys.modules]); "
+        "print(agent.graph._agent)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    loaded, graph = out.stdout.strip().splitlines()[-2:]
+
+    assert loaded == "[]", f"Modules imported eagerly: {loaded}"
+    assert graph == "None", "The agent should not be built at import time"
+
+
+async def test_get_agent_is_cached():
+    """
+    Test that the graph factory builds the agent once and reuses it
+    """
+    from agent.graph import get_agent
+    from agent.async_checkpointer import close_async_pool
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-test")
+
+    first = await get_agent()
+    second = await get_agent()
+    await close_async_pool()
+
+    assert first is second
+    assert first.checkpointer is not None
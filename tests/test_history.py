@@ -0,0 +1,109 @@
+import pytest
+from uuid import uuid4
+from langgraph.checkpoint.memory import InMemorySaver
+from agent.async_checkpointer import get_async_checkpointer, apurge_checkpoints, close_async_pool
+from agent.checkpointer import get_sync_checkpointer, purge_checkpoints
+from agent.history import CheckpointSummary, aiter_history, iter_history
+
+checkpoint_ns = __name__
+CHECKPOINTS = 25
+
+
+def make_checkpoint(i):
+    return {
+        "v": 1,
+        "id": f"history_{i:04d}",
+        "ts": "2024-01-01T00:00:00+00:00",
+        "channel_values": {"key": f"value {i}"},
+        "channel_versions": {"key": f"{i:04d}"},
+        "versions_seen": {},
+        "pending_sends": [],
+    }
+
+
+def fill_thread(saver, thread_id):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+    for i in range(CHECKPOINTS):
+        config = saver.put(
+            config, make_checkpoint(i), {"step": i, "source": "history_test"}, {"key": f"{i:04d}"}
+        )
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+
+
+@pytest.fixture
+async def checkpointer():
+    checkpointer = await get_sync_checkpointer()
+    yield checkpointer
+    purge_checkpoints(checkpoint_ns=[checkpoint_ns])
+
+
+def test_history_streams_in_chunks(checkpointer):
+    """
+    Test that the history matches list() and is fetched one chunk at a time
+    """
+    config = fill_thread(checkpointer, str(uuid4()))
+    queries = []
+    cursor = checkpointer._cursor
+
+    def counting_cursor(*args, **kwargs):
+        queries.append(1)
+        return cursor(*args, **kwargs)
+
+    checkpointer._cursor = counting_cursor
+    history = iter_history(checkpointer, config, chunk_size=10)
+    first = next(history)
+    assert len(queries) == 1, "Only the first chunk is fetched before it's consumed"
+
+    entries = [first, *history]
+    del checkpointer._cursor
+    assert len(queries) == 3
+    assert [e.checkpoint["id"] for e in entries] == [
+        t.checkpoint["id"] for t in checkpointer.list(config)
+    ]
+    assert entries[0].checkpoint["channel_values"] == {"key": f"value {CHECKPOINTS - 1}"}
+    assert entries[0].parent_config["configurable"]["checkpoint_id"] == f"history_{CHECKPOINTS - 2:04d}"
+
+
+def test_metadata_only_history(checkpointer):
+    config = fill_thread(checkpointer, str(uuid4()))
+    before = {"configurable": {"checkpoint_id": "history_0010"}}
+
+    entries = list(iter_history(checkpointer, config, before=before, chunk_size=4, metadata_only=True))
+
+    assert all(isinstance(entry, CheckpointSummary) for entry in entries)
+    assert [entry.metadata["step"] for entry in entries] == list(range(9, -1, -1))
+    assert entries[0].ts == "2024-01-01T00:00:00+00:00"
+    assert entries[-1].parent_config is None
+
+
+async def test_async_history():
+    thread_id = str(uuid4())
+    try:
+        saver = await get_async_checkpointer()
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+        for i in range(CHECKPOINTS):
+            config = await saver.aput(config, make_checkpoint(i), {"step": i}, {"key": f"{i:04d}"})
+
+        config = {"configurable": {"thread_id": thread_id}}
+        entries = [e async for e in aiter_history(saver, config, chunk_size=7)]
+        summaries = [e async for e in aiter_history(saver, config, chunk_size=7, metadata_only=True)]
+
+        assert [e.checkpoint["id"] for e in entries] == [f"history_{i:04d}" for i in range(24, -1, -1)]
+        assert [s.config for s in summaries] == [e.config for e in entries]
+    finally:
+        await apurge_checkpoints(thread_ids=[thread_id])
+        await close_async_pool()
+
+
+async def test_history_of_other_savers_is_paged():
+    """
+    Test that savers other than Postgres are paged through list(before=, limit=)
+    """
+    saver = InMemorySaver()
+    config = fill_thread(saver, "memory")
+
+    entries = list(iter_history(saver, config, chunk_size=4))
+    summaries = [e async for e in aiter_history(saver, config, chunk_size=4, metadata_only=True)]
+
+    assert [e.checkpoint["id"] for e in entries] == [f"history_{i:04d}" for i in range(24, -1, -1)]
+    assert [s.metadata["step"] for s in summaries] == list(range(24, -1, -1))
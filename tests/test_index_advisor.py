@@ -0,0 +1,16 @@
+from agent.checkpointer import get_db_connection_string
+from benchmarks.index_advisor import advise
+
+
+def test_index_migrations_remove_sequential_scans():
+    """
+    Test that the advisor flags namespace purges and metadata filters only without our indexes
+    """
+    dsn = get_db_connection_string()
+
+    before = advise(dsn, schema="test_index_advisor", indexes=False)
+    after = advise(dsn, schema="test_index_advisor")
+
+    assert before["purge (checkpoint_ns)"]["seq_scans"]
+    assert before["list (filter)"]["seq_scans"] == ["checkpoints"]
+    assert {name: result["seq_scans"] for name, result in after.items()} == dict.fromkeys(after, [])
@@ -0,0 +1,102 @@
+import re
+import zlib
+from langchain_community.chat_models import FakeListChatModel
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage, SystemMessage
+from agent.llm_cache import LLMResponseCache
+from fake_agent import FakeToolCallingChatModel, fake_search
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """
+    Offline embeddings where questions sharing most of their words are similar.
+    """
+
+    def embed_query(self, text):
+        vector = [0.0] * 64
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % 64] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_exact_tier_serves_repeated_prompts():
+    """
+    Test that prompts differing only in whitespace are served from the cache
+    """
+    cache = LLMResponseCache()
+    model = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    assert model.invoke([HumanMessage("What is  the weather?")]).content == "first"
+    assert model.invoke([HumanMessage("What is the weather? ")]).content == "first"
+    assert model.invoke([HumanMessage("Who won the game?")]).content == "second"
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+async def test_cached_tool_calls_get_fresh_ids():
+    """
+    Test that a cached tool call is served with new message and tool call IDs
+    """
+    cache = LLMResponseCache()
+    model = FakeToolCallingChatModel(responses=["done"], cache=cache).bind_tools([fake_search])
+    messages = [SystemMessage("Be helpful"), HumanMessage("weather in sf")]
+
+    first = await model.ainvoke(messages)
+    second = await model.ainvoke(messages)
+
+    assert cache.stats()["exact_hits"] == 1
+    assert second.tool_calls[0]["args"] == first.tool_calls[0]["args"]
+    assert second.tool_calls[0]["id"] != first.tool_calls[0]["id"]
+    assert second.id != first.id
+
+
+def test_entries_expire_and_are_evicted():
+    """
+    Test TTL expiry and least recently used eviction beyond max_entries
+    """
+    clock = Clock()
+    cache = LLMResponseCache(ttl=60, max_entries=2, clock=clock)
+    model = FakeListChatModel(responses=["a", "b", "c", "d"], cache=cache)
+
+    assert model.invoke("one").content == "a"
+    assert model.invoke("two").content == "b"
+    assert model.invoke("one").content == "a"
+    assert model.invoke("three").content == "c"  # evicts "two", the least recently used
+    assert model.invoke("two").content == "d"
+    assert cache.stats()["evictions"] == 2
+
+    clock.now = 61
+    assert model.invoke("two").content == "a"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_semantic_tier_serves_near_duplicates():
+    """
+    Test that a near-duplicate question hits, but only after the same earlier messages
+    """
+    cache = LLMResponseCache(embeddings=BagOfWordsEmbeddings(), similarity_threshold=0.9)
+    model = FakeListChatModel(responses=["sunny", "other", "third"], cache=cache)
+    system = SystemMessage("Be helpful")
+
+    assert model.invoke([system, HumanMessage("What is the weather in San Francisco")]).content == "sunny"
+    near = model.invoke([system, HumanMessage("what is the weather in San Francisco today?")])
+    assert near.content == "sunny"
+    assert cache.stats()["semantic_hits"] == 1
+
+    assert model.invoke([system, HumanMessage("Who won the game last night")]).content == "other"
+    other_context = [SystemMessage("Be brief"), HumanMessage("What is the weather in San Francisco")]
+    assert model.invoke(other_context).content == "third"
+    assert cache.stats()["misses"] == 3
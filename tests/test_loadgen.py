@@ -0,0 +1,44 @@
+import pytest
+from benchmarks.loadgen import run_load, start_offset
+
+
+def make_options(**overrides):
+    return {
+        "conversations": 20,
+        "turns": 2,
+        "concurrency": 5,
+        "profile": "instant",
+        "ramp_up": 0.0,
+        "steps": 1,
+        "processes": 1,
+        "checkpointer": "memory",
+        "model_latency": 0.0,
+        **overrides,
+    }
+
+
+@pytest.mark.parametrize(
+    "profile, offsets",
+    [
+        ("instant", [0.0, 0.0, 0.0, 0.0]),
+        ("linear", [0.0, 1.0, 2.0, 3.0]),
+        ("step", [0.0, 0.0, 2.0, 2.0]),
+    ],
+)
+def test_ramp_up_profiles(profile, offsets):
+    assert [start_offset(i, 4, profile, 4.0, 2) for i in range(4)] == offsets
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_load_run_reports_latency_and_errors(processes):
+    """
+    Test that every conversation runs the fake react agent, in one or several processes
+    """
+    report = run_load(make_options(processes=processes, profile="linear", ramp_up=0.2))
+
+    assert report["conversations_completed"] == 20
+    assert report["error_rate"] == 0
+    assert report["turns"] == 40
+    assert report["latency"]["count"] == 40
+    assert sum(report["histogram_ms"].values()) == 40
+    assert report["peak_in_flight"] <= 5 * processes
@@ -0,0 +1,137 @@
+import psycopg
+import pytest
+from datetime import datetime, timedelta, timezone
+from langgraph.checkpoint.base.id import uuid6
+from agent import checkpointer as checkpointer_module
+from agent.checkpointer import get_db_connection_string, get_sync_checkpointer, reset_bootstrap_cache
+from agent.delta_checkpointer import DeltaMessagesSaver, is_delta
+from agent.partitions import (
+    drop_expired_partitions,
+    ensure_partitions,
+    get_partition_settings,
+    list_partitions,
+    plan_partitions,
+    uuid6_at,
+    uuid6_time,
+)
+from fake_agent import build_fake_agent_graph
+
+schema = "test_partitions"
+
+
+@pytest.fixture
+async def checkpointer(monkeypatch):
+    monkeypatch.setenv("SUPABASE_DB_SCHEMA", schema)
+    monkeypatch.setenv("SUPABASE_DB_PARTITIONING", "time")
+    monkeypatch.setenv("SUPABASE_DB_HASH_PARTITIONS", "4")
+    with psycopg.connect(get_db_connection_string(), autocommit=True) as admin:
+        admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        admin.execute(f"CREATE SCHEMA {schema}")
+        reset_bootstrap_cache()
+        checkpointer = await get_sync_checkpointer()
+        yield checkpointer
+        checkpointer.conn.close()
+        reset_bootstrap_cache()
+        admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+def seed_thread(checkpointer, thread_id, moment, count=3, moments=None):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for i in range(count):
+        checkpoint_time = moments[i] if moments else moment + timedelta(seconds=i)
+        checkpoint = {
+            "v": 1,
+            "id": uuid6_at(checkpoint_time, clock_seq=i, node=1),
+            "ts": checkpoint_time.isoformat(),
+            "channel_values": {"messages": [f"message {j}" for j in range(i + 1)]},
+            "channel_versions": {"messages": f"{i + 1}"},
+            "versions_seen": {},
+            "pending_sends": [],
+        }
+        config = checkpointer.put(config, checkpoint, {"step": i}, {"messages": f"{i + 1}"})
+        checkpointer.put_writes(config, [("messages", f"pending {i}")], "task_1")
+    return config
+
+
+def test_uuid6_bounds_match_generated_ids():
+    before = datetime.now(timezone.utc)
+    checkpoint_id = str(uuid6())
+    after = datetime.now(timezone.utc) + timedelta(microseconds=1)
+
+    assert uuid6_at(before) <= checkpoint_id < uuid6_at(after)
+    assert before <= uuid6_time(checkpoint_id) <= after
+
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    existing = [("checkpoints_p20240102", uuid6_at(day + timedelta(days=1)), uuid6_at(day + timedelta(days=2)))]
+    statements = plan_partitions("checkpoints", existing, 1, day + timedelta(hours=5), day + timedelta(days=3))
+    assert [s.split()[5] for s in statements] == ["checkpoints_p20240101", "checkpoints_p20240103"]
+
+
+def test_partitioned_bootstrap_and_retention(checkpointer):
+    """
+    Test that the bootstrap creates partitioned tables the graph can use, and that
+    retention drops old partitions and sweeps their threads' blobs
+    """
+    with checkpointer.conn.connection() as conn:
+        assert checkpointer_module.get_schema_versions(conn) == (
+            checkpointer_module.SCHEMA_MIGRATION_VERSION,
+            checkpointer_module.INDEX_MIGRATION_VERSION,
+        )
+        assert len(list_partitions(conn, "checkpoint_blobs")) == 4
+        # The default partition plus today and the premade periods
+        assert len(list_partitions(conn, "checkpoints")) == 1 + 1 + 7
+
+    graph = build_fake_agent_graph(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": "partitioned_live"}}
+    graph.invoke({"messages": [("human", "hello")]}, config)
+    graph.invoke({"messages": [("human", "again")]}, config)
+    assert len(graph.get_state(config).values["messages"]) == 4
+
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=10)
+    with checkpointer.conn.connection() as conn:
+        ensure_partitions(conn, get_partition_settings(), start=old, end=now)
+    old_config = seed_thread(checkpointer, "partitioned_old", old)
+    assert checkpointer.get_tuple(old_config) is not None
+
+    with checkpointer.conn.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM checkpoints_default")
+            assert cur.fetchone()[0] == 0, "Every checkpoint landed in a period partition"
+
+        counts = drop_expired_partitions(conn, timedelta(days=5))
+
+    assert counts["partitions"] == 2 * 5
+    assert counts["checkpoint_blobs"] == 3
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "partitioned_old"}}) is None
+    assert len(graph.get_state(config).values["messages"]) == 4
+    with checkpointer.conn.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM checkpoint_writes WHERE thread_id = 'partitioned_old'")
+        assert cur.fetchone()[0] == 0
+
+
+def test_retention_keeps_message_snapshots(checkpointer):
+    """
+    Test that a dropped partition's checkpoints still holding the snapshot of newer
+    message deltas are kept
+    """
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=10)
+    with checkpointer.conn.connection() as conn:
+        ensure_partitions(conn, get_partition_settings(), start=old, end=now)
+
+    saver = DeltaMessagesSaver(checkpointer)
+    moments = [old, old + timedelta(seconds=1), now]
+    config = seed_thread(saver, "partitioned_delta", old, moments=moments)
+    seed_thread(saver, "partitioned_old", old)
+    assert is_delta(checkpointer.get_tuple(config).checkpoint["channel_values"]["messages"])
+
+    with checkpointer.conn.connection() as conn:
+        drop_expired_partitions(conn, timedelta(days=5))
+        with conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM checkpoints_default WHERE thread_id = 'partitioned_delta'")
+            assert cur.fetchone()[0] == 1, "Only the snapshot is moved out of its partition"
+
+    assert checkpointer.get_tuple({"configurable": {"thread_id": "partitioned_old"}}) is None
+    latest = DeltaMessagesSaver(checkpointer).get_tuple({"configurable": {"thread_id": "partitioned_delta"}})
+    assert latest.checkpoint["channel_values"]["messages"] == ["message 0", "message 1", "message 2"]
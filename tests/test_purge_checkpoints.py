@@ -0,0 +1,112 @@
+import pytest
+from agent.checkpointer import get_sync_checkpointer, purge_checkpoints, delete_checkpoints
+from agent.async_checkpointer import apurge_checkpoints, close_async_pool
+
+checkpoint_ns = __name__
+
+
+@pytest.fixture
+async def checkpointer():
+    checkpointer = await get_sync_checkpointer()
+    return checkpointer
+
+
+def seed_threads(checkpointer, thread_ids, ns=checkpoint_ns, checkpoints_per_thread=2):
+    """
+    Save a few checkpoints, each with a blob and a pending write, for every thread
+    """
+    for thread_id in thread_ids:
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns}}
+        for i in range(checkpoints_per_thread):
+            checkpoint = {
+                "v": 1,
+                "id": f"purge_checkpoint_{i}",
+                "ts": f"2024-01-0{i+1}T00:00:00+00:00",
+                "channel_values": {"messages": [f"message {i}"]},
+                "channel_versions": {"messages": f"{i + 1}"},
+            }
+            saved_config = checkpointer.put(
+                config, checkpoint, {"step": i, "source": "test"}, {"messages": f"{i + 1}"}
+            )
+            checkpointer.put_writes(saved_config, [("messages", "pending")], "task_1")
+
+
+def test_purge_by_thread_ids_in_batches(checkpointer):
+    """
+    Test purging many threads returns per-table row counts and removes everything
+    """
+    thread_ids = [f"purge_thread_{i}" for i in range(7)]
+    seed_threads(checkpointer, thread_ids)
+
+    counts = purge_checkpoints(thread_ids=thread_ids, batch_size=3, conn=checkpointer.conn)
+
+    assert counts == {
+        "checkpoint_blobs": 14,
+        "checkpoint_writes": 14,
+        "checkpoints": 14,
+    }
+    for thread_id in thread_ids:
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+        assert checkpointer.get(config) is None
+
+
+def test_purge_by_namespace_leaves_other_namespaces(checkpointer):
+    """
+    Test purging a namespace does not touch other namespaces of the same thread
+    """
+    other_ns = f"{checkpoint_ns}.other"
+    seed_threads(checkpointer, ["purge_ns_thread"], ns=checkpoint_ns)
+    seed_threads(checkpointer, ["purge_ns_thread"], ns=other_ns)
+
+    counts = purge_checkpoints(checkpoint_ns=[checkpoint_ns], conn=checkpointer.conn)
+    assert counts["checkpoints"] == 2
+
+    kept = {"configurable": {"thread_id": "purge_ns_thread", "checkpoint_ns": other_ns}}
+    assert checkpointer.get(kept) is not None
+
+    purge_checkpoints(checkpoint_ns=[other_ns], conn=checkpointer.conn)
+
+
+async def test_apurge_checkpoints(checkpointer):
+    """
+    Test the async purge deletes through the shared pool
+    """
+    thread_ids = [f"apurge_thread_{i}" for i in range(3)]
+    seed_threads(checkpointer, thread_ids)
+
+    counts = await apurge_checkpoints(thread_ids=thread_ids)
+    await close_async_pool()
+
+    assert counts["checkpoints"] == 6
+    assert counts["checkpoint_blobs"] == 6
+
+
+async def test_delete_checkpoints_matches_thread(checkpointer):
+    """
+    Test delete_checkpoints actually deletes the thread's rows
+    """
+    seed_threads(checkpointer, ["delete_thread"])
+
+    assert await delete_checkpoints(thread_id="delete_thread")
+
+    config = {"configurable": {"thread_id": "delete_thread", "checkpoint_ns": checkpoint_ns}}
+    assert checkpointer.get(config) is None
+
+
+def test_purge_requires_a_filter():
+    """
+    Test purging without thread IDs or namespaces is rejected
+    """
+    with pytest.raises(ValueError):
+        purge_checkpoints()
+
+
+def test_purge_rejects_a_single_string():
+    """
+    Test that a string passed as the thread IDs or namespaces is rejected rather than
+    purged character by character
+    """
+    with pytest.raises(TypeError):
+        purge_checkpoints(thread_ids="delete_thread")
+    with pytest.raises(TypeError):
+        purge_checkpoints(checkpoint_ns=checkpoint_ns)
@@ -0,0 +1,127 @@
+import psycopg
+import pytest
+from agent import checkpointer as checkpointer_module
+from agent.checkpointer import (
+    get_sync_checkpointer,
+    reset_bootstrap_cache,
+    bootstrap_stats,
+    get_schema_versions,
+    migrate_indexes,
+    purge_checkpoints,
+    INDEX_MIGRATION_VERSION,
+)
+from agent.async_checkpointer import get_async_checkpointer, close_async_pool
+
+
+async def test_sync_bootstrap_runs_once_per_process():
+    """
+    Test that only the first sync checkpointer runs bootstrap queries
+    """
+    reset_bootstrap_cache()
+
+    await get_sync_checkpointer()
+    first_queries = bootstrap_stats["queries"]
+    assert 1 <= first_queries <= 2, f"Expected 1-2 bootstrap queries, got {first_queries}"
+
+    for _ in range(3):
+        await get_sync_checkpointer()
+
+    assert bootstrap_stats["queries"] == first_queries, "Bootstrap queries ran again"
+    assert bootstrap_stats["setups"] <= 1, "setup() ran more than once"
+
+
+async def test_async_bootstrap_shares_the_cache():
+    """
+    Test that async checkpointers reuse the process-wide bootstrap cache
+    """
+    reset_bootstrap_cache()
+
+    await get_async_checkpointer()
+    first_queries = bootstrap_stats["queries"]
+    assert first_queries >= 1
+
+    await get_async_checkpointer()
+    await close_async_pool()
+
+    assert bootstrap_stats["queries"] == first_queries, "Bootstrap queries ran again"
+
+
+async def test_bootstrap_reruns_for_new_migration_version(monkeypatch):
+    """
+    Test that bumping the migration version invalidates the cache
+    """
+    reset_bootstrap_cache()
+    await get_sync_checkpointer()
+    first_queries = bootstrap_stats["queries"]
+
+    monkeypatch.setattr(
+        checkpointer_module,
+        "SCHEMA_MIGRATION_VERSION",
+        checkpointer_module.SCHEMA_MIGRATION_VERSION - 1,
+    )
+    await get_sync_checkpointer()
+
+    assert bootstrap_stats["queries"] > first_queries
+
+
+async def test_bootstrap_applies_index_migrations():
+    """
+    Test that the bootstrap records and creates our index migrations
+    """
+    reset_bootstrap_cache()
+    checkpointer = await get_sync_checkpointer()
+
+    with checkpointer.conn.connection() as conn, conn.cursor() as cur:
+        assert get_schema_versions(conn) == (
+            checkpointer_module.SCHEMA_MIGRATION_VERSION,
+            checkpointer_module.INDEX_MIGRATION_VERSION,
+        )
+        cur.execute(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+            " AND indexname LIKE '%%checkpoint_ns_idx'"
+        )
+        assert len(cur.fetchall()) == 3
+
+
+async def test_index_migration_rebuilds_invalid_index():
+    """
+    Test that an index left invalid by a failed concurrent build is rebuilt before its
+    migration is recorded
+    """
+    reset_bootstrap_cache()
+    checkpointer = await get_sync_checkpointer()
+    index_name = "checkpoints_metadata_idx"
+    config = {"configurable": {"thread_id": "bootstrap_invalid_index", "checkpoint_ns": ""}}
+    for i in range(2):
+        checkpoint = {
+            "v": 1,
+            "id": f"bootstrap_checkpoint_{i}",
+            "ts": "",
+            "channel_values": {},
+            "channel_versions": {},
+        }
+        config = checkpointer.put(config, checkpoint, {}, {})
+
+    try:
+        with checkpointer.conn.connection() as conn, conn.cursor() as cur:
+            # A unique index over duplicate rows fails to build, leaving an invalid index
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+            with pytest.raises(psycopg.errors.UniqueViolation):
+                cur.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {index_name} ON checkpoints ((true))")
+            cur.execute("DELETE FROM checkpoint_index_migrations WHERE v = %s", (INDEX_MIGRATION_VERSION,))
+
+            migrate_indexes(conn, INDEX_MIGRATION_VERSION - 1)
+
+            cur.execute(
+                "SELECT i.indisvalid, pg_get_indexdef(i.indexrelid) FROM pg_index i"
+                " JOIN pg_class c ON c.oid = i.indexrelid"
+                " JOIN pg_namespace n ON n.oid = c.relnamespace"
+                " WHERE n.nspname = current_schema() AND c.relname = %s",
+                (index_name,),
+            )
+            valid, definition = cur.fetchone()
+            assert valid
+            assert "gin" in definition
+            assert get_schema_versions(conn)[1] == INDEX_MIGRATION_VERSION
+    finally:
+        purge_checkpoints(thread_ids=["bootstrap_invalid_index"], conn=checkpointer.conn)
@@ -0,0 +1,86 @@
+import pytest
+from uuid import uuid4
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from agent.async_checkpointer import get_async_checkpointer, apurge_checkpoints, close_async_pool
+from agent.serde import CompressedSerializer, get_serializer
+from fake_agent import build_fake_agent_graph
+
+# A large tool output, like a search tool's payload
+search_results = [
+    {"url": f"https://example.com/weather/{i}", "content": "Sunny with a high of 68°F. " * 40}
+    for i in range(5)
+]
+messages = [
+    HumanMessage("what's the weather in sf"),
+    AIMessage("", tool_calls=[{"name": "search", "args": {"query": "sf weather"}, "id": "call_1"}]),
+    ToolMessage(content=str(search_results), tool_call_id="call_1"),
+    AIMessage("The weather in San Francisco is sunny with a high of 68°F."),
+]
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4", "zlib"])
+def test_large_values_are_compressed_and_tagged(compression):
+    """
+    Test that values above the threshold are compressed, tagged and load back unchanged
+    """
+    pytest.importorskip({"zstd": "zstandard", "lz4": "lz4.frame", "zlib": "zlib"}[compression])
+    serde = CompressedSerializer(compression=compression)
+
+    typ, data = serde.dumps_typed(messages)
+    plain_typ, plain_data = JsonPlusSerializer().dumps_typed(messages)
+    assert typ == f"{plain_typ}+{compression}"
+    assert len(data) < len(plain_data) / 2
+    assert serde.loads_typed((typ, data)) == messages
+
+
+def test_small_and_older_values_load_untagged():
+    """
+    Test that small values aren't compressed and untagged values still load
+    """
+    serde = CompressedSerializer(compression="zlib", threshold=1024)
+    assert serde.dumps_typed(messages[0]) == JsonPlusSerializer().dumps_typed(messages[0])
+
+    stored = JsonPlusSerializer().dumps_typed(messages)
+    assert serde.loads_typed(stored) == messages
+    assert serde.loads_typed(("null", b"")) is None
+
+
+def test_serializer_is_configured_from_the_environment(monkeypatch):
+    monkeypatch.delenv("SUPABASE_DB_COMPRESSION", raising=False)
+    assert get_serializer() is None
+
+    monkeypatch.setenv("SUPABASE_DB_COMPRESSION", "zlib")
+    monkeypatch.setenv("SUPABASE_DB_COMPRESSION_THRESHOLD", "64")
+    serde = get_serializer()
+    assert serde.compression == "zlib"
+    assert serde.threshold == 64
+
+
+async def test_checkpointer_stores_compressed_blobs():
+    """
+    Test that the checkpointer factory stores compressed blobs that read back as stored
+    """
+    thread_id = str(uuid4())
+    config = {"configurable": {"thread_id": thread_id}}
+    try:
+        checkpointer = await get_async_checkpointer(
+            serde=CompressedSerializer(compression="zlib", threshold=256)
+        )
+        graph = build_fake_agent_graph(checkpointer=checkpointer)
+        await graph.ainvoke({"messages": messages}, config)
+
+        async with checkpointer.conn.connection() as conn:
+            rows = await (
+                await conn.execute(
+                    "SELECT type FROM checkpoint_blobs WHERE thread_id = %s AND channel = 'messages'",
+                    (thread_id,),
+                )
+            ).fetchall()
+        assert rows and all(typ == "msgpack+zlib" for typ, in rows)
+
+        state = await graph.aget_state(config)
+        assert state.values["messages"][:4] == messages
+    finally:
+        await apurge_checkpoints(thread_ids=[thread_id])
+        await close_async_pool()
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from agent.sqlite_checkpointer import (
+    close_async_sqlite,
+    close_sqlite,
+    get_async_sqlite_connection,
+    get_sqlite_checkpointer,
+)
+
+
+@pytest.fixture(autouse=True)
+def sqlite_path(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_SQLITE_PATH", str(tmp_path / "checkpoints.sqlite"))
+    yield
+    close_sqlite()
+
+
+def test_sync_checkpointers_share_one_connection():
+    """
+    Test that sync checkpointers reuse the process-wide connection and its lock
+    """
+    first = get_sqlite_checkpointer()
+    second = get_sqlite_checkpointer()
+    assert first.conn is second.conn
+    assert first.lock is second.lock
+
+    first.conn.close()
+    third = get_sqlite_checkpointer()
+    assert third.conn is not first.conn, "A closed connection is reopened"
+    assert third.get_tuple({"configurable": {"thread_id": "none"}}) is None
+
+
+def test_changing_the_path_leaves_earlier_savers_working(monkeypatch, tmp_path):
+    """
+    Test that savers on a database stay usable once checkpointers use another database
+    """
+    first = get_sqlite_checkpointer()
+    monkeypatch.setenv("CHECKPOINT_SQLITE_PATH", str(tmp_path / "other.sqlite"))
+    second = get_sqlite_checkpointer()
+
+    assert second.conn is not first.conn
+    assert second.lock is not first.lock
+    assert first.get_tuple({"configurable": {"thread_id": "none"}}) is None
+    assert get_sqlite_checkpointer().conn is second.conn
+
+
+async def test_concurrent_first_calls_open_one_connection():
+    """
+    Test that concurrent first calls on a loop get the same async connection
+    """
+    await close_async_sqlite()
+    connections = await asyncio.gather(*(get_async_sqlite_connection() for _ in range(5)))
+    assert all(conn is connections[0] for conn in connections)
+    await close_async_sqlite()
+
+
+def test_connection_from_another_loop_is_closed():
+    """
+    Test that the connection opened on a previous event loop is closed when replaced
+    """
+    first = asyncio.run(get_async_sqlite_connection())
+    second = asyncio.run(get_async_sqlite_connection())
+    assert second is not first
+    assert first._connection is None, "The replaced connection was closed"
+    asyncio.run(close_async_sqlite())
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+from agent.streaming import astream_chat
+from fake_agent import FakeToolCallingChatModel, fake_responses, fake_search
+
+
+class CountingSaver(InMemorySaver):
+    """
+    In-memory saver counting the checkpoints written to it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.puts = 0
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        self.puts += 1
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+
+def build_graph(token_latency=None, checkpointer=None):
+    model = FakeToolCallingChatModel(responses=fake_responses, token_latency=token_latency)
+    return create_react_agent(model, [fake_search], checkpointer=checkpointer or InMemorySaver())
+
+
+async def test_tokens_stream_before_the_turn_ends():
+    """
+    Test that tool events and then the answer's tokens arrive while the turn is running
+    """
+    graph = build_graph(token_latency=0.02)
+    config = {"configurable": {"thread_id": "stream"}}
+
+    started = time.perf_counter()
+    events, first_token = [], None
+    async for event in astream_chat({"messages": [("human", "weather in sf")]}, config, graph=graph):
+        if event["event"] == "token" and first_token is None:
+            first_token = time.perf_counter() - started
+        events.append(event)
+    total = time.perf_counter() - started
+
+    assert [e["event"] for e in events[:2]] == ["tool_call", "tool_result"]
+    assert events[0]["id"] == events[1]["tool_call_id"]
+    tokens = [e for e in events[2:] if e["event"] == "token"]
+    assert len(tokens) > 5
+    assert "".join(e["content"] for e in tokens) == fake_responses[0]
+    assert first_token < total / 2
+
+    final = await graph.aget_state(config)
+    assert final.values["messages"][-1].content == fake_responses[0]
+
+
+async def test_streaming_checkpoints_per_node_like_invoke():
+    """
+    Test that streaming writes the same checkpoints as invoke, not one per token
+    """
+    saver = CountingSaver()
+    graph = build_graph(checkpointer=saver)
+    await graph.ainvoke({"messages": [("human", "weather")]}, {"configurable": {"thread_id": "invoke"}})
+    invoke_puts, saver.puts = saver.puts, 0
+
+    config = {"configurable": {"thread_id": "stream"}}
+    events = [e async for e in astream_chat({"messages": [("human", "weather")]}, config, graph=graph)]
+    assert len(events) > saver.puts
+    assert saver.puts == invoke_puts
+
+
+async def test_slow_consumer_gets_merged_tokens():
+    """
+    Test that a slow consumer receives fewer, larger tokens holding the whole answer
+    """
+    graph = build_graph(token_latency=0.001)
+    config = {"configurable": {"thread_id": "slow"}}
+
+    tokens = []
+    async for event in astream_chat({"messages": [("human", "weather")]}, config, graph=graph, max_queue=1):
+        if event["event"] == "token":
+            tokens.append(event["content"])
+        await asyncio.sleep(0.02)
+
+    assert "".join(tokens) == fake_responses[0]
+    assert len(tokens) < len(fake_responses[0].split())
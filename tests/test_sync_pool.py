@@ -0,0 +1,62 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from agent.checkpointer import (
+    close_sync_pool,
+    create_sync_checkpointer,
+    get_pool_settings,
+    get_sync_pool,
+    purge_checkpoints,
+)
+from fake_agent import build_fake_agent_graph
+
+thread_ids = [f"sync_pool_{i}" for i in range(8)]
+
+
+@pytest.fixture
+def pool():
+    pool = get_sync_pool()
+    yield pool
+    purge_checkpoints(thread_ids=thread_ids)
+    close_sync_pool()
+
+
+def test_pool_is_shared_between_checkpointers(pool):
+    """
+    Test that every checkpointer is backed by the same open, warmed pool
+    """
+    first = create_sync_checkpointer()
+    second = create_sync_checkpointer()
+
+    assert first.conn is pool
+    assert second.conn is pool
+    assert pool.get_stats()["pool_size"] >= get_pool_settings()["min_size"]
+    assert pool.max_size == get_pool_settings()["max_size"]
+
+
+def test_checkpointer_serves_concurrent_threads(pool):
+    """
+    Test that one checkpointer can run graphs from many worker threads at once
+    """
+    graph = build_fake_agent_graph(checkpointer=create_sync_checkpointer())
+
+    def run(thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        graph.invoke({"messages": [("human", "hello")]}, config)
+        graph.invoke({"messages": [("human", "again")]}, config)
+        return len(graph.get_state(config).values["messages"])
+
+    with ThreadPoolExecutor(max_workers=len(thread_ids)) as executor:
+        assert list(executor.map(run, thread_ids)) == [4] * len(thread_ids)
+
+
+def test_pool_closes_and_reopens(pool):
+    """
+    Test that closing the pool shuts it down and the next caller gets a fresh one
+    """
+    close_sync_pool()
+    assert pool.closed
+
+    reopened = get_sync_pool()
+    assert reopened is not pool
+    with reopened.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import ToolException
+from agent.tool_cache import ToolResultCache
+from fake_agent import SlowSearchTool
+
+
+async def test_identical_calls_are_coalesced_and_cached():
+    """
+    Test that a burst of identical searches makes one call, and later ones hit the cache
+    """
+    search = SlowSearchTool(latency=0.05)
+    cache = ToolResultCache(search)
+    tool = cache.as_tool()
+
+    results = await asyncio.gather(
+        *(tool.ainvoke({"query": query}) for query in ["Weather in SF"] * 5 + ["weather  in sf"] * 5)
+    )
+    assert search.calls == 1
+    assert set(results) == {"Results for Weather in SF: sunny, 68°F."}
+
+    assert await tool.ainvoke({"query": "weather in SF"}) == results[0]
+    assert await tool.ainvoke({"query": "weather in LA"}) != results[0]
+    assert search.calls == 2
+    assert cache.stats() == {
+        "hits": 1, "misses": 2, "coalesced": 9, "timeouts": 0, "errors": 0, "entries": 2,
+    }
+
+
+def test_sync_calls_are_coalesced():
+    """
+    Test that concurrent identical sync calls from worker threads make one call
+    """
+    search = SlowSearchTool(latency=0.1)
+    tool = ToolResultCache(search).as_tool()
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: tool.invoke({"query": "news"}), range(8)))
+
+    assert search.calls == 1
+    assert len(set(results)) == 1
+
+
+async def test_concurrency_limit_and_timeout():
+    """
+    Test that at most max_concurrency distinct calls run at once, and slow calls time out
+    """
+    search = SlowSearchTool(latency=0.05)
+    tool = ToolResultCache(search, max_concurrency=2).as_tool()
+
+    started = asyncio.get_running_loop().time()
+    await asyncio.gather(*(tool.ainvoke({"query": f"topic {n}"}) for n in range(4)))
+    assert asyncio.get_running_loop().time() - started >= 0.1, "4 calls ran 2 at a time"
+
+    slow = ToolResultCache(SlowSearchTool(latency=1), timeout=0.05)
+    with pytest.raises(ToolException, match="timed out"):
+        await slow.as_tool().ainvoke({"query": "slow"})
+    assert slow.stats()["timeouts"] == 1
+    assert slow.stats()["entries"] == 0
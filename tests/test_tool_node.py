@@ -0,0 +1,91 @@
+import time
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+from agent.tool_node import ParallelToolNode, get_tool_call_concurrency
+from fake_agent import FakeToolCallingChatModel, SlowSearchTool, fake_responses
+
+
+def build_graph(tools, max_concurrency):
+    model = FakeToolCallingChatModel(responses=fake_responses, call_all_tools=True)
+    node = ParallelToolNode(tools, max_concurrency=max_concurrency)
+    return create_react_agent(model, node, checkpointer=InMemorySaver())
+
+
+def sync_search(name, latency):
+    def search(query: str) -> str:
+        time.sleep(latency)
+        return f"{name}: {query}"
+
+    return StructuredTool.from_function(search, name=name, description="Search the web for the query.")
+
+
+def tool_messages(state):
+    return [message for message in state["messages"] if isinstance(message, ToolMessage)]
+
+
+async def test_tool_calls_run_in_parallel_in_call_order():
+    """
+    Test that a turn takes as long as its slowest tool, and results keep the call order
+    """
+    # The first tool finishes last
+    tools = [SlowSearchTool(name=f"search_{n}", latency=0.3 - 0.1 * n) for n in range(3)]
+    graph = build_graph(tools, max_concurrency=3)
+    config = {"configurable": {"thread_id": "parallel"}}
+
+    started = time.perf_counter()
+    result = await graph.ainvoke({"messages": [("human", "weather")]}, config)
+    assert time.perf_counter() - started < 0.5
+
+    assert [m.name for m in tool_messages(result)] == ["search_0", "search_1", "search_2"]
+    calls = result["messages"][1].tool_calls
+    assert [m.tool_call_id for m in tool_messages(result)] == [call["id"] for call in calls]
+
+    # The tool results were checkpointed as one step
+    history = [s async for s in graph.aget_state_history(config)]
+    after_tools = [s for s in history if s.next == ("agent",) and s.metadata["step"] > 1]
+    assert len(after_tools) == 1
+    assert len(tool_messages(after_tools[0].values)) == 3
+
+
+async def test_concurrency_limit_applies_to_sync_tools():
+    """
+    Test that sync tools run on the node's threads, at most max_concurrency at once
+    """
+    tools = [sync_search(f"search_{n}", 0.1) for n in range(4)]
+    graph = build_graph(tools, max_concurrency=2)
+
+    started = time.perf_counter()
+    result = await graph.ainvoke({"messages": [("human", "weather")]}, {"configurable": {"thread_id": "a"}})
+    elapsed = time.perf_counter() - started
+    assert 0.2 <= elapsed < 0.35, "4 calls of 0.1s ran 2 at a time"
+    assert [m.content for m in tool_messages(result)] == [f"search_{n}: weather" for n in range(4)]
+
+    started = time.perf_counter()
+    result = graph.invoke({"messages": [("human", "weather")]}, {"configurable": {"thread_id": "s"}})
+    assert 0.2 <= time.perf_counter() - started < 0.35
+    assert [m.name for m in tool_messages(result)] == [f"search_{n}" for n in range(4)]
+
+
+def test_tools_get_the_run_config_unchanged(monkeypatch):
+    """
+    Test that the node's limit isn't passed on to the tools, and is opt-in for the agent
+    """
+    seen = []
+
+    def search(query: str, config: RunnableConfig) -> str:
+        seen.append(config.get("max_concurrency"))
+        return query
+
+    tool = StructuredTool.from_function(search, name="search", description="Search the web for the query.")
+    build_graph([tool], max_concurrency=2).invoke(
+        {"messages": [("human", "weather")]}, {"configurable": {"thread_id": "c"}}
+    )
+    assert seen == [None]
+
+    monkeypatch.delenv("TOOL_CALL_CONCURRENCY", raising=False)
+    assert get_tool_call_concurrency() is None
+    monkeypatch.setenv("TOOL_CALL_CONCURRENCY", "4")
+    assert get_tool_call_concurrency() == 4